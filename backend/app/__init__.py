@@ -1 +1,4 @@
-  
\ No newline at end of file
+import time
+
+# When the package began importing; app.main reports its import time from here
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,243 @@
+"""
+Headless bulk analysis: extract and analyze every document under a directory without the HTTP
+server, writing one JSON line per file.
+
+    cd backend && python -m app.cli analyze /data/contracts -o results.jsonl --workers 8
+
+Extraction runs on a process pool (--workers files at once; OCR inside each file still uses up to
+OCR_WORKERS page processes, so lower that for archives of scans) and LLM calls on a bounded async
+pool (--concurrency). Results are appended and flushed as each file finishes. The output file is
+the checkpoint: rerunning the same command skips files already analyzed with the same model and
+prompt (and unchanged since), and retries the ones that failed. After a prompt or model change
+every file is analyzed again. Per-stage throughput is printed to stderr at the end.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from app.config import EXTRACT_WORKERS, LLM_CONCURRENCY, OPENAI_MODEL
+from app.services.ai_analyzer import SYSTEM_PROMPT, analysis_key, analyze_document_async
+from app.services.extract_text import extract_pages, join_pages
+from app.services.ocr import run_pages_inline
+from app.services.scheduler import PRIORITY_BATCH, set_priority
+from app.services.tenants import set_tenant
+
+SUFFIXES = (".pdf", ".docx", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+# Progress line on stderr every this many finished files
+_PROGRESS_EVERY = 50
+
+
+def prompt_id() -> str:
+    """Short fingerprint of the system prompt: a new prompt invalidates the checkpoint."""
+    return hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class SourceFile:
+    path: str  # relative to the input directory
+    full_path: str
+    size: int
+    mtime_ns: int
+
+    def checkpoint_key(self, model: str, prompt: str) -> tuple:
+        return (self.path, self.size, self.mtime_ns, model, prompt)
+
+
+@dataclass
+class StageStats:
+    files: int = 0
+    failed: int = 0
+    busy_s: float = 0.0  # summed over concurrent files
+    chars: int = 0
+
+    def line(self, name: str, wall: float) -> str:
+        """Files and characters per second of wall time, plus per-file seconds."""
+        rate = self.files / wall if wall else 0.0
+        per_file = self.busy_s / self.files if self.files else 0.0
+        return (
+            f"{name:<8} {self.files:>6} ok  {self.failed:>4} failed  {rate:8.2f} files/s"
+            f"  {self.chars / wall / 1e3 if wall else 0.0:9.1f} k chars/s  {per_file:7.3f} s/file"
+        )
+
+
+@dataclass
+class RunStats:
+    extract: StageStats = field(default_factory=StageStats)
+    analyze: StageStats = field(default_factory=StageStats)
+    skipped: int = 0
+    done: int = 0
+    start: float = field(default_factory=time.perf_counter)
+
+
+def find_files(root: str) -> Iterator[SourceFile]:
+    """Supported documents under root, in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if not name.lower().endswith(SUFFIXES):
+                continue
+            full = os.path.join(dirpath, name)
+            st = os.stat(full)
+            yield SourceFile(os.path.relpath(full, root), full, st.st_size, st.st_mtime_ns)
+
+
+def load_checkpoint(output: str) -> set[tuple]:
+    """Keys of files already analyzed successfully in output. A line cut short by an interrupted
+    run is ignored."""
+    done: set[tuple] = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("status") == "ok":
+                done.add((row["path"], row["size"], row["mtime_ns"], row["model"], row["prompt"]))
+    return done
+
+
+def _open_output(output: str):
+    """Append to output, first ending a partial last line so new records start on their own."""
+    f = open(output, "a+", encoding="utf-8")
+    if f.tell():
+        f.seek(f.tell() - 1)
+        if f.read(1) != "\n":
+            f.write("\n")
+    return f
+
+
+def _extract(path: str) -> tuple[str, list[int], float]:
+    """Worker process: text, page offsets and seconds spent extracting."""
+    start = time.perf_counter()
+    text, page_starts = join_pages(extract_pages(path, path))
+    return text, page_starts, time.perf_counter() - start
+
+
+async def _process(
+    src: SourceFile, pool: ProcessPoolExecutor, llm: asyncio.Semaphore, model: str, stats: RunStats
+) -> dict:
+    row = {"path": src.path, "size": src.size, "mtime_ns": src.mtime_ns, "model": model, "prompt": prompt_id()}
+    loop = asyncio.get_running_loop()
+    try:
+        text, page_starts, extract_s = await loop.run_in_executor(pool, _extract, src.full_path)
+    except Exception as e:  # unreadable file, DocumentTooLarge past MAX_PAGES, ...
+        stats.extract.failed += 1
+        return {**row, "status": "error", "stage": "extract", "error": str(e) or type(e).__name__}
+    row.update(chars=len(text), pages=len(page_starts), extract_s=round(extract_s, 3))
+    if not text.strip():
+        stats.extract.failed += 1
+        return {**row, "status": "error", "stage": "extract", "error": "No readable text found."}
+    stats.extract.files += 1
+    stats.extract.busy_s += extract_s
+    stats.extract.chars += len(text)
+
+    async with llm:
+        start = time.perf_counter()
+        try:
+            summary = await analyze_document_async(text, model)
+        except Exception as e:
+            stats.analyze.failed += 1
+            return {**row, "status": "error", "stage": "analyze", "error": str(e) or type(e).__name__}
+        analyze_s = time.perf_counter() - start
+    stats.analyze.files += 1
+    stats.analyze.busy_s += analyze_s
+    stats.analyze.chars += len(text)
+    return {
+        **row,
+        "status": "ok",
+        "analyze_s": round(analyze_s, 3),
+        "analysis_id": analysis_key(text, model),
+        "summary": summary.model_dump(),
+    }
+
+
+async def analyze_dir(
+    root: str, output: str, workers: int, concurrency: int, model: str, limit: Optional[int] = None,
+    tenant: str = "",
+) -> RunStats:
+    """Analyze every supported file under root not already in output's checkpoint."""
+    # Same treatment as batch jobs: wait for LLM slots rather than being refused
+    set_priority(PRIORITY_BATCH)
+    set_tenant(tenant)
+    stats = RunStats()
+    done = load_checkpoint(output)
+    prompt = prompt_id()
+
+    def pending() -> Iterator[SourceFile]:
+        count = 0
+        for src in find_files(root):
+            if src.checkpoint_key(model, prompt) in done:
+                stats.skipped += 1
+                continue
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield src
+
+    files = pending()
+    llm = asyncio.Semaphore(concurrency)
+    # Each extraction process OCRs and parses its own pages inline instead of starting a page pool
+    with ProcessPoolExecutor(max_workers=workers, initializer=run_pages_inline) as pool, _open_output(output) as out:
+
+        async def runner() -> None:
+            # Enough runners to keep every extraction process and every LLM slot busy; they share
+            # one iterator, so files are listed lazily and never all held in memory
+            for src in files:
+                row = await _process(src, pool, llm, model, stats)
+                out.write(json.dumps(row) + "\n")
+                out.flush()
+                stats.done += 1
+                if stats.done % _PROGRESS_EVERY == 0:
+                    elapsed = time.perf_counter() - stats.start
+                    print(f"{stats.done} files in {elapsed:.0f} s ({stats.skipped} skipped)", file=sys.stderr)
+
+        await asyncio.gather(*(runner() for _ in range(workers + concurrency)))
+    return stats
+
+
+def report(stats: RunStats) -> str:
+    wall = time.perf_counter() - stats.start
+    return "\n".join(
+        [
+            stats.extract.line("extract", wall),
+            stats.analyze.line("analyze", wall),
+            f"{stats.done} files processed, {stats.skipped} already done, {wall:.1f} s wall",
+        ]
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    analyze = commands.add_parser("analyze", help="Extract and analyze every document under a directory")
+    analyze.add_argument("directory")
+    analyze.add_argument("-o", "--output", default="results.jsonl", help="JSONL results, also the checkpoint")
+    analyze.add_argument("--workers", type=int, default=EXTRACT_WORKERS, help="Extraction processes")
+    analyze.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="Concurrent LLM analyses")
+    analyze.add_argument("--model", default=OPENAI_MODEL)
+    analyze.add_argument("--limit", type=int, default=None, help="Process at most this many new files")
+    analyze.add_argument("--tenant", default="", help="Tenant whose clause index is used")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    stats = asyncio.run(
+        analyze_dir(args.directory, args.output, max(1, args.workers), max(1, args.concurrency), args.model, args.limit,
+                    args.tenant)
+    )
+    print(report(stats), file=sys.stderr)
+    return 1 if stats.extract.failed or stats.analyze.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,148 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# SQLite databases and stored uploads default to files under DATA_DIR (the backend directory), so the
+# same queue and stores are found whichever directory the app is started from
+DATA_DIR = os.getenv("DATA_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _data_path(name: str, default: str) -> str:
+    return os.getenv(name, os.path.join(DATA_DIR, default))
+
+
 # Use OpenRouter (openrouter.ai) or OpenAI directly
 USE_OPENROUTER = os.getenv("USE_OPENROUTER", "true").lower() in ("true", "1", "yes")
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+# Optional override, e.g. a local OpenAI-compatible server for benchmarks
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or os.getenv("OPENROUTER_API_KEY")
 # OpenRouter model IDs need org prefix (e.g. openai/gpt-4o-mini)
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "openai/gpt-4o-mini" if USE_OPENROUTER else "gpt-4o-mini")
+
+# Multi-tenant deployments: the authenticating proxy sets this header to the caller's tenant. State
+# derived from one tenant's documents (clause index, micro-batched prompts) is never shared with another
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-ID")
+
+# Upload limits (413 when exceeded); uploads are spooled to UPLOAD_TMP_DIR (system temp if empty)
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "100"))
+MAX_PAGES = int(os.getenv("MAX_PAGES", "1000"))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", "") or None
+
+# Concurrency: max in-flight LLM calls per process, LLM request timeout (seconds),
+# and the bounded pool extraction runs on so it never blocks the event loop
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_POOL = os.getenv("EXTRACT_POOL", "thread").lower()  # thread or process
+
+# LLM resilience: calls that time out, fail to connect or get a 5xx are retried up to LLM_MAX_ATTEMPTS
+# times in all, after a jittered backoff starting at LLM_RETRY_DELAY seconds; retries go to
+# OPENAI_FALLBACK_MODEL when set. With LLM_HEDGE_QUANTILE (e.g. 0.95) a duplicate call is sent when
+# the first has taken longer than that quantile of recent call latencies (at least
+# LLM_HEDGE_MIN_DELAY seconds) and an LLM slot is free; the first answer wins
+OPENAI_FALLBACK_MODEL = os.getenv("OPENAI_FALLBACK_MODEL", "")
+LLM_MAX_ATTEMPTS = max(1, int(os.getenv("LLM_MAX_ATTEMPTS", "3")))
+LLM_RETRY_DELAY = float(os.getenv("LLM_RETRY_DELAY", "0.5"))
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+
+# Micro-batching: short analyses (at most LLM_BATCH_DOC_TOKENS prompt tokens) are collected for up
+# to LLM_BATCH_WINDOW seconds and sent as one multi-document request, until LLM_BATCH_MAX_DOCS
+# documents or LLM_BATCH_MAX_TOKENS tokens are waiting. Longer documents are sent on their own, and
+# so is a document arriving while the LLM lane is idle. Only batch jobs and the CLI are batched
+# unless LLM_BATCH_INTERACTIVE also lets uploads and pasted text wait for the window
+LLM_BATCH_ENABLED = os.getenv("LLM_BATCH_ENABLED", "true").lower() in ("true", "1", "yes")
+LLM_BATCH_INTERACTIVE = os.getenv("LLM_BATCH_INTERACTIVE", "false").lower() in ("true", "1", "yes")
+LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "0.2"))
+LLM_BATCH_MAX_DOCS = max(1, int(os.getenv("LLM_BATCH_MAX_DOCS", "8")))
+LLM_BATCH_MAX_TOKENS = int(os.getenv("LLM_BATCH_MAX_TOKENS", "12000"))
+LLM_BATCH_DOC_TOKENS = int(os.getenv("LLM_BATCH_DOC_TOKENS", "2000"))
+
+# Production serving (python -m app.serve): worker processes forked after the app is imported and
+# preloaded; each worker warms up (PDF parse, tesseract probe, LLM connection, each bounded by
+# WARMUP_TIMEOUT seconds) before /health reports it ready
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("true", "1", "yes")
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+
+# Admission control: native extraction (EXTRACT_WORKERS at once), OCR (OCR_CONCURRENCY documents at
+# once) and LLM calls (LLM_CONCURRENCY) each have a priority wait queue: pasted text first, then
+# uploads, then batch jobs. Requests are refused with 429 + Retry-After when SCHED_QUEUE_SIZE items
+# are queued ahead of them or the estimated wait exceeds SCHED_MAX_WAIT (SCHED_OCR_MAX_WAIT for OCR)
+# seconds; batch jobs always wait
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "2"))
+SCHED_QUEUE_SIZE = int(os.getenv("SCHED_QUEUE_SIZE", "32"))
+SCHED_MAX_WAIT = float(os.getenv("SCHED_MAX_WAIT", "30"))
+SCHED_OCR_MAX_WAIT = float(os.getenv("SCHED_OCR_MAX_WAIT", "120"))
+
+# Chunked analysis: documents longer than ANALYSIS_CHUNK_CHARS are split on section
+# boundaries and the chunks are analyzed concurrently (at most ANALYSIS_CHUNK_CONCURRENCY)
+ANALYSIS_CHUNK_CHARS = int(os.getenv("ANALYSIS_CHUNK_CHARS", "40000"))
+ANALYSIS_CHUNK_CONCURRENCY = int(os.getenv("ANALYSIS_CHUNK_CONCURRENCY", "4"))
+
+# Scanned-PDF OCR: worker processes, pages rendered per task (bounds memory), render DPI
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_WINDOW = int(os.getenv("OCR_WINDOW", "2"))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+# Image OCR: images scanned above OCR_IMAGE_DPI (by their DPI tag) or with a side longer than
+# OCR_MAX_IMAGE_SIDE pixels are downscaled; single images at least twice OCR_TILE_HEIGHT tall are
+# cut into horizontal tiles at blank rows and OCR'd in parallel (multi-page TIFFs per frame)
+OCR_IMAGE_DPI = int(os.getenv("OCR_IMAGE_DPI", "300"))
+OCR_MAX_IMAGE_SIDE = int(os.getenv("OCR_MAX_IMAGE_SIDE", "3500"))
+OCR_TILE_HEIGHT = int(os.getenv("OCR_TILE_HEIGHT", "1200"))
+# PDF pages with fewer native-text characters than this are OCR'd individually;
+# PDFs with at least PDF_PARALLEL_MIN_PAGES pages are parsed in parallel page ranges
+PDF_MIN_PAGE_CHARS = int(os.getenv("PDF_MIN_PAGE_CHARS", "25"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+# DOCX: stream (incremental parse of the zip parts, includes tables, headers, footers and notes)
+# or python-docx (previous full-DOM extractor, body paragraphs only)
+DOCX_EXTRACTOR = os.getenv("DOCX_EXTRACTOR", "stream").lower()
+
+# Prompt preparation: token budget per LLM request (after header/footer and whitespace
+# compaction) and tokenizer: auto (tiktoken if installed, else heuristic), tiktoken, heuristic
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "30000"))
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "auto").lower()
+
+# Clause fingerprint index (opt-in): reuse a tenant's risk verdicts for sections that match ones
+# analyzed before, either exactly or but for edits of up to CLAUSE_MAX_EDIT_WORDS consecutive words
+# that touch no negation, modal, number or proper noun. In memory unless CLAUSE_INDEX_DB is set;
+# least recently matched sections are dropped beyond CLAUSE_INDEX_MAX_MB. Sections are split to at
+# most CLAUSE_UNIT_CHARS; sections shorter than CLAUSE_MIN_CHARS are always sent to the model.
+CLAUSE_INDEX_ENABLED = os.getenv("CLAUSE_INDEX_ENABLED", "false").lower() in ("true", "1", "yes")
+CLAUSE_INDEX_DB = os.getenv("CLAUSE_INDEX_DB", "")
+CLAUSE_INDEX_MAX_MB = int(os.getenv("CLAUSE_INDEX_MAX_MB", "64"))
+CLAUSE_MATCH_THRESHOLD = float(os.getenv("CLAUSE_MATCH_THRESHOLD", "0.9"))
+CLAUSE_MAX_EDIT_WORDS = int(os.getenv("CLAUSE_MAX_EDIT_WORDS", "4"))
+CLAUSE_MIN_CHARS = int(os.getenv("CLAUSE_MIN_CHARS", "200"))
+CLAUSE_UNIT_CHARS = int(os.getenv("CLAUSE_UNIT_CHARS", "4000"))
+
+# Analysis cache: in-memory LRU, plus an on-disk SQLite tier when ANALYSIS_CACHE_DB is set
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "128"))
+ANALYSIS_CACHE_DB = os.getenv("ANALYSIS_CACHE_DB", "")
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_MB = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "256"))
+
+# Document store: extracted text with a page/offset index, served in slices by
+# /api/documents/{id}/text (in memory when DOCUMENTS_DB is empty); least recently used documents
+# are dropped beyond DOCUMENTS_MAX_MB, and one slice returns at most DOCUMENT_SLICE_CHARS characters
+DOCUMENTS_DB = _data_path("DOCUMENTS_DB", "documents.sqlite3")
+DOCUMENTS_MAX_MB = int(os.getenv("DOCUMENTS_MAX_MB", "1024"))
+DOCUMENT_SLICE_CHARS = int(os.getenv("DOCUMENT_SLICE_CHARS", "200000"))
+
+# Search: FTS5 index over analyzed documents and their flagged risks (in memory when SEARCH_DB is
+# empty); POST /api/search/reindex rebuilds it from the document store and analysis cache
+SEARCH_ENABLED = os.getenv("SEARCH_ENABLED", "true").lower() in ("true", "1", "yes")
+SEARCH_DB = _data_path("SEARCH_DB", "search.sqlite3")
+
+# Batch jobs: SQLite queue + stored uploads (survive restarts), worker count,
+# per-stage concurrency caps and retry policy for transient LLM failures. Under app.serve only the
+# first worker runs the queue, so these caps hold for the whole server
+JOBS_DB = _data_path("JOBS_DB", "jobs.sqlite3")
+JOBS_DIR = _data_path("JOBS_DIR", "job_uploads")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_EXTRACT_CONCURRENCY = int(os.getenv("JOB_EXTRACT_CONCURRENCY", str(EXTRACT_WORKERS)))
+JOB_LLM_CONCURRENCY = int(os.getenv("JOB_LLM_CONCURRENCY", str(max(1, LLM_CONCURRENCY // 2))))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "2.0"))
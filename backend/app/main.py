@@ -1,16 +1,53 @@
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
+from app import IMPORT_STARTED
+from app.config import TENANT_HEADER, WARMUP_ENABLED
 from app.routes.documents import router as documents_router
+from app.routes.jobs import router as jobs_router
+from app.services import startup
+from app.services.analysis_cache import get_cache
+from app.services.jobs import start_runner, stop_runner
+from app.services.metrics import MetricsMiddleware, render
+from app.services.scheduler import Overloaded, get_scheduler
+from app.services.tenants import set_tenant
+from app.services.uploads import MAX_UPLOAD_BYTES
+
+# Multipart framing overhead allowed on top of the file itself
+_BODY_SLACK = 64 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preforked workers share one queue, run by one of them; the parent requeued interrupted
+    # documents before forking
+    if startup.runs_jobs:
+        start_runner(requeue=not startup.preforked)
+    warm = None
+    if WARMUP_ENABLED:
+        warm = asyncio.create_task(startup.warmup())
+    else:
+        startup.mark_ready()
+    yield
+    if warm is not None:
+        warm.cancel()
+    await stop_runner()
+
 
 app = FastAPI(
     title="Doc Reviewer API",
     description="Summarize documents and flag risks before signing",
+    lifespan=lifespan,
 )
 
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,14 +55,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+
+@app.middleware("http")
+async def reject_oversized_bodies(request: Request, call_next):
+    """Refuse single-document uploads whose declared size is over the limit before reading them.
+    Batch job uploads carry several files, so only the per-file check in spool_upload applies there."""
+    length = request.headers.get("content-length")
+    if (
+        length
+        and length.isdigit()
+        and int(length) > MAX_UPLOAD_BYTES + _BODY_SLACK
+        and not request.url.path.startswith("/api/jobs")
+    ):
+        return JSONResponse(status_code=413, content={"detail": "Upload exceeds the size limit."})
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def tenant_context(request: Request, call_next):
+    """Per-tenant state (clause index, micro-batches) is keyed by the TENANT_HEADER value."""
+    set_tenant(request.headers.get(TENANT_HEADER, ""))
+    return await call_next(request)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    """Work refused by the scheduler: 429 with a Retry-After estimated from the queue."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "lane": exc.lane, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 app.include_router(documents_router)
+app.include_router(jobs_router)
+
+
+@app.get("/health")
+def health():
+    """503 until this worker has warmed up; reports startup timings and warmup checks."""
+    status = startup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content={"ok": status["ready"], **status})
+
+
+def _cache_metrics() -> list[str]:
+    name = "docreviewer_cache_events_total"
+    out = [f"# HELP {name} Analysis cache events.", f"# TYPE {name} counter"]
+    stats = get_cache().stats()
+    for event in ("memory_hits", "disk_hits", "misses", "evictions"):
+        out.append(f'{name}{{event="{event}"}} {stats.get(event, 0)}')
+    return out
+
+
+def _scheduler_metrics() -> list[str]:
+    """Queue depth, slots in use and estimated wait per scheduler lane."""
+    lanes = get_scheduler().stats()
+    out = []
+    for name, key, help in (
+        ("docreviewer_queue_depth", "queued", "Work waiting for a scheduler slot."),
+        ("docreviewer_queue_in_flight", "in_flight", "Scheduler slots in use."),
+        ("docreviewer_queue_estimated_wait_seconds", "estimated_wait_s", "Estimated queue wait for a new upload."),
+    ):
+        out += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        out += [f'{name}{{lane="{lane}"}} {stats[key]}' for lane, stats in lanes.items()]
+    return out
+
 
-# Serve frontend
+def _startup_metrics() -> list[str]:
+    name = "docreviewer_startup_seconds"
+    out = [f"# HELP {name} Import, preload and warmup timings of this worker.", f"# TYPE {name} gauge"]
+    out += [f'{name}{{phase="{phase}"}} {seconds}' for phase, seconds in startup.phases().items()]
+    out += ["# HELP docreviewer_ready 1 once this worker has warmed up.", "# TYPE docreviewer_ready gauge"]
+    out.append(f"docreviewer_ready {int(startup.status()['ready'])}")
+    return out
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of stage latencies, OCR pages, LLM tokens, cache counters,
+    scheduler queues and startup timings."""
+    return PlainTextResponse(
+        render(lambda: _cache_metrics() + _scheduler_metrics() + _startup_metrics()), media_type="text/plain; version=0.0.4"
+    )
+
+
+# Serve frontend (mounted last: it matches every path)
 _frontend = os.path.join(os.path.dirname(__file__), "..", "..", "frontend")
 if os.path.exists(_frontend):
     app.mount("/", StaticFiles(directory=_frontend, html=True), name="frontend")
 
-
-@app.get("/health")
-def health():
-    return {"ok": True}
+startup.record("import_app", time.perf_counter() - IMPORT_STARTED)
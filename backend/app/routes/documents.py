@@ -1,194 +1,222 @@
+import json
+import os
 import re
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import DOCUMENT_SLICE_CHARS
+from app.schemas import AnalyzeResponse, AnalyzeTextRequest, DocumentSummary, SearchResponse
+from app.services.document_store import StoredDocument, get_document_store
+from app.services.extract_text import DocumentTooLarge, extract_pages_async, join_pages
+from app.services.ai_analyzer import (
+    analysis_key,
+    analyze_document_async,
+    get_cached_analysis,
+    stream_analysis,
+)
+from app.services.analysis_cache import get_cache
+from app.services.exports import (
+    encoded,
+    etag_matches,
+    export_etag,
+    html_export,
+    negotiate_encoding,
+    representation_etag,
+    summary_export,
+    text_export,
+)
+from app.services.metrics import DOCUMENT_LOOKUPS
+from app.services.revisions import analyze_revision_async, revision_key
+from app.services.scheduler import PRIORITY_INTERACTIVE, get_scheduler, set_priority
+from app.services.search_index import RISK_LEVELS, SCOPES, get_search_index, record_analysis_async, reindex
+from app.services.uploads import spool_upload
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse, PlainTextResponse
+router = APIRouter(prefix="/api", tags=["documents"])
 
-from app.schemas import AnalyzeResponse, AnalyzeTextRequest
-from app.services.extract_text import extract_text
-from app.services.ai_analyzer import analyze_document
+# Characters not allowed in the quoted ASCII filename of Content-Disposition
+_UNSAFE_FILENAME_RE = re.compile(r'[^\x20-\x7e]|["\\]')
 
-router = APIRouter(prefix="/api", tags=["documents"])
 
+def _content_disposition(filename: str) -> str:
+    """Attachment header for a client-supplied name: a quoted ASCII fallback with unsafe characters
+    replaced, and the exact name as RFC 5987 filename* for clients that read it."""
+    fallback = _UNSAFE_FILENAME_RE.sub("_", filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _export_response(request: Request, pieces, etag: str, media_type: str, filename: str) -> Response:
+    """Stream an export, compressed as the client accepts. An If-None-Match that matches the
+    export's ETag gets 304 on GET, and 412 on POST (the precondition of a request that is not a
+    plain read failed), without rendering anything."""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": representation_etag(etag, encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        status = 304 if request.method in ("GET", "HEAD") else 412
+        return Response(status_code=status, headers=headers)
+    headers["Content-Disposition"] = _content_disposition(filename)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(encoded(pieces, encoding), media_type=media_type, headers=headers)
+
+
+# stream_analysis keys -> SSE event names
+_STREAM_EVENTS = {
+    "summary": "summary",
+    "document_type": "document_type",
+    "flagged_risks": "risk",
+    "questions_to_ask": "question",
+}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-def _mark_risks_in_text(text: str, risks: list) -> str:
-    """Wrap risky clauses in markers for plain text export."""
-    if not risks:
-        return text
-    result = text
-    sorted_risks = sorted(risks, key=lambda r: len(r.clause or ""), reverse=True)
-    for r in sorted_risks:
-        clause = (r.clause or "").strip()
-        if len(clause) < 5:
-            continue
-        pattern = re.escape(clause).replace(" ", r"\s+")
-        marker = r">> [RISK - " + r.risk_level.upper() + r"] \g<0> <<"
-        try:
-            result = re.sub(f"({pattern})", marker, result, flags=re.IGNORECASE)
-        except re.error:
-            pass
-    return result
 
+async def _analysis_events(doc: StoredDocument, meta: dict):
+    """SSE stream: meta first, then one event per completed item, then done (a DocumentSummary
+    whose risks carry offsets and pages)."""
+    yield _sse("meta", meta)
+    try:
+        async for key, value in stream_analysis(doc.text):
+            if key == "done":
+                yield _sse("done", (await record_analysis_async(doc, doc.text, value)).model_dump())
+            elif key in _STREAM_EVENTS:
+                yield _sse(_STREAM_EVENTS[key], value)
+    except ValueError as e:
+        yield _sse("error", {"status": 503, "detail": str(e)})
+    except Exception as e:
+        yield _sse("error", {"status": 500, "detail": str(e)})
+
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _admit_analysis(text: Optional[str] = None) -> None:
+    """Refuse the request (429 via Overloaded) before doing any work when the LLM queue is too
+    long, unless the analysis of text is already cached."""
+    if text is not None and get_cached_analysis(analysis_key(text)) is not None:
+        return
+    get_scheduler().lane("llm").admit()
 
-def _escape_html(s: str) -> str:
-    return (s or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
-
-
-def _structure_as_html(text: str) -> str:
-    """Convert plain text to structured HTML preserving headings, bullets, and paragraphs.
-    Text may already contain <mark> tags - do not escape again."""
-    lines = text.split("\n")
-    result = []
-    i = 0
-    in_list = False
-
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-
-        if not stripped:
-            if in_list:
-                result.append("</ul>")
-                in_list = False
-            result.append("<br>")
-            i += 1
-            continue
-
-        # Bullet line: ● • - * or numbered at start (content may have <mark>)
-        if re.match(r"^[\s]*(●|•|[-*]|\d+\.)\s", line) or stripped.startswith("●") or stripped.startswith("•"):
-            if not in_list:
-                result.append("<ul>")
-                in_list = True
-            content = re.sub(r"^[\s]*(●|•|[-*]|\d+\.)\s*", "", stripped)
-            result.append(f"<li>{content}</li>")
-            i += 1
-            continue
-
-        if in_list:
-            result.append("</ul>")
-            in_list = False
-
-        # Short line that looks like a heading
-        is_main_heading = i == 0 and len(stripped) < 80
-        is_short_heading = len(stripped) < 60 and not stripped.endswith(".") and stripped and stripped[0].isupper()
-        if is_main_heading:
-            result.append(f"<h2 class='doc-title'>{stripped}</h2>")
-        elif is_short_heading:
-            result.append(f"<h3 class='doc-heading'>{stripped}</h3>")
+
+async def _extract_upload(
+    file: UploadFile, empty_detail: str = "No readable text found.", analyze: bool = False
+) -> StoredDocument:
+    """Spool the upload to disk (hashing it on the way), extract its pages and keep the text in
+    the document store. Identical uploads reuse the stored document; size and page limits answer 413.
+    With analyze, the request is admitted to the LLM lane before extraction starts."""
+    try:
+        upload = await spool_upload(file)
+    except DocumentTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    store = get_document_store()
+    with upload:
+        key = f"{os.path.splitext(upload.filename)[1].lower()}:{upload.sha256}"
+        doc = store.find_source(key)
+        if doc is not None:
+            DOCUMENT_LOOKUPS.inc(1, "hit")
+            doc.text = store.text(doc.id)
+            if analyze:
+                _admit_analysis(doc.text)
         else:
-            result.append(f"<p class='doc-para'>{line}</p>")
-        i += 1
-
-    if in_list:
-        result.append("</ul>")
-
-    return "\n".join(result)
-
-
-def _build_html_export(text: str, summary, filename: str = "document") -> str:
-    """Build HTML with in-place highlights and key points at end."""
-    escaped = _escape_html(text)
-    html_text = escaped
-    risks = summary.flagged_risks or []
-    sorted_risks = sorted(risks, key=lambda r: len(r.clause or ""), reverse=True)
-    for r in sorted_risks:
-        clause = (r.clause or "").strip()
-        if len(clause) < 5:
-            continue
-        escaped_clause = _escape_html(clause)
-        title = _escape_html(r.description or "")
-        pattern = re.escape(escaped_clause).replace(r"\ ", r"\s+")
-        try:
-            repl = f'<mark class="risk-{r.risk_level}" title="{title}">\\g<0></mark>'
-            html_text = re.sub(f"({pattern})", repl, html_text, flags=re.IGNORECASE)
-        except re.error:
-            pass
-
-    structured = _structure_as_html(html_text)
-
-    key_points = "".join(f"<li>{_escape_html(b)}</li>" for b in (summary.summary or []))
-    questions = getattr(summary, "questions_to_ask", None) or []
-    questions_html = "".join(f"<li>{_escape_html(q)}</li>" for q in questions) if questions else ""
-    doc_type = summary.document_type or "Unknown"
-
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Doc Review - {filename}</title>
-<style>
-body {{ font-family: Georgia, 'Times New Roman', serif; max-width: 800px; margin: 2rem auto; padding: 0 1rem; line-height: 1.6; color: #1a1a1a; }}
-.document {{ margin-bottom: 2rem; }}
-.document .doc-title {{ font-size: 1.5rem; font-weight: 700; margin: 1.5rem 0 0.5rem; }}
-.document .doc-heading {{ font-size: 1.15rem; font-weight: 600; margin: 1.25rem 0 0.5rem; }}
-.document .doc-para {{ margin: 0.5rem 0; text-align: justify; }}
-.document ul {{ margin: 0.5rem 0; padding-left: 1.5rem; }}
-.document li {{ margin: 0.25rem 0; }}
-mark.risk-low {{ background: rgba(34, 197, 94, 0.3); border-bottom: 2px solid #22c55e; padding: 0 2px; }}
-mark.risk-medium {{ background: rgba(234, 179, 8, 0.3); border-bottom: 2px solid #eab308; padding: 0 2px; }}
-mark.risk-high {{ background: rgba(239, 68, 68, 0.3); border-bottom: 2px solid #ef4444; padding: 0 2px; }}
-.key-points, .questions-section {{ background: #f8fafc; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; }}
-.key-points {{ border-left: 4px solid #6366f1; }}
-.questions-section {{ border-left: 4px solid #22c55e; }}
-.key-points h2, .questions-section h2 {{ margin-top: 0; font-size: 1.1rem; }}
-.key-points ul, .questions-section ul {{ margin: 0; padding-left: 1.25rem; }}
-</style>
-</head>
-<body>
-<h1>Document Review</h1>
-<p><strong>File:</strong> {filename} &nbsp;|&nbsp; <strong>Type:</strong> {doc_type}</p>
-<div class="document">{structured}</div>
-<div class="key-points">
-<h2>Key Points</h2>
-<ul>{key_points}</ul>
-</div>""" + (f"""
-<div class="questions-section">
-<h2>Questions to Ask Before Signing</h2>
-<ul>{questions_html}</ul>
-</div>""" if questions_html else "") + """
-</body>
-</html>"""
+            DOCUMENT_LOOKUPS.inc(1, "miss")
+            if analyze:
+                _admit_analysis()
+            try:
+                pages = await extract_pages_async(upload.filename, upload.path)
+            except DocumentTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            text, page_starts = join_pages(pages)
+            if not text.strip():
+                raise HTTPException(status_code=400, detail=empty_detail)
+            doc = store.put(text, page_starts, upload.filename, source_key=key)
+    return doc
+
+
+def _store_text(text: str) -> StoredDocument:
+    """Keep pasted text in the document store as a single page."""
+    return get_document_store().put(text, [0], "pasted text")
+
+
+async def _export_analysis(doc: Optional[StoredDocument], text: str) -> DocumentSummary:
+    """The analysis an export of text is built from. The cache is looked up by the text's hash
+    first, so a repeated export (whose upload the document store already knows) gets its ETag
+    checked without extraction or an LLM call. A fresh analysis of doc is indexed for search."""
+    cached = get_cached_analysis(analysis_key(text))
+    if cached is not None:
+        return cached.summary
+    try:
+        result = await analyze_document_async(text)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if doc is not None:
+        await record_analysis_async(doc, text, result)
+    return result
+
+
+def _cached_or_404(key: str):
+    cached = get_cached_analysis(key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired. Upload the document again.")
+    return cached
 
 
 @router.post("/extract")
 async def extract(file: UploadFile = File(...)):
     """Extract text from document. Supports PDF, Word, and scanned images."""
-    data = await file.read()
-    try:
-        text = extract_text(file.filename or "", data)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-    if not text or not text.strip():
-        raise HTTPException(
-            status_code=400,
-            detail="No readable text found. Supported: PDF, DOCX, PNG, JPG, TIFF.",
-        )
+    doc = await _extract_upload(file, "No readable text found. Supported: PDF, DOCX, PNG, JPG, TIFF.")
 
     return {
         "filename": file.filename,
-        "characters": len(text),
-        "preview": text[:1000],
+        "document_id": doc.id,
+        "pages": doc.pages,
+        "characters": doc.chars,
+        "preview": doc.text[:1000],
     }
 
 
-@router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(file: UploadFile = File(...)):
-    """Upload a document for full AI analysis: summary + flagged risks."""
-    data = await file.read()
-    try:
-        text = extract_text(file.filename or "", data)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+async def _analyze(text: str, previous_id: Optional[str]):
+    """Full analysis, or with previous_id an incremental one against that earlier version.
+    Returns (summary, change report or None, analysis_id)."""
+    if not previous_id:
+        return await analyze_document_async(text), None, analysis_key(text)
+    previous = _cached_or_404(previous_id)
+    summary, changes = await analyze_revision_async(text, previous)
+    return summary, changes, revision_key(text, previous.analysis_id)
 
-    if not text or not text.strip():
-        raise HTTPException(
-            status_code=400,
-            detail="No readable text found. Supported: PDF, DOCX, PNG, JPG, TIFF.",
-        )
+
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze(
+    file: UploadFile = File(...),
+    previous_id: Optional[str] = Form(None),
+    include_text: bool = Form(False),
+):
+    """Upload a document for full AI analysis: summary + flagged risks (with offsets and pages).
+    The text itself is fetched from /api/documents/{document_id}/text unless include_text is set.
+    Pass previous_id (the analysis_id of an earlier version) to analyze only what changed."""
+    doc = await _extract_upload(file, "No readable text found. Supported: PDF, DOCX, PNG, JPG, TIFF.", analyze=True)
+    text = doc.text
 
     try:
-        summary = analyze_document(text)
+        summary, changes, analysis_id = await _analyze(text, previous_id)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
@@ -196,147 +224,265 @@ async def analyze(file: UploadFile = File(...)):
 
     return AnalyzeResponse(
         filename=file.filename or "document",
-        full_text=text,
-        summary=summary,
+        document_id=doc.id,
+        pages=doc.pages,
+        summary=await record_analysis_async(doc, text, summary, analysis_id),
         char_count=len(text),
+        full_text=text if include_text else None,
+        analysis_id=analysis_id,
+        changes=changes,
     )
 
 
+@router.post("/analyze/stream")
+async def analyze_stream(file: UploadFile = File(...)):
+    """Like /analyze, but streams server-sent events as the model completes each item.
+    Events: meta, summary, document_type, risk, question, done (DocumentSummary) or error."""
+    doc = await _extract_upload(file, "No readable text found. Supported: PDF, DOCX, PNG, JPG, TIFF.", analyze=True)
+
+    meta = {
+        "filename": file.filename or "document",
+        "document_id": doc.id,
+        "pages": doc.pages,
+        "char_count": doc.chars,
+        "analysis_id": analysis_key(doc.text),
+    }
+    return _event_stream(_analysis_events(doc, meta))
+
+
 @router.post("/analyze-text")
 async def analyze_text(body: AnalyzeTextRequest):
-    """Analyze raw text. Body: {"text": "..."}"""
+    """Analyze raw text. Body: {"text": "...", "previous_id": optional earlier version's analysis_id}"""
     text = body.text.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
+    set_priority(PRIORITY_INTERACTIVE)
+    _admit_analysis(text)
 
     try:
-        result = analyze_document(text)
+        result, changes, analysis_id = await _analyze(text, body.previous_id)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {"summary": result.model_dump(), "char_count": len(text)}
+    doc = _store_text(text)
+    out = {
+        "summary": (await record_analysis_async(doc, text, result, analysis_id)).model_dump(),
+        "char_count": len(text),
+        "document_id": doc.id,
+        "analysis_id": analysis_id,
+    }
+    if changes is not None:
+        out["changes"] = changes.model_dump()
+    return out
 
 
-@router.post("/export/summary")
-async def export_summary(file: UploadFile = File(...)):
-    """Analyze document and return summary as downloadable text file."""
-    data = await file.read()
-    try:
-        text = extract_text(file.filename or "", data)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@router.post("/analyze-text/stream")
+async def analyze_text_stream(body: AnalyzeTextRequest):
+    """Streaming variant of /analyze-text (same events as /analyze/stream)."""
+    text = body.text.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Text cannot be empty.")
+    set_priority(PRIORITY_INTERACTIVE)
+    _admit_analysis(text)
+    doc = _store_text(text)
+    meta = {"char_count": len(text), "document_id": doc.id, "analysis_id": analysis_key(text)}
+    return _event_stream(_analysis_events(doc, meta))
 
-    if not text or not text.strip():
-        raise HTTPException(status_code=400, detail="No readable text found.")
 
-    try:
-        result = analyze_document(text)
-    except ValueError as e:
-        raise HTTPException(status_code=503, detail=str(e))
+@router.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    """Return a previously computed analysis from the cache."""
+    cached = _cached_or_404(analysis_id)
+    return {"summary": cached.summary.model_dump(), "char_count": len(cached.text), "analysis_id": cached.analysis_id}
+
+
+@router.get("/scheduler/stats")
+async def scheduler_stats():
+    """Per-lane (extract, ocr, llm) concurrency, queue depth by priority, shed counts and queue
+    wait percentiles, for sizing workers and wait budgets."""
+    return get_scheduler().stats()
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and sizes for the analysis cache, the document store and the search index."""
+    index = get_search_index()
+    return {
+        **get_cache().stats(),
+        "document_store": get_document_store().stats(),
+        "search_index": index.stats() if index is not None else None,
+    }
+
+
+def _document_or_404(document_id: str) -> StoredDocument:
+    doc = get_document_store().get(document_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found or expired. Upload it again.")
+    return doc
+
+
+@router.get("/documents/{document_id}")
+async def get_document(document_id: str):
+    """Stored document metadata and the character offset each page starts at."""
+    doc = _document_or_404(document_id)
+    return {**doc.info(), "page_starts": doc.page_starts}
+
+
+@router.get("/documents/{document_id}/text")
+async def get_document_text(
+    document_id: str,
+    page: Optional[int] = Query(None, ge=1, description="1-based page to return"),
+    start: int = Query(0, ge=0, description="First character offset (when no page is given)"),
+    end: Optional[int] = Query(None, ge=0, description="End offset, exclusive"),
+):
+    """A slice of the stored text: one page, or the character range start..end.
+    Slices are capped at DOCUMENT_SLICE_CHARS; follow next_start for the rest."""
+    doc = _document_or_404(document_id)
+    if page is not None:
+        if page > doc.pages:
+            raise HTTPException(status_code=404, detail=f"Document has {doc.pages} pages.")
+        start, end = doc.page_span(page)
+    end = doc.chars if end is None else min(end, doc.chars)
+    start = min(start, end)
+    end = min(end, start + DOCUMENT_SLICE_CHARS)
+    return {
+        "document_id": doc.id,
+        "start": start,
+        "end": end,
+        "page": doc.page_of(start),
+        "pages": doc.pages,
+        "chars": doc.chars,
+        "next_start": end if end < doc.chars else None,
+        "text": get_document_store().text(doc.id, start, end),
+    }
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query("", description='Terms (all must match), "quoted phrases", prefix*, OR'),
+    risk_level: Optional[str] = Query(None, description="Only risks at this level count: high, medium, low"),
+    document_type: Optional[str] = Query(None, description="Substring of the detected document type"),
+    scope: str = Query("all", description="all, text (document text and filename) or risks (flagged risks)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Search analyzed documents by text and flagged risks, best match first. Each hit lists its
+    matching risks (with offsets and pages) and a text snippet. Without q, lists documents
+    matching the filters, newest first."""
+    index = get_search_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Search is disabled (SEARCH_ENABLED=false).")
+    if risk_level and risk_level.lower() not in RISK_LEVELS:
+        raise HTTPException(status_code=400, detail=f"risk_level must be one of: {', '.join(RISK_LEVELS)}")
+    if scope not in SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of: {', '.join(SCOPES)}")
+    return await run_in_threadpool(index.search, q, risk_level, document_type, scope, limit, offset)
+
+
+@router.post("/search/reindex")
+async def search_reindex():
+    """Rebuild the search index from stored documents whose analyses are still cached."""
+    if get_search_index() is None:
+        raise HTTPException(status_code=503, detail="Search is disabled (SEARCH_ENABLED=false).")
+    report = await run_in_threadpool(reindex)
+    return {**vars(report), "index": get_search_index().stats()}
+
 
-    lines = [
-        "# Document Summary",
-        "",
-        "## Key Points",
-        "",
-    ]
-    for bullet in result.summary:
-        lines.append(f"- {bullet}")
-    lines.append("")
-
-    if result.document_type:
-        lines.append(f"**Document type:** {result.document_type}")
-        lines.append("")
-
-    if result.flagged_risks:
-        lines.append("## Flagged Risks")
-        lines.append("")
-        for i, r in enumerate(result.flagged_risks, 1):
-            lines.append(f"### {i}. [{r.risk_level.upper()}] {r.description}")
-            lines.append("")
-            lines.append(f"> {r.clause[:500]}{'...' if len(r.clause) > 500 else ''}")
-            lines.append("")
-
-    content = "\n".join(lines)
-    return PlainTextResponse(
-        content,
-        media_type="text/plain",
-        headers={"Content-Disposition": "attachment; filename=document-summary.txt"},
+@router.post("/export/summary")
+async def export_summary(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    analysis_id: Optional[str] = Form(None),
+):
+    """Analyze document and return summary as downloadable text file.
+    Pass analysis_id from /analyze to reuse the cached result instead of uploading again."""
+    cached = get_cached_analysis(analysis_id) if analysis_id else None
+    if cached is not None:
+        result = cached.summary
+    elif file is None:
+        raise HTTPException(status_code=400, detail="Provide a file or a valid analysis_id.")
+    else:
+        doc = await _extract_upload(file, analyze=True)
+        result = await _export_analysis(doc, doc.text)
+
+    return _export_response(
+        request, summary_export(result), export_etag("summary", result),
+        "text/plain; charset=utf-8", "document-summary.txt",
     )
 
 
 @router.post("/export/from-text")
-async def export_from_text(body: AnalyzeTextRequest):
+async def export_from_text(request: Request, body: AnalyzeTextRequest):
     """Export pasted text as .txt: document with marked risks + key points."""
     text = body.text.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
-    try:
-        result = analyze_document(text)
-    except ValueError as e:
-        raise HTTPException(status_code=503, detail=str(e))
+    set_priority(PRIORITY_INTERACTIVE)
+    _admit_analysis(text)
+    result = await _export_analysis(None, text)
 
-    marked = _mark_risks_in_text(text, result.flagged_risks or [])
-    lines = [
-        "=== DOCUMENT (flagged clauses marked with >> [RISK - level] ... <<) ===",
-        "",
-        marked,
-        "",
-        "",
-        "=== KEY POINTS ===",
-        "",
-    ]
-    for bullet in result.summary or []:
-        lines.append(f"• {bullet}")
-    lines.append("")
-    questions = getattr(result, "questions_to_ask", None) or []
-    if questions:
-        lines.append("=== QUESTIONS TO ASK BEFORE SIGNING ===")
-        lines.append("")
-        for q in questions:
-            lines.append(f"? {q}")
-        lines.append("")
-    if result.document_type:
-        lines.append(f"Document type: {result.document_type}")
-    lines.append("")
-    if result.flagged_risks:
-        lines.append("=== FLAGGED RISKS ===")
-        for i, r in enumerate(result.flagged_risks, 1):
-            lines.append(f"{i}. [{r.risk_level.upper()}] {r.description}")
-            lines.append(f"   Clause: {r.clause[:300]}{'...' if len(r.clause) > 300 else ''}")
-            lines.append("")
-
-    content = "\n".join(lines)
-    return PlainTextResponse(
-        content,
-        media_type="text/plain",
-        headers={"Content-Disposition": "attachment; filename=document-review.txt"},
+    return _export_response(
+        request, text_export(text, result), export_etag("txt", result, text),
+        "text/plain; charset=utf-8", "document-review.txt",
     )
 
 
 @router.post("/export/from-file")
-async def export_from_file(file: UploadFile = File(...)):
-    """Export uploaded file as .html: document with highlighted risks in place + key points at end."""
-    data = await file.read()
-    try:
-        text = extract_text(file.filename or "", data)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    if not text or not text.strip():
-        raise HTTPException(status_code=400, detail="No readable text found.")
-
-    try:
-        result = analyze_document(text)
-    except ValueError as e:
-        raise HTTPException(status_code=503, detail=str(e))
-
-    filename = file.filename or "document"
+async def export_from_file(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    analysis_id: Optional[str] = Form(None),
+):
+    """Export uploaded file as .html: document with highlighted risks in place + key points at end.
+    With a cached analysis_id the stored text and analysis are reused (no extraction or LLM call)."""
+    cached = get_cached_analysis(analysis_id) if analysis_id else None
+    if cached is not None:
+        text, result = cached.text, cached.summary
+    elif file is None:
+        raise HTTPException(status_code=400, detail="Provide a file or a valid analysis_id.")
+    else:
+        doc = await _extract_upload(file, analyze=True)
+        text = doc.text
+        result = await _export_analysis(doc, text)
+
+    filename = (file.filename if file else None) or "document"
+    return _html_export_response(request, text, result, filename)
+
+
+def _html_export_response(request: Request, text: str, result: DocumentSummary, filename: str) -> Response:
     base = filename.rsplit(".", 1)[0] if "." in filename else filename
-    html = _build_html_export(text, result, filename)
+    return _export_response(
+        request, html_export(text, result, filename), export_etag("html", result, text, filename),
+        "text/html; charset=utf-8", f"{base}-review.html",
+    )
 
-    return HTMLResponse(
-        html,
-        headers={"Content-Disposition": f"attachment; filename={base}-review.html"},
+
+@router.get("/export/{analysis_id}.{fmt}")
+async def export_cached(
+    request: Request,
+    analysis_id: str,
+    fmt: str,
+    filename: str = Query("document", max_length=255, description="Document name shown in the HTML export"),
+):
+    """Export a cached analysis without uploading again: .html (risks highlighted in place), .txt
+    (risks marked) or .summary (markdown summary). Clients revalidate with If-None-Match and get
+    304 while the analysis is unchanged."""
+    if fmt not in ("html", "txt", "summary"):
+        raise HTTPException(status_code=404, detail="Export format must be html, txt or summary.")
+    cached = _cached_or_404(analysis_id)
+    text, result = cached.text, cached.summary
+    if fmt == "html":
+        return _html_export_response(request, text, result, filename)
+    if fmt == "txt":
+        return _export_response(
+            request, text_export(text, result), export_etag("txt", result, text),
+            "text/plain; charset=utf-8", "document-review.txt",
+        )
+    return _export_response(
+        request, summary_export(result), export_etag("summary", result),
+        "text/plain; charset=utf-8", "document-summary.txt",
     )
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, File, HTTPException, UploadFile
+
+from app.schemas import JobStatus
+from app.services.extract_text import DocumentTooLarge
+from app.services.jobs import get_store, submit_job
+from app.services.uploads import spool_upload
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(files: list[UploadFile] = File(...)):
+    """Queue many documents for background analysis. Poll GET /api/jobs/{id} for results."""
+    if not files:
+        raise HTTPException(status_code=400, detail="Upload at least one file.")
+    uploads = []
+    try:
+        for f in files:
+            uploads.append(await spool_upload(f))
+    except DocumentTooLarge as e:
+        for u in uploads:
+            u.close()
+        raise HTTPException(status_code=413, detail=f"{f.filename}: {e}")
+    job_id = submit_job(uploads)
+    return get_store().get_job(job_id)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Job status with per-document stage, attempts, errors and results."""
+    job = get_store().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
@@ -9,6 +9,9 @@ class FlaggedRisk(BaseModel):
     clause: str = Field(..., description="The specific text or clause")
     risk_level: str = Field(..., description="low, medium, or high")
     description: str = Field(..., description="Why this may be concerning")
+    start: Optional[int] = Field(None, description="Character offset of the clause in the document text")
+    end: Optional[int] = Field(None, description="End offset of the clause (exclusive)")
+    page: Optional[int] = Field(None, description="1-based page the clause starts on")
 
 
 class DocumentSummary(BaseModel):
@@ -17,14 +20,93 @@ class DocumentSummary(BaseModel):
     document_type: Optional[str] = Field(None, description="Detected document type")
     word_count: int = Field(0)
     questions_to_ask: list[str] = Field(default_factory=list, description="Questions to clarify before signing")
+    prompt_tokens: int = Field(0, description="Document tokens sent to the model after compaction")
+    prompt_tokens_saved: int = Field(0, description="Tokens saved by dropping headers/footers and layout whitespace")
+
+
+class SectionChange(BaseModel):
+    status: str = Field(..., description="modified, added, or removed")
+    heading: str = ""
+    chars: int = Field(0, description="Length of the section in the new version (old version if removed)")
+
+
+class ChangeReport(BaseModel):
+    previous_id: str
+    sections_unchanged: int = 0
+    sections_modified: int = 0
+    sections_added: int = 0
+    sections_removed: int = 0
+    changes: list[SectionChange] = Field(default_factory=list)
+    risks_added: list[FlaggedRisk] = Field(default_factory=list)
+    risks_removed: list[FlaggedRisk] = Field(default_factory=list, description="Risks whose clause is gone")
+    chars_analyzed: int = Field(0, description="Characters sent to the model")
+    chars_total: int = 0
 
 
 class AnalyzeResponse(BaseModel):
     filename: str
-    full_text: str
+    document_id: Optional[str] = Field(None, description="Fetch the text with GET /api/documents/{document_id}/text")
+    pages: int = 0
     summary: DocumentSummary
     char_count: int
+    full_text: Optional[str] = Field(None, description="Only set when requested with include_text")
+    analysis_id: Optional[str] = Field(None, description="Cache id; pass to export endpoints to skip re-analysis")
+    changes: Optional[ChangeReport] = Field(None, description="Set when analyzed as a revision of previous_id")
 
 
 class AnalyzeTextRequest(BaseModel):
     text: str
+    previous_id: Optional[str] = Field(None, description="analysis_id of the previous version of this document")
+
+
+class JobDocument(BaseModel):
+    id: int
+    filename: str
+    status: str = Field(..., description="queued, extracting, analyzing, done, or failed")
+    attempts: int = 0
+    error: Optional[str] = None
+    pages_done: int = Field(0, description="Scanned pages OCR'd so far")
+    pages_total: int = 0
+    char_count: int = 0
+    document_id: Optional[str] = None
+    analysis_id: Optional[str] = None
+    summary: Optional[DocumentSummary] = None
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str = Field(..., description="queued, running, or done")
+    created: float
+    counts: dict[str, int] = Field(default_factory=dict, description="Documents per status")
+    documents: list[JobDocument] = Field(default_factory=list)
+
+
+class SearchRisk(BaseModel):
+    risk_level: str
+    description: str
+    clause: str
+    start: Optional[int] = None
+    page: Optional[int] = None
+    snippet: Optional[str] = Field(None, description="Matching part of the clause, terms in [brackets]")
+
+
+class SearchHit(BaseModel):
+    document_id: str
+    analysis_id: Optional[str] = None
+    filename: str
+    document_type: Optional[str] = None
+    pages: int = 0
+    chars: int = 0
+    risk_counts: dict[str, int] = Field(default_factory=dict)
+    score: float = Field(0.0, description="Relevance (higher is better); 0 when listing without a query")
+    snippet: Optional[str] = Field(None, description="Matching part of the document text")
+    risks: list[SearchRisk] = Field(default_factory=list, description="Flagged risks that match")
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    took_ms: float = 0.0
+    results: list[SearchHit] = Field(default_factory=list)
@@ -0,0 +1,158 @@
+"""
+Production server: one listening socket shared by N preforked uvicorn workers.
+
+    cd backend && python -m app.serve --host 0.0.0.0 --port 8000 --workers 4
+
+The parent imports the app, preloads the parsers, LLM SDK and tokenizer, requeues batch documents
+a previous run left mid-stage, then forks the workers, which start with all of that already in
+memory (shared copy-on-write) instead of importing it again. Each worker warms up before /health
+reports it ready (see app.services.startup). The first worker also runs the batch job queue. A
+worker that dies is replaced (in its slot, so the queue keeps exactly one runner); SIGTERM or SIGINT
+stops the workers gracefully. Nothing that holds a thread, an event loop, a connection or a
+database handle is created before the fork.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from app.config import WEB_CONCURRENCY
+
+# A worker that exits sooner than this after being forked is failing at startup: stop respawning
+_MIN_WORKER_LIFETIME = 5.0
+
+
+def _log(message: str) -> None:
+    print(f"[serve {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(app, sock: socket.socket, args, slot: int) -> None:
+    """Child process: serve on the inherited socket until told to stop."""
+    import uvicorn
+
+    from app.services import startup
+
+    startup.process_started()
+    startup.runs_jobs = slot == 0
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(
+        app,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, args, slot: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _worker(app, sock, args, slot)
+        except BaseException:
+            import traceback
+
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(args) -> int:
+    start = time.perf_counter()
+    from app.config import JOBS_DB, JOBS_DIR
+    from app.main import app
+    from app.services import startup
+    from app.services.jobs import JobStore
+
+    import_s = time.perf_counter() - start
+    startup.preload()
+    # Requeue once here; workers must not requeue documents their siblings are running
+    # (on a connection of its own, closed before forking: SQLite handles must not cross a fork)
+    store = JobStore(JOBS_DB, JOBS_DIR)
+    requeued = store.requeue_interrupted()
+    store.close()
+    startup.preforked = True
+    phases = startup.phases()
+    _log(
+        f"imported app in {import_s:.2f} s, preloaded in {phases['preload']:.2f} s "
+        f"({', '.join(f'{k[8:]} {v:.2f} s' for k, v in phases.items() if k.startswith('preload_'))}); "
+        f"requeued {requeued} job document(s)"
+    )
+
+    sock = _bind(args.host, args.port, args.backlog)
+    _log(f"listening on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    # pid -> (slot, fork time)
+    workers = {_spawn(app, sock, args, slot): (slot, time.monotonic()) for slot in range(args.workers)}
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    code = 0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker = workers.pop(pid, None)
+        if worker is None or stopping:
+            continue
+        slot, started = worker
+        exit_code = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started < _MIN_WORKER_LIFETIME:
+            _log(f"worker {pid} exited with {exit_code} during startup; shutting down")
+            code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        _log(f"worker {pid} exited with {exit_code}; starting a replacement")
+        workers[_spawn(app, sock, args, slot)] = (slot, time.monotonic())
+    sock.close()
+    return code
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="Worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="Seconds to finish requests on shutdown")
+    parser.add_argument("--forwarded-allow-ips", default="127.0.0.1", help="Proxies trusted for X-Forwarded-*")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+    return serve(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
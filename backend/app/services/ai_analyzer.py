@@ -1,39 +1,125 @@
 """
 AI analysis: summary + risk flagging for documents.
 Supports OpenAI and OpenRouter (openrouter.ai) APIs.
+Identical concurrent analyses share one set of LLM calls; short documents arriving close together
+are micro-batched into one multi-document call. Calls that time out or fail with a 5xx are retried
+(on the fallback model when one is configured), and slow calls can be hedged.
 """
+import asyncio
+import contextvars
 import json
-from typing import Optional
+import random
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional
 
 from app.config import (
+    ANALYSIS_CHUNK_CHARS,
+    ANALYSIS_CHUNK_CONCURRENCY,
+    LLM_BATCH_DOC_TOKENS,
+    LLM_BATCH_ENABLED,
+    LLM_BATCH_INTERACTIVE,
+    LLM_BATCH_MAX_DOCS,
+    LLM_BATCH_MAX_TOKENS,
+    LLM_BATCH_WINDOW,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_HEDGE_QUANTILE,
+    LLM_MAX_ATTEMPTS,
+    LLM_RETRY_DELAY,
+    LLM_TIMEOUT,
     OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_FALLBACK_MODEL,
     OPENAI_MODEL,
     OPENROUTER_BASE_URL,
     USE_OPENROUTER,
 )
 from app.schemas import DocumentSummary, FlaggedRisk
-from openai import OpenAI
+from app.services.analysis_cache import CachedAnalysis, cache_key, get_cache
+from app.services.chunking import chunk_text
+from app.services.clause_index import ReusePlan, get_clause_index, scope_key
+from app.services.json_stream import JsonItemStream
+from app.services.metrics import (
+    CLAUSE_CHARS,
+    LLM_BATCH_DOCUMENTS,
+    LLM_CALLS,
+    LLM_EVENTS,
+    PROMPT_TOKENS,
+    record_usage,
+    timed,
+)
+from app.services.microbatch import MicroBatcher
+from app.services.prompt import PreparedPrompt, prepare_prompt
+from app.services.scheduler import PRIORITY_BATCH, Lane, current_priority, get_scheduler
+from app.services.tenants import current_tenant
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# The openai SDK is imported when the first client is created, not with the app
+_client: Optional["OpenAI"] = None
+_async_client: Optional["AsyncOpenAI"] = None
+# Recent non-streaming call latencies; hedging starts once there are enough to take a quantile of
+_latencies: deque[float] = deque(maxlen=200)
+_HEDGE_MIN_SAMPLES = 20
+_batcher: Optional[MicroBatcher] = None
+
 
-_client: Optional[OpenAI] = None
+def _client_kwargs() -> dict:
+    if not OPENAI_API_KEY:
+        raise ValueError(
+            "OPENAI_API_KEY or OPENROUTER_API_KEY is not set. Add it to .env"
+        )
+    # Retries are done here (see _create_async), with backoff and the fallback model
+    kwargs = {"api_key": OPENAI_API_KEY, "timeout": LLM_TIMEOUT, "max_retries": 0}
+    if OPENAI_BASE_URL:
+        kwargs["base_url"] = OPENAI_BASE_URL
+    elif USE_OPENROUTER:
+        kwargs["base_url"] = OPENROUTER_BASE_URL
+    return kwargs
 
 
-def _get_client() -> OpenAI:
+def _get_client() -> "OpenAI":
     global _client
     if _client is None:
-        if not OPENAI_API_KEY:
-            raise ValueError(
-                "OPENAI_API_KEY or OPENROUTER_API_KEY is not set. Add it to .env"
-            )
-        if USE_OPENROUTER:
-            _client = OpenAI(
-                api_key=OPENAI_API_KEY,
-                base_url=OPENROUTER_BASE_URL,
-            )
-        else:
-            _client = OpenAI(api_key=OPENAI_API_KEY)
+        from openai import OpenAI
+
+        _client = OpenAI(**_client_kwargs())
     return _client
 
 
+def _get_async_client() -> "AsyncOpenAI":
+    """Shared async client: one instance keeps a single pooled keep-alive connection pool."""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+
+        _async_client = AsyncOpenAI(**_client_kwargs())
+    return _async_client
+
+
+async def warm_llm_connection() -> str:
+    """Open a pooled connection to the API ahead of the first analysis; any HTTP answer means the
+    connection is up. Returns a short status for startup checks."""
+    if not OPENAI_API_KEY:
+        return "skipped: no API key"
+    from openai import APIStatusError
+
+    try:
+        await _get_async_client().models.list()
+        return "ok"
+    except APIStatusError as e:
+        return f"ok (HTTP {e.status_code})"
+
+
+def _retryable() -> tuple[type[Exception], ...]:
+    """Timeouts (APITimeoutError is an APIConnectionError), connection failures and 5xx responses."""
+    from openai import APIConnectionError, InternalServerError
+
+    return APIConnectionError, InternalServerError
+
+
 SYSTEM_PROMPT = """You are a document review assistant helping users understand long documents before signing.
 
 For each document:
@@ -54,23 +140,618 @@ Respond ONLY with valid JSON:
 
 Be thorough but concise. Flag genuinely concerning clauses, not normal boilerplate."""
 
+# Appended to SYSTEM_PROMPT for micro-batched calls
+BATCH_INSTRUCTIONS = """You will be given several unrelated documents, each between <document id="..."> and </document> tags. Analyze each one on its own, exactly as described above; never mix content between documents.
+
+Respond ONLY with valid JSON: one object mapping every document id to that document's analysis object in the format above:
+{"d1": {"summary": [...], "document_type": "...", "flagged_risks": [...], "questions_to_ask": [...]}, "d2": {...}}"""
+
+
+def analysis_key(text: str, model: Optional[str] = None) -> str:
+    """Content-addressed id for the analysis of `text` with `model` and the current prompt."""
+    return cache_key(text, model or OPENAI_MODEL, SYSTEM_PROMPT)
+
+
+def get_cached_analysis(key: str) -> Optional[CachedAnalysis]:
+    return get_cache().get(key)
+
 
 def analyze_document(text: str, model: Optional[str] = None) -> DocumentSummary:
-    client = _get_client()
     m = model or OPENAI_MODEL
+    key = analysis_key(text, m)
+    cached = get_cache().get(key)
+    if cached is not None:
+        return cached.summary
+    plan = _plan_reuse(text, m)
+    body = plan.prompt_text(text) if plan else text
+    chunks = chunk_text(body, ANALYSIS_CHUNK_CHARS) if len(body) > ANALYSIS_CHUNK_CHARS else []
+    if len(chunks) > 1:
+        # Chunks run concurrently, as on the async path; each call runs in a copy of the caller's
+        # context so its stage timings reach the request
+        workers = max(1, min(ANALYSIS_CHUNK_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _complete, c.text, m, i, len(chunks))
+                for i, c in enumerate(chunks, 1)
+            ]
+            parts = [f.result() for f in futures]
+        with timed("merge"):
+            summary = merge_summaries(parts, text)
+    else:
+        summary = _complete(body, m)
+    summary = _finish_reuse(plan, summary, text, m)
+    get_cache().put(key, text, summary)
+    return summary
+
+
+async def analyze_document_async(text: str, model: Optional[str] = None) -> DocumentSummary:
+    """Non-blocking analyze_document; calls wait for a slot in the scheduler's LLM lane.
+    Documents longer than ANALYSIS_CHUNK_CHARS are analyzed chunk-by-chunk in parallel and merged.
+    Identical concurrent requests share one analysis (see _Flight)."""
+    m = model or OPENAI_MODEL
+    key = analysis_key(text, m)
+    cached = get_cache().get(key)
+    if cached is not None:
+        return cached.summary
+    return await _join_flight(key, lambda: _analysis_items(text, m, key)).result()
+
+
+async def _analysis_items(text: str, m: str, key: str) -> AsyncIterator[tuple[str, Any]]:
+    """Flight producer for analyze_document_async: non-streaming calls (hedged, with fallback),
+    then the summary's items and ("done", summary)."""
+    plan = await asyncio.to_thread(_plan_reuse, text, m)
+    body = plan.prompt_text(text) if plan else text
+    chunks = chunk_text(body, ANALYSIS_CHUNK_CHARS) if len(body) > ANALYSIS_CHUNK_CHARS else []
+    if len(chunks) > 1:
+        limit = asyncio.Semaphore(ANALYSIS_CHUNK_CONCURRENCY)
+
+        async def run(i, chunk):
+            async with limit:
+                return await _complete_async(chunk.text, m, i, len(chunks))
+
+        parts = await asyncio.gather(*(run(i, c) for i, c in enumerate(chunks, 1)))
+        with timed("merge"):
+            summary = merge_summaries(list(parts), text)
+    else:
+        summary = await _complete_async(body, m)
+    summary = await asyncio.to_thread(_finish_reuse, plan, summary, text, m)
+    get_cache().put(key, text, summary)
+    for item in _summary_items(summary):
+        yield item
+    yield "done", summary
+
+
+async def analyze_excerpt_async(
+    text: str, model: Optional[str] = None, preface: Optional[str] = None
+) -> DocumentSummary:
+    """Analyze part of a document (e.g. the changed sections of a revision). Bypasses the analysis
+    cache and clause index, which hold whole-document results. preface is prepended to the prompt."""
+    m = model or OPENAI_MODEL
+    chunks = chunk_text(text, ANALYSIS_CHUNK_CHARS) if len(text) > ANALYSIS_CHUNK_CHARS else []
+    if len(chunks) <= 1:
+        return await _complete_async(text, m, preface=preface)
+    limit = asyncio.Semaphore(ANALYSIS_CHUNK_CONCURRENCY)
+
+    async def run(i, chunk):
+        async with limit:
+            return await _complete_async(chunk.text, m, i, len(chunks), preface)
+
+    parts = await asyncio.gather(*(run(i, c) for i, c in enumerate(chunks, 1)))
+    with timed("merge"):
+        return merge_summaries(list(parts), text)
+
+
+async def stream_analysis(text: str, model: Optional[str] = None) -> AsyncIterator[tuple[str, Any]]:
+    """Yield (key, value) as each summary bullet, flagged risk, question or document_type is
+    completed by the model, then ("done", DocumentSummary). Keys match DocumentSummary fields."""
+    m = model or OPENAI_MODEL
+    key = analysis_key(text, m)
+    cached = get_cache().get(key)
+    if cached is not None:
+        for item in _summary_items(cached.summary):
+            yield item
+        yield "done", cached.summary
+        return
+    async for item in _join_flight(key, lambda: _stream_items(text, m, key)).follow():
+        yield item
+
+
+async def _stream_items(text: str, m: str, key: str) -> AsyncIterator[tuple[str, Any]]:
+    """Flight producer for stream_analysis: items as the model completes them."""
+    plan = await asyncio.to_thread(_plan_reuse, text, m)
+    # Verdicts reused from the clause index are known up front
+    for r in plan.cached_risks if plan else []:
+        yield "flagged_risks", r.model_dump()
+
+    body = plan.prompt_text(text) if plan else text
+    chunks = chunk_text(body, ANALYSIS_CHUNK_CHARS) if len(body) > ANALYSIS_CHUNK_CHARS else []
+    if len(chunks) > 1:
+        # Chunks run concurrently; each chunk's items are sent as soon as that chunk finishes
+        limit = asyncio.Semaphore(ANALYSIS_CHUNK_CONCURRENCY)
+
+        async def run(i, chunk):
+            async with limit:
+                return await _complete_async(chunk.text, m, i, len(chunks))
+
+        parts = []
+        for fut in asyncio.as_completed([run(i, c) for i, c in enumerate(chunks, 1)]):
+            part = await fut
+            parts.append(part)
+            for item in _summary_items(part):
+                yield item
+        with timed("merge"):
+            summary = merge_summaries(parts, text)
+    else:
+        parser = JsonItemStream()
+        client = _get_async_client()
+        prompt = _prepare(body)
+        async with _llm_slot(prompt):
+            LLM_CALLS.inc(1, "stream")
+            with timed("llm"):
+                # Retried / switched to the fallback model only until the stream has started
+                stream = await _create_async(
+                    client,
+                    m,
+                    hedge=False,
+                    messages=_build_messages(prompt),
+                    temperature=0.2,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for event in stream:
+                    # With include_usage the final event has no choices, only token counts
+                    record_usage(getattr(event, "usage", None))
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content or ""
+                    for item in parser.feed(delta):
+                        yield item
+        with timed("parse"):
+            summary = _with_prompt_stats(_parse_summary(parser.text, body), prompt)
+    summary = await asyncio.to_thread(_finish_reuse, plan, summary, text, m)
+    get_cache().put(key, text, summary)
+    yield "done", summary
+
+
+def _plan_reuse(text: str, model: str) -> Optional[ReusePlan]:
+    """Look the document's sections up in the tenant's clause index (None when the index is
+    disabled). CPU-bound on long documents: the async paths run it in a thread."""
+    index = get_clause_index()
+    if index is None:
+        return None
+    with timed("clause_index"):
+        plan = index.plan(text, scope_key(model, SYSTEM_PROMPT, current_tenant()))
+    CLAUSE_CHARS.inc(plan.reused_chars, "reused")
+    CLAUSE_CHARS.inc(len(text) - plan.reused_chars, "novel")
+    return plan
+
+
+def _finish_reuse(
+    plan: Optional[ReusePlan], summary: DocumentSummary, text: str, model: str
+) -> DocumentSummary:
+    """Merge reused verdicts into the model's analysis and index the newly analyzed sections
+    (CPU-bound like _plan_reuse)."""
+    if plan is None:
+        return summary
+    if plan.matches:
+        summary = plan.merge(summary, text)
+    with timed("clause_index"):
+        get_clause_index().record(plan, summary, text, scope_key(model, SYSTEM_PROMPT, current_tenant()))
+    return summary
+
+
+def _summary_items(summary: DocumentSummary):
+    for bullet in summary.summary:
+        yield "summary", bullet
+    if summary.document_type:
+        yield "document_type", summary.document_type
+    for r in summary.flagged_risks:
+        yield "flagged_risks", r.model_dump()
+    for q in summary.questions_to_ask:
+        yield "questions_to_ask", q
+
+
+def _complete(text: str, model: str, part: int = 0, parts: int = 0) -> DocumentSummary:
+    prompt = _prepare(text)
+    messages = _build_messages(prompt, part, parts)
+    LLM_CALLS.inc(1, "sync")
+    with timed("llm"):
+        response = _create(_get_client(), model, messages=messages, temperature=0.2)
+    record_usage(response.usage)
+    with timed("parse"):
+        return _with_prompt_stats(_parse_summary(response.choices[0].message.content, text), prompt)
+
+
+async def _complete_async(
+    text: str, model: str, part: int = 0, parts: int = 0, preface: Optional[str] = None
+) -> DocumentSummary:
+    prompt = _prepare(text)
+    if parts <= 1 and not preface and _batchable(prompt):
+        # Documents of different tenants never share a prompt
+        return await _get_batcher().submit((model, current_tenant()), (text, prompt), prompt.tokens)
+    return await _complete_prompt(prompt, text, model, part, parts, preface)
+
+
+def _batchable(prompt: PreparedPrompt) -> bool:
+    if not LLM_BATCH_ENABLED or prompt.tokens > LLM_BATCH_DOC_TOKENS:
+        return False
+    return LLM_BATCH_INTERACTIVE or current_priority() >= PRIORITY_BATCH
+
+
+async def _complete_prompt(
+    prompt: PreparedPrompt, text: str, model: str, part: int = 0, parts: int = 0, preface: Optional[str] = None
+) -> DocumentSummary:
+    messages = _build_messages(prompt, part, parts, preface)
+    client = _get_async_client()
+    async with _llm_slot(prompt):
+        LLM_CALLS.inc(1, "async")
+        with timed("llm"):
+            response = await _create_async(client, model, messages=messages, temperature=0.2)
+    record_usage(response.usage)
+    with timed("parse"):
+        return _with_prompt_stats(_parse_summary(response.choices[0].message.content, text), prompt)
+
+
+def _get_batcher() -> MicroBatcher:
+    """The micro-batcher for the running event loop (batches are kept per model and tenant). With
+    a free LLM slot and nothing else batching, a document is sent without waiting."""
+    global _batcher
+    if _batcher is None or _batcher.loop is not asyncio.get_running_loop():
+        _batcher = MicroBatcher(
+            _send_batch, LLM_BATCH_WINDOW, LLM_BATCH_MAX_DOCS, LLM_BATCH_MAX_TOKENS,
+            idle=get_scheduler().lane("llm").has_capacity,
+        )
+    return _batcher
+
+
+async def _send_batch(key: tuple[str, str], docs: list[tuple[str, PreparedPrompt]]) -> list:
+    """Micro-batcher send: one call for several short documents, its keyed answer split back into
+    a summary per document. A lone document is sent as usual, and a document the answer leaves
+    out (or garbles) is sent again on its own."""
+    model = key[0]
+    if len(docs) == 1:
+        text, prompt = docs[0]
+        return [await _complete_prompt(prompt, text, model)]
+    LLM_BATCH_DOCUMENTS.observe(len(docs))
+    LLM_EVENTS.inc(len(docs), "batched")
+    ids = [f"d{i}" for i in range(1, len(docs) + 1)]
+    client = _get_async_client()
+    async with get_scheduler().lane("llm").slot(sum(p.tokens for _, p in docs), shed=False):
+        LLM_CALLS.inc(1, "batch")
+        with timed("llm"):
+            response = await _create_async(
+                client, model, messages=_build_batch_messages(ids, [p for _, p in docs]), temperature=0.2
+            )
+    record_usage(response.usage)
 
-    response = client.chat.completions.create(
-        model=m,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"Analyze this document:\n\n{text[:120000]}"},
-        ],
-        temperature=0.2,
+    results: list = []
+    with timed("parse"):
+        try:
+            answers = _parse_json(response.choices[0].message.content)
+        except ValueError:
+            answers = {}
+        for doc_id, (text, prompt) in zip(ids, docs):
+            raw = answers.get(doc_id) if isinstance(answers, dict) else None
+            try:
+                results.append(_with_prompt_stats(_summary_from_raw(raw, text), prompt))
+            except (ValueError, TypeError, AttributeError):
+                results.append(None)
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        LLM_EVENTS.inc(len(missing), "unbatched")
+        retried = await asyncio.gather(
+            *(_complete_prompt(docs[i][1], docs[i][0], model) for i in missing), return_exceptions=True
+        )
+        for i, r in zip(missing, retried):
+            results[i] = r
+    return results
+
+
+class _Flight:
+    """One analysis shared by every identical request that arrives while it runs. The producer runs
+    in its own task, so a caller that disconnects does not cancel it for the others; followers
+    replay the items produced so far, then receive the rest as they come."""
+
+    def __init__(self, producer: AsyncIterator[tuple[str, Any]]):
+        self.items: list[tuple[str, Any]] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run(producer))
+
+    async def _run(self, producer: AsyncIterator[tuple[str, Any]]) -> None:
+        try:
+            async for item in producer:
+                self.items.append(item)
+                self._notify()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[tuple[str, Any]]:
+        i = 0
+        while True:
+            while i < len(self.items):
+                yield self.items[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    async def result(self) -> DocumentSummary:
+        async for key, value in self.follow():
+            if key == "done":
+                return value
+        raise RuntimeError("Analysis ended without a result")
+
+
+_flights: dict[str, _Flight] = {}
+
+
+def _join_flight(key: str, producer: Callable[[], AsyncIterator[tuple[str, Any]]]) -> _Flight:
+    """The running analysis for `key`, or a new one started from producer()."""
+    flight = _flights.get(key)
+    if flight is not None and not flight.done and flight.loop is asyncio.get_running_loop():
+        LLM_EVENTS.inc(1, "coalesced")
+        return flight
+    flight = _Flight(producer())
+    _flights[key] = flight
+    flight.task.add_done_callback(lambda _: _flights.pop(key) if _flights.get(key) is flight else None)
+    return flight
+
+
+def _models(model: str) -> list[str]:
+    """Model for each attempt: the requested one, then the fallback (the same model without one)."""
+    return [model] + [OPENAI_FALLBACK_MODEL or model] * (LLM_MAX_ATTEMPTS - 1)
+
+
+def _backoff(attempt: int, model: str, first: str) -> float:
+    """Count a retry and return its delay: full jitter over an exponentially growing window."""
+    LLM_EVENTS.inc(1, "retried")
+    if model != first:
+        LLM_EVENTS.inc(1, "fallback")
+    return random.uniform(0, LLM_RETRY_DELAY * 2 ** (attempt - 1))
+
+
+def _create(client: "OpenAI", model: str, **kwargs):
+    """chat.completions.create, retried on timeouts, connection errors and 5xx."""
+    models = _models(model)
+    for attempt, m in enumerate(models):
+        if attempt:
+            time.sleep(_backoff(attempt, m, model))
+        try:
+            return client.chat.completions.create(model=m, **kwargs)
+        except _retryable():
+            if attempt == len(models) - 1:
+                raise
+
+
+async def _create_async(client: "AsyncOpenAI", model: str, hedge: bool = True, **kwargs):
+    """Async _create; non-streaming calls are also hedged (see _hedged). A stream is only retried
+    until it has been opened."""
+    models = _models(model)
+    for attempt, m in enumerate(models):
+        if attempt:
+            await asyncio.sleep(_backoff(attempt, m, model))
+        try:
+            if hedge:
+                return await _hedged(client, m, kwargs)
+            return await _call(client, m, kwargs)
+        except _retryable():
+            if attempt == len(models) - 1:
+                raise
+
+
+async def _call(client: "AsyncOpenAI", model: str, kwargs: dict):
+    start = time.monotonic()
+    response = await client.chat.completions.create(model=model, **kwargs)
+    if not kwargs.get("stream"):
+        _latencies.append(time.monotonic() - start)
+    return response
+
+
+def _hedge_delay() -> Optional[float]:
+    """Seconds after which a call is hedged: the LLM_HEDGE_QUANTILE of recent latencies."""
+    if LLM_HEDGE_QUANTILE <= 0 or len(_latencies) < _HEDGE_MIN_SAMPLES:
+        return None
+    ordered = sorted(_latencies)
+    return max(LLM_HEDGE_MIN_DELAY, ordered[min(len(ordered) - 1, int(LLM_HEDGE_QUANTILE * len(ordered)))])
+
+
+async def _hedged(client: "AsyncOpenAI", model: str, kwargs: dict):
+    """Send the call; if it is still running after the hedge delay and an LLM slot is free, send a
+    duplicate in that slot. The first success wins and the other call is cancelled."""
+    delay = _hedge_delay()
+    if delay is None:
+        return await _call(client, model, kwargs)
+    primary = asyncio.ensure_future(_call(client, model, kwargs))
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        lane = get_scheduler().lane("llm")
+        if done or not lane.has_capacity():
+            return await primary
+        LLM_EVENTS.inc(1, "hedged")
+        hedge = asyncio.ensure_future(_hedge_call(lane, client, model, kwargs))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        LLM_EVENTS.inc(1, "hedge_won")
+                    return task.result()
+        return primary.result()  # both failed: raise the original call's error
+    finally:
+        for task in (primary, hedge):
+            if task is not None:
+                task.cancel()
+
+
+async def _hedge_call(lane: Lane, client: "AsyncOpenAI", model: str, kwargs: dict):
+    async with lane.slot(shed=False):
+        return await _call(client, model, kwargs)
+
+
+def _llm_slot(prompt: PreparedPrompt):
+    """A slot in the scheduler's LLM lane; shorter prompts go first. Requests are admitted (or
+    refused) before their first call, so the calls themselves wait rather than fail."""
+    return get_scheduler().lane("llm").slot(prompt.tokens, shed=False)
+
+
+def _prepare(text: str) -> PreparedPrompt:
+    """Compact the text to the prompt token budget and count what that saved."""
+    with timed("prompt"):
+        prompt = prepare_prompt(text)
+    PROMPT_TOKENS.inc(prompt.original_tokens, "original")
+    PROMPT_TOKENS.inc(prompt.tokens, "sent")
+    return prompt
+
+
+def _with_prompt_stats(summary: DocumentSummary, prompt: PreparedPrompt) -> DocumentSummary:
+    summary.prompt_tokens = prompt.tokens
+    summary.prompt_tokens_saved = prompt.tokens_saved
+    return summary
+
+
+def _build_messages(
+    prompt: PreparedPrompt, part: int = 0, parts: int = 0, preface: Optional[str] = None
+) -> list[dict]:
+    if parts > 1:
+        intro = (
+            f"Analyze this document excerpt (part {part} of {parts}; the other parts are "
+            "analyzed separately, so cover only what is in this part):"
+        )
+    else:
+        intro = "Analyze this document:"
+    if preface:
+        intro = f"{preface} {intro}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{intro}\n\n{prompt.text}"},
+    ]
+
+
+def _build_batch_messages(ids: list[str], prompts: list[PreparedPrompt]) -> list[dict]:
+    documents = "\n\n".join(
+        f'<document id="{doc_id}">\n{p.text.replace("</document>", "</ document>")}\n</document>'
+        for doc_id, p in zip(ids, prompts)
+    )
+    return [
+        {"role": "system", "content": f"{SYSTEM_PROMPT}\n\n{BATCH_INSTRUCTIONS}"},
+        {"role": "user", "content": f"Analyze these {len(ids)} documents:\n\n{documents}"},
+    ]
+
+
+_RISK_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+
+def _norm(s: str) -> str:
+    return " ".join((s or "").lower().split())
+
+
+def _dedupe(items: list[str], limit: int) -> list[str]:
+    seen, out = set(), []
+    for item in items:
+        k = _norm(item)
+        if k and k not in seen:
+            seen.add(k)
+            out.append(item)
+    return out[:limit]
+
+
+def _interleave(lists: list[list[str]]) -> list[str]:
+    """Round-robin so every chunk contributes its top bullets before any contributes its tail."""
+    out = []
+    for i in range(max((len(x) for x in lists), default=0)):
+        out.extend(x[i] for x in lists if i < len(x))
+    return out
+
+
+def merge_summaries(parts: list[DocumentSummary], text: str) -> DocumentSummary:
+    """Reduce per-chunk analyses into one. Risks quoting the same (or a contained) clause are
+    merged, keeping the longer quote and the higher risk level."""
+    risks: list[FlaggedRisk] = []
+    for r in (r for p in parts for r in p.flagged_risks):
+        clause = _norm(r.clause)
+        for i, kept in enumerate(risks):
+            other = _norm(kept.clause)
+            if clause and (clause in other or other in clause):
+                longer = r if len(clause) > len(other) else kept
+                level = max(r.risk_level, kept.risk_level, key=lambda lv: _RISK_ORDER.get(lv, 0))
+                risks[i] = FlaggedRisk(clause=longer.clause, risk_level=level, description=longer.description)
+                break
+        else:
+            risks.append(r)
+
+    types = [p.document_type for p in parts if p.document_type and p.document_type.lower() != "unknown"]
+    return DocumentSummary(
+        summary=_dedupe(_interleave([p.summary for p in parts]), 20),
+        flagged_risks=risks,
+        document_type=Counter(types).most_common(1)[0][0] if types else (parts[0].document_type if parts else None),
+        word_count=len(text.split()),
+        questions_to_ask=_dedupe(_interleave([p.questions_to_ask for p in parts]), 10),
+        prompt_tokens=sum(p.prompt_tokens for p in parts),
+        prompt_tokens_saved=sum(p.prompt_tokens_saved for p in parts),
     )
 
-    content = response.choices[0].message.content
-    raw = json.loads(content)
 
+def merge_revision(
+    previous: DocumentSummary, changes: Optional[DocumentSummary], text: str
+) -> tuple[DocumentSummary, list[FlaggedRisk], list[FlaggedRisk]]:
+    """Fold the analysis of a revision's changed sections into the previous version's summary.
+    Previous risks whose clause no longer appears in `text` are dropped; a clause flagged again
+    takes the new verdict. Returns (summary, risks_added, risks_removed)."""
+    haystack = _norm(text)
+    fresh = list(changes.flagged_risks) if changes else []
+    fresh_clauses = {_norm(r.clause) for r in fresh}
+    previous_clauses = {_norm(r.clause) for r in previous.flagged_risks}
+    kept, removed = [], []
+    for r in previous.flagged_risks:
+        clause = _norm(r.clause)
+        if clause and clause not in haystack:
+            removed.append(r)
+        elif clause not in fresh_clauses:
+            kept.append(r)
+    added = [r for r in fresh if _norm(r.clause) not in previous_clauses]
+
+    new_bullets = changes.summary if changes else []
+    new_questions = changes.questions_to_ask if changes else []
+    summary = DocumentSummary(
+        # Bullets about the changed sections first: they describe the terms that moved
+        summary=_dedupe(new_bullets + previous.summary, 20),
+        flagged_risks=fresh + kept,
+        document_type=previous.document_type or (changes.document_type if changes else None),
+        word_count=len(text.split()),
+        questions_to_ask=_dedupe(new_questions + previous.questions_to_ask, 10),
+        prompt_tokens=changes.prompt_tokens if changes else 0,
+        prompt_tokens_saved=changes.prompt_tokens_saved if changes else 0,
+    )
+    return summary, added, removed
+
+
+def _parse_json(content: str) -> Any:
+    content = content.strip()
+    if not content.startswith("{") and "{" in content:
+        # Tolerate a ```json fence or preamble around the object
+        content = content[content.index("{"):content.rindex("}") + 1]
+    return json.loads(content)
+
+
+def _parse_summary(content: str, text: str) -> DocumentSummary:
+    return _summary_from_raw(_parse_json(content), text)
+
+
+def _summary_from_raw(raw: dict, text: str) -> DocumentSummary:
     risks = [
         FlaggedRisk(
             clause=r.get("clause", ""),
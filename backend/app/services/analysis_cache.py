@@ -0,0 +1,205 @@
+"""
+Content-addressed cache for document analyses.
+Entries are keyed by a hash of the normalized text, the model and the system prompt.
+An in-memory LRU tier sits in front of an optional SQLite tier with TTL and size eviction.
+(Extracted text lives in the document store, keyed by the upload's content hash.)
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import (
+    ANALYSIS_CACHE_DB,
+    ANALYSIS_CACHE_MAX_MB,
+    ANALYSIS_CACHE_SIZE,
+    ANALYSIS_CACHE_TTL,
+)
+from app.schemas import DocumentSummary
+
+
+@dataclass
+class CachedAnalysis:
+    analysis_id: str
+    text: str
+    summary: DocumentSummary
+    created: float
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so layout-only differences map to the same key."""
+    return " ".join((text or "").split())
+
+
+def cache_key(text: str, model: str, prompt: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, prompt, normalize_text(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        max_items: int = 128,
+        db_path: str = "",
+        ttl: int = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, CachedAnalysis]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analyses_accessed ON analyses(accessed)")
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[CachedAnalysis]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry.created):
+                    del self._memory[key]
+                else:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry
+            entry = self._disk_get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._memory_put(entry)
+            return entry
+
+    def peek(self, key: str) -> Optional[CachedAnalysis]:
+        """Like get, from either tier, but without promoting the entry or counting a hit: for
+        bulk readers (search reindex) that must not flush the working set out of memory."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry.created):
+                return entry
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT payload, created FROM analyses WHERE key = ?", (key,)).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        raw = json.loads(row[0])
+        return CachedAnalysis(
+            analysis_id=key, text=raw["text"], summary=DocumentSummary.model_validate(raw["summary"]), created=row[1]
+        )
+
+    def put(self, key: str, text: str, summary: DocumentSummary) -> CachedAnalysis:
+        entry = CachedAnalysis(analysis_id=key, text=text, summary=summary, created=time.time())
+        with self._lock:
+            self._memory_put(entry)
+            self._disk_put(entry)
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                row = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses").fetchone()
+                out["disk_entries"], out["disk_bytes"] = row
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM analyses")
+                self._db.commit()
+
+    def _memory_put(self, entry: CachedAnalysis) -> None:
+        self._memory[entry.analysis_id] = entry
+        self._memory.move_to_end(entry.analysis_id)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[CachedAnalysis]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT payload, created FROM analyses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        payload, created = row
+        if self._expired(created):
+            self._db.execute("DELETE FROM analyses WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE analyses SET accessed = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        raw = json.loads(payload)
+        return CachedAnalysis(
+            analysis_id=key,
+            text=raw["text"],
+            summary=DocumentSummary.model_validate(raw["summary"]),
+            created=created,
+        )
+
+    def _disk_put(self, entry: CachedAnalysis) -> None:
+        if self._db is None:
+            return
+        payload = json.dumps({"text": entry.text, "summary": entry.summary.model_dump()})
+        self._db.execute(
+            "INSERT OR REPLACE INTO analyses (key, payload, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (entry.analysis_id, payload, len(payload), entry.created, entry.created),
+        )
+        self._evict_disk("analyses")
+        self._db.commit()
+
+    def _evict_disk(self, table: str) -> None:
+        """Drop expired rows, then least recently used rows until the table fits max_bytes."""
+        if self.ttl > 0:
+            cur = self._db.execute(f"DELETE FROM {table} WHERE created < ?", (time.time() - self.ttl,))
+            self._stats["evictions"] += cur.rowcount
+        total = self._db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(f"SELECT key, size FROM {table} ORDER BY accessed ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+
+_cache: Optional[AnalysisCache] = None
+
+
+def get_cache() -> AnalysisCache:
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache(
+            max_items=ANALYSIS_CACHE_SIZE,
+            db_path=ANALYSIS_CACHE_DB,
+            ttl=ANALYSIS_CACHE_TTL,
+            max_bytes=ANALYSIS_CACHE_MAX_MB * 1024 * 1024,
+        )
+    return _cache
@@ -0,0 +1,91 @@
+"""
+Split long documents into sections on heading boundaries and pack them into chunks.
+Used by the chunked (map-reduce) analysis mode.
+"""
+import re
+from dataclasses import dataclass
+
+# Lines that start a new section: "ARTICLE IV", "Section 12.3 Fees", "7. Termination",
+# "EXHIBIT B", or short all-caps headings like "LIMITATION OF LIABILITY"
+_HEADING_RE = re.compile(
+    r"^(?:"
+    r"(?:ARTICLE|Article|SECTION|Section|EXHIBIT|Exhibit|SCHEDULE|Schedule|APPENDIX|Appendix|ANNEX|Annex)"
+    r"\s+[0-9IVXLCA-Z][\w.\-]*\b.{0,80}"
+    r"|\d{1,3}(?:\.\d{1,3})*\.?\s+[A-Z].{0,80}"
+    r"|[A-Z][A-Z0-9 ,&'()/\-]{3,80}"
+    r")$"
+)
+
+
+@dataclass
+class Section:
+    start: int
+    end: int
+    heading: str
+
+
+@dataclass
+class Chunk:
+    start: int
+    end: int
+    text: str
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip()
+    return 0 < len(stripped) <= 100 and bool(_HEADING_RE.match(stripped))
+
+
+def split_sections(text: str) -> list[Section]:
+    """Split text at heading lines. Sections cover the whole text with no gaps."""
+    starts = [0]
+    heading_at = {0: ""}
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        if pos > 0 and _is_heading(line):
+            starts.append(pos)
+            heading_at[pos] = line.strip()
+        elif pos == 0 and _is_heading(line):
+            heading_at[0] = line.strip()
+        pos += len(line)
+    starts.append(len(text))
+    return [
+        Section(start=a, end=b, heading=heading_at[a])
+        for a, b in zip(starts, starts[1:])
+        if b > a
+    ]
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Break an oversized span at paragraph, then line, then hard boundaries."""
+    spans = []
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = text.rfind("\n\n", start + max_chars // 2, limit)
+        if cut == -1:
+            cut = text.rfind("\n", start + max_chars // 2, limit)
+        cut = limit if cut == -1 else cut + 1
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, end))
+    return spans
+
+
+def chunk_text(text: str, max_chars: int) -> list[Chunk]:
+    """Pack consecutive sections into chunks of at most max_chars characters."""
+    spans: list[tuple[int, int]] = []
+    for s in split_sections(text):
+        spans.extend(_split_long(text, s.start, s.end, max_chars))
+
+    chunks: list[Chunk] = []
+    cur_start = cur_end = None
+    for a, b in spans:
+        if cur_start is not None and b - cur_start > max_chars:
+            chunks.append(Chunk(cur_start, cur_end, text[cur_start:cur_end]))
+            cur_start = None
+        if cur_start is None:
+            cur_start = a
+        cur_end = b
+    if cur_start is not None:
+        chunks.append(Chunk(cur_start, cur_end, text[cur_start:cur_end]))
+    return [c for c in chunks if c.text.strip()]
@@ -0,0 +1,369 @@
+"""
+Clause fingerprint index: reuse risk verdicts for sections seen in earlier documents of the same
+tenant. Each section of an analyzed document is fingerprinted (word shingles -> one-permutation
+MinHash) and stored in SQLite with the risks the model flagged in it, including "no risks". When a
+new document arrives, a section that matches a stored one keeps that verdict and is left out of
+the prompt. A match is either exact (after whitespace and case normalization) or differs only by
+short edits that touch no negation, modal verb, number or proper noun: changing "shall not" to
+"may", an amount, a date or a party can change the verdict. Only section verdicts are reused; the
+summary is always written by the model from this document. Least recently matched sections are
+dropped beyond a size cap.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from difflib import SequenceMatcher
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import (
+    CLAUSE_INDEX_DB,
+    CLAUSE_INDEX_ENABLED,
+    CLAUSE_INDEX_MAX_MB,
+    CLAUSE_MAX_EDIT_WORDS,
+    CLAUSE_MATCH_THRESHOLD,
+    CLAUSE_MIN_CHARS,
+    CLAUSE_UNIT_CHARS,
+)
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services.chunking import split_sections
+from app.services.highlight import MIN_CLAUSE_CHARS, find_clause_spans, normalize_clause
+
+SHINGLE_WORDS = 5
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+_EMPTY = 0xFFFFFFFF
+
+# Words whose change can flip a verdict: negations, modal verbs and number words. Changed words
+# with a digit or a capital letter (amounts, dates, defined terms, parties) count as well
+_SENSITIVE_WORDS = frozenset(
+    """not no nor never neither none nothing without except unless cannot can't won't don't doesn't
+    shan't isn't aren't non shall may must will should would could might can need needs required
+    require requires optional only solely sole exclusive exclusively all any each every
+    zero one two three four five six seven eight nine ten eleven twelve fifteen twenty thirty forty
+    fifty sixty ninety hundred thousand million billion half double first second third""".split()
+)
+_TOKEN_EDGES = re.compile(r"^\W+|\W+$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clause_units (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    heading TEXT NOT NULL,
+    words TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    risks TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clause_units_accessed ON clause_units(accessed);
+CREATE TABLE IF NOT EXISTS clause_unit_bands (
+    scope TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    unit_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clause_unit_bands_lookup ON clause_unit_bands(scope, band, hash);
+CREATE INDEX IF NOT EXISTS clause_unit_bands_unit ON clause_unit_bands(unit_id);
+"""
+
+
+@dataclass
+class Unit:
+    start: int
+    end: int
+    heading: str
+    text: str
+    signature: Optional[array] = None  # None for units too short to fingerprint
+
+
+@dataclass
+class Match:
+    section_id: int
+    similarity: float
+    risks: list[FlaggedRisk]
+
+
+@dataclass
+class ReusePlan:
+    """What to send to the model for a document, and which verdicts are already known."""
+
+    units: list[Unit]
+    matches: dict[int, Match] = field(default_factory=dict)  # unit index -> match
+
+    @property
+    def cached_risks(self) -> list[FlaggedRisk]:
+        return [r for i in sorted(self.matches) for r in self.matches[i].risks]
+
+    @property
+    def reused_chars(self) -> int:
+        return sum(len(self.units[i].text) for i in self.matches)
+
+    def prompt_text(self, text: str) -> str:
+        """The document with matched sections replaced by a one-line placeholder."""
+        if not self.matches:
+            return text
+        parts = []
+        for i, unit in enumerate(self.units):
+            if i in self.matches:
+                label = unit.heading or "Untitled section"
+                parts.append(f"[{label}: standard clause reviewed previously, omitted]\n\n")
+            else:
+                parts.append(unit.text)
+        return "".join(parts)
+
+    def merge(self, summary: DocumentSummary, text: str) -> DocumentSummary:
+        """Add the reused verdicts to the model's analysis of the novel sections."""
+        seen = {normalize_clause(r.clause).lower() for r in summary.flagged_risks}
+        extra = [r for r in self.cached_risks if normalize_clause(r.clause).lower() not in seen]
+        return summary.model_copy(
+            update={"flagged_risks": list(summary.flagged_risks) + extra, "word_count": len(text.split())}
+        )
+
+
+def _shingle_hashes(text: str) -> set[int]:
+    words = normalize_clause(text).lower().split()
+    if len(words) < SHINGLE_WORDS:
+        words = [" ".join(words)] if words else []
+        span = 1
+    else:
+        span = SHINGLE_WORDS
+    out = set()
+    for i in range(len(words) - span + 1):
+        data = " ".join(words[i:i + span]).encode("utf-8")
+        out.add((zlib.crc32(data) << 32) | zlib.crc32(data, 0x9747B28C))
+    return out
+
+
+def signature(text: str) -> array:
+    """One-permutation MinHash: each shingle hash lands in one of NUM_HASHES bins and each bin keeps
+    its minimum. Empty bins borrow from the next non-empty bin so short texts still compare."""
+    sig = array("I", [_EMPTY] * NUM_HASHES)
+    for h in _shingle_hashes(text):
+        b = h % NUM_HASHES
+        v = (h >> 8) & 0xFFFFFFFE
+        if v < sig[b]:
+            sig[b] = v
+    filled = [i for i in range(NUM_HASHES) if sig[i] != _EMPTY]
+    if filled and len(filled) < NUM_HASHES:
+        for i in range(NUM_HASHES):
+            if sig[i] == _EMPTY:
+                j = next((f for f in filled if f > i), filled[0])
+                sig[i] = (sig[j] + (j - i) % NUM_HASHES) & 0xFFFFFFFF
+    return sig
+
+
+def similarity(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+
+def _bands(sig: array) -> list[int]:
+    return [zlib.crc32(sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+
+def split_units(text: str, max_chars: int = CLAUSE_UNIT_CHARS) -> list[Unit]:
+    """Sections on heading boundaries; long sections are split further at blank lines."""
+    units = []
+    for s in split_sections(text):
+        start = s.start
+        heading = s.heading
+        while s.end - start > max_chars:
+            cut = text.rfind("\n\n", start + max_chars // 2, start + max_chars)
+            if cut == -1:
+                break
+            units.append(Unit(start, cut + 2, heading, text[start:cut + 2]))
+            start = cut + 2
+            heading = f"{s.heading} (cont.)" if s.heading else ""
+        units.append(Unit(start, s.end, heading, text[start:s.end]))
+    for u in units:
+        if len(u.text.strip()) >= CLAUSE_MIN_CHARS:
+            u.signature = signature(u.text)
+    return units
+
+
+def scope_key(model: str, prompt: str, tenant: str = "") -> str:
+    """Verdicts are only reused for the same tenant, model and system prompt."""
+    return hashlib.sha256(f"{tenant}\0{model}\0{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def _sensitive(word: str) -> bool:
+    word = _TOKEN_EDGES.sub("", word)
+    return (
+        word.lower() in _SENSITIVE_WORDS
+        or word.lower().endswith("n't")
+        or any(c.isdigit() or c.isupper() for c in word)
+    )
+
+
+def _safe_edits(old: list[str], new: list[str], max_words: int = CLAUSE_MAX_EDIT_WORDS) -> bool:
+    """True if new is old, ignoring case, or differs from it only by short edits of words that
+    cannot flip a verdict. A high MinHash similarity alone would accept an inserted sentence or a
+    dropped "not". Words keep their case, so proper nouns are recognized."""
+    a = [w.lower() for w in old]
+    b = [w.lower() for w in new]
+    if a == b:
+        return True
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        if max(i2 - i1, j2 - j1) > max_words:
+            return False
+        if any(_sensitive(w) for w in old[i1:i2] + new[j1:j2]):
+            return False
+    return True
+
+
+def _risks_in(unit_text: str, risks: list[FlaggedRisk]) -> Optional[list[FlaggedRisk]]:
+    """The stored risks if every quoted clause still appears in the unit, else None."""
+    haystack = normalize_clause(unit_text).lower()
+    for r in risks:
+        if normalize_clause(r.clause).lower() not in haystack:
+            return None
+    return risks
+
+
+class ClauseIndex:
+    def __init__(self, db_path: str = "", threshold: float = 0.9, max_bytes: int = 64 * 1024 * 1024):
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def plan(self, text: str, scope: str) -> ReusePlan:
+        units = split_units(text)
+        plan = ReusePlan(units=units)
+        with self._lock:
+            for i, unit in enumerate(units):
+                if unit.signature is None:
+                    continue
+                match = self._lookup(unit, scope)
+                if match is not None:
+                    plan.matches[i] = match
+            if plan.matches:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE clause_units SET accessed = ? WHERE id = ?",
+                    [(now, m.section_id) for m in plan.matches.values()],
+                )
+                self._db.commit()
+        return plan
+
+    def _lookup(self, unit: Unit, scope: str) -> Optional[Match]:
+        bands = _bands(unit.signature)
+        ids: set[int] = set()
+        for b, h in enumerate(bands):
+            rows = self._db.execute(
+                "SELECT unit_id FROM clause_unit_bands WHERE scope = ? AND band = ? AND hash = ?", (scope, b, h)
+            ).fetchall()
+            ids.update(r[0] for r in rows)
+        words = normalize_clause(unit.text).split()
+        best: Optional[Match] = None
+        for section_id in ids:
+            row = self._db.execute(
+                "SELECT signature, risks, words FROM clause_units WHERE id = ?", (section_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            sim = similarity(unit.signature, array("I", row[0]))
+            if sim < self.threshold or (best is not None and sim <= best.similarity):
+                continue
+            if not _safe_edits(row[2].split(), words):
+                continue
+            risks = _risks_in(unit.text, [FlaggedRisk.model_validate(r) for r in json.loads(row[1])])
+            if risks is not None:
+                best = Match(section_id=section_id, similarity=sim, risks=risks)
+        return best
+
+    def record(self, plan: ReusePlan, summary: DocumentSummary, text: str, scope: str) -> None:
+        """Store verdicts for the sections the model actually read (matched ones are already stored).
+        A section is stored only if every flagged clause is either wholly inside it or outside it,
+        and nothing is stored when a flagged clause cannot be found in the text at all: a missed
+        risk must never become a reusable "no risks here" verdict."""
+        fresh = [u for i, u in enumerate(plan.units) if i not in plan.matches and u.signature is not None]
+        if not fresh:
+            return
+        spans = find_clause_spans(text, summary.flagged_risks)
+        located = {normalize_clause(s.risk.clause).lower() for s in spans}
+        for r in summary.flagged_risks:
+            clause = normalize_clause(r.clause).lower()
+            if len(clause) >= MIN_CLAUSE_CHARS and clause not in located:
+                return
+        verdicts = []
+        for unit in fresh:
+            inside = [s for s in spans if unit.start <= s.start and s.end <= unit.end]
+            if any(s.start < unit.end and unit.start < s.end for s in spans if s not in inside):
+                continue
+            risks, seen = [], set()
+            for s in inside:
+                if id(s.risk) not in seen:
+                    seen.add(id(s.risk))
+                    risks.append(s.risk.model_dump())
+            verdicts.append((unit, risks))
+        if not verdicts:
+            return
+        now = time.time()
+        with self._lock:
+            for unit, risks in verdicts:
+                words = normalize_clause(unit.text)
+                risks_json = json.dumps(risks)
+                cur = self._db.execute(
+                    "INSERT INTO clause_units (scope, heading, words, signature, risks, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        scope,
+                        unit.heading,
+                        words,
+                        unit.signature.tobytes(),
+                        risks_json,
+                        len(words) + len(risks_json) + len(unit.heading) + NUM_HASHES * 4,
+                        now,
+                        now,
+                    ),
+                )
+                self._db.executemany(
+                    "INSERT INTO clause_unit_bands (scope, band, hash, unit_id) VALUES (?, ?, ?, ?)",
+                    [(scope, b, h, cur.lastrowid) for b, h in enumerate(_bands(unit.signature))],
+                )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently matched sections until the index fits max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM clause_units").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT id, size FROM clause_units ORDER BY accessed ASC").fetchall()
+        for unit_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM clause_units WHERE id = ?", (unit_id,))
+            self._db.execute("DELETE FROM clause_unit_bands WHERE unit_id = ?", (unit_id,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            sections, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM clause_units"
+            ).fetchone()
+        return {"sections": sections, "bytes": size}
+
+
+_index: Optional[ClauseIndex] = None
+
+
+def get_clause_index() -> Optional[ClauseIndex]:
+    """The shared index, or None when CLAUSE_INDEX_ENABLED is off."""
+    global _index
+    if not CLAUSE_INDEX_ENABLED:
+        return None
+    if _index is None:
+        _index = ClauseIndex(CLAUSE_INDEX_DB, CLAUSE_MATCH_THRESHOLD, CLAUSE_INDEX_MAX_MB * 1024 * 1024)
+    return _index
@@ -0,0 +1,231 @@
+"""
+Document store: extracted text persisted under a document id, with a page/offset index built at
+extraction time, so responses carry an id instead of the full text and clients fetch slices
+(a page or a character range) on demand.
+Text is stored in zlib-compressed chunks; a slice only reads the chunks it overlaps.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import DOCUMENTS_DB, DOCUMENTS_MAX_MB
+from app.schemas import DocumentSummary
+from app.services.highlight import Span, find_clause_spans, iter_clause_spans, normalize_clause
+from app.services.prompt import compact
+
+CHUNK_CHARS = 64 * 1024
+
+
+def document_id(text: str) -> str:
+    """Content-addressed id: the same extracted text is stored once."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StoredDocument:
+    id: str
+    filename: str
+    chars: int
+    page_starts: list[int]  # offset of each page (1-based page n starts at page_starts[n - 1])
+    created: float
+    text: Optional[str] = None  # set when the full text is at hand (just stored or extracted)
+
+    @property
+    def pages(self) -> int:
+        return len(self.page_starts)
+
+    def page_of(self, offset: int) -> int:
+        """1-based page containing character offset (empty pages share the next page's start)."""
+        return max(1, bisect_right(self.page_starts, offset))
+
+    def page_span(self, page: int) -> tuple[int, int]:
+        start = self.page_starts[page - 1]
+        end = self.page_starts[page] if page < self.pages else self.chars
+        return start, end
+
+    def info(self) -> dict:
+        return {"document_id": self.id, "filename": self.filename, "chars": self.chars, "pages": self.pages}
+
+
+class DocumentStore:
+    def __init__(self, db_path: str = "", max_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, filename TEXT NOT NULL, source_key TEXT, chars INTEGER NOT NULL, "
+            "page_starts BLOB NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS documents_source ON documents(source_key)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS documents_accessed ON documents(accessed)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS document_chunks ("
+            "document_id TEXT NOT NULL, seq INTEGER NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (document_id, seq))"
+        )
+        self._db.commit()
+
+    def put(
+        self, text: str, page_starts: list[int], filename: str = "document", source_key: Optional[str] = None
+    ) -> StoredDocument:
+        """Store text with its page index; re-storing the same text refreshes its metadata and page
+        index (the same text pasted and uploaded, or re-extracted with different page breaks)."""
+        doc_id = document_id(text)
+        now = time.time()
+        chunks = [zlib.compress(text[i:i + CHUNK_CHARS].encode("utf-8")) for i in range(0, len(text), CHUNK_CHARS)]
+        starts = array("q", page_starts or [0])
+        size = sum(len(c) for c in chunks) + len(starts) * starts.itemsize
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO documents (id, filename, source_key, chars, page_starts, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "filename = excluded.filename, source_key = COALESCE(excluded.source_key, source_key), "
+                "page_starts = excluded.page_starts, size = excluded.size, accessed = excluded.accessed",
+                (doc_id, filename, source_key, len(text), starts.tobytes(), size, now, now),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO document_chunks (document_id, seq, data) VALUES (?, ?, ?)",
+                [(doc_id, seq, data) for seq, data in enumerate(chunks)],
+            )
+            self._evict(keep=doc_id)
+            self._db.commit()
+        return StoredDocument(doc_id, filename, len(text), list(starts), now, text)
+
+    def get(self, doc_id: str) -> Optional[StoredDocument]:
+        return self._fetch("id", doc_id)
+
+    def find_source(self, source_key: str) -> Optional[StoredDocument]:
+        """Document previously extracted from the upload with this content key, if still stored."""
+        return self._fetch("source_key", source_key)
+
+    def text(self, doc_id: str, start: int = 0, end: Optional[int] = None) -> str:
+        """Characters start..end of the document, reading only the chunks they overlap."""
+        if end is not None and end <= start:
+            return ""
+        first = start // CHUNK_CHARS
+        with self._lock:
+            if end is None:
+                rows = self._db.execute(
+                    "SELECT data FROM document_chunks WHERE document_id = ? AND seq >= ? ORDER BY seq",
+                    (doc_id, first),
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT data FROM document_chunks WHERE document_id = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+                    (doc_id, first, (end - 1) // CHUNK_CHARS),
+                ).fetchall()
+        joined = "".join(zlib.decompress(data).decode("utf-8") for (data,) in rows)
+        offset = first * CHUNK_CHARS
+        return joined[start - offset:None if end is None else end - offset]
+
+    def load(self, doc_id: str) -> Optional[StoredDocument]:
+        """Document with its full text loaded."""
+        doc = self.get(doc_id)
+        if doc is not None:
+            doc.text = self.text(doc_id)
+        return doc
+
+    def document_ids(self) -> list[str]:
+        """Ids of every stored document, most recently used first."""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM documents ORDER BY accessed DESC")]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size, chars = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(chars), 0) FROM documents"
+            ).fetchone()
+        return {"documents": count, "bytes": size, "chars": chars}
+
+    def _fetch(self, column: str, value: str) -> Optional[StoredDocument]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT id, filename, chars, page_starts, created FROM documents WHERE {column} = ? "
+                "ORDER BY accessed DESC LIMIT 1",
+                (value,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE documents SET accessed = ? WHERE id = ?", (time.time(), row[0]))
+            self._db.commit()
+        doc_id, filename, chars, starts_blob, created = row
+        starts = array("q")
+        starts.frombytes(starts_blob)
+        return StoredDocument(doc_id, filename, chars, list(starts), created)
+
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used documents until the store fits max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT id, size FROM documents WHERE id != ? ORDER BY accessed ASC", (keep,))
+        for doc_id, size in rows.fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            self._db.execute("DELETE FROM document_chunks WHERE document_id = ?", (doc_id,))
+            total -= size
+
+
+def locate_risks(summary: DocumentSummary, text: str, doc: StoredDocument) -> DocumentSummary:
+    """Copy of summary whose risks carry the offsets and page of the first place their clause
+    occurs in text (left unset when the clause cannot be found)."""
+    if not summary.flagged_risks:
+        return summary
+    first: dict[str, tuple[int, int]] = {}
+    for span in clause_spans(text, summary.flagged_risks):
+        first.setdefault(normalize_clause(span.risk.clause).lower(), (span.start, span.end))
+    risks = []
+    for r in summary.flagged_risks:
+        hit = first.get(normalize_clause(r.clause).lower())
+        if hit is None:
+            risks.append(r.model_copy(update={"start": None, "end": None, "page": None}))
+        else:
+            risks.append(r.model_copy(update={"start": hit[0], "end": hit[1], "page": doc.page_of(hit[0])}))
+    return summary.model_copy(update={"flagged_risks": risks})
+
+
+def clause_spans(text: str, risks: list) -> list[Span]:
+    """Non-overlapping spans of the risks' clauses in text, sorted by start. Clauses that never
+    occur in text itself are looked up in the compacted prompt text (_spans_in_prompt)."""
+    spans = list(iter_clause_spans(text, risks))
+    found = {normalize_clause(s.risk.clause).lower() for s in spans}
+    missing = [r for r in risks if normalize_clause(r.clause).lower() not in found]
+    if not missing:
+        return spans
+    starts = [s.start for s in spans]
+    for span in _spans_in_prompt(text, missing):
+        i = bisect_right(starts, span.start)
+        if (i and spans[i - 1].end > span.start) or (i < len(spans) and spans[i].start < span.end):
+            continue
+        starts.insert(i, span.start)
+        spans.insert(i, span)
+    return spans
+
+
+def _spans_in_prompt(text: str, risks: list) -> list[Span]:
+    """Clauses found in the compacted prompt text, mapped back to the document. The model quotes
+    what it was sent, so a clause running across a page break reads without the page's dropped
+    header and footer and only matches there; its span covers them in the document."""
+    compacted = compact(text)
+    return [
+        Span(*compacted.original_span(s.start, s.end), s.risk)
+        for s in find_clause_spans(compacted.text, risks)
+    ]
+
+
+_store: Optional[DocumentStore] = None
+
+
+def get_document_store() -> DocumentStore:
+    global _store
+    if _store is None:
+        _store = DocumentStore(DOCUMENTS_DB, max_bytes=DOCUMENTS_MAX_MB * 1024 * 1024)
+    return _store
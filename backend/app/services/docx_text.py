@@ -0,0 +1,170 @@
+"""
+Streaming DOCX text extraction.
+Parts are read straight out of the zip with an incremental XML parser instead of building the
+python-docx object model, so memory stays bounded on large agreements. Paragraphs and table
+rows come out in reading order, followed by footnotes and endnotes; headers and footers (where
+fee schedules and liability caps often sit) are emitted once each, before and after the body.
+Page breaks come out as form feeds so callers can split the text into pages.
+"""
+import posixpath
+import zipfile
+from typing import IO, Iterator, Union
+from xml.etree.ElementTree import Element, ParseError, iterparse
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+P, TBL, TR, TC = _W + "p", _W + "tbl", _W + "tr", _W + "tc"
+_TEXT, _DELETED = _W + "t", _W + "del"
+_BR, _RENDERED_PAGE_BREAK = _W + "br", _W + "lastRenderedPageBreak"
+_BREAKS = {_W + "cr": "\n", _W + "tab": "\t", _W + "noBreakHyphen": "-"}
+# Page breaks (explicit, and where Word last laid out a new page) come out as form feeds
+PAGE_BREAK = "\f"
+# Relationship types of the parts extracted besides the main body, by where they go
+_HEADER_TYPES = ("/header",)
+_TRAILER_TYPES = ("/footnotes", "/endnotes", "/footer")
+
+CELL_SEPARATOR = " | "
+
+
+def _para_text(p: Element) -> str:
+    """Visible text of a paragraph: runs, hyperlinks, tabs and breaks; tracked deletions skipped."""
+    out: list[str] = []
+
+    def walk(el: Element) -> None:
+        for child in el:
+            tag = child.tag
+            if tag == _TEXT:
+                out.append(child.text or "")
+            elif tag == _BR:
+                out.append(PAGE_BREAK if child.get(_W + "type") == "page" else "\n")
+            elif tag == _RENDERED_PAGE_BREAK:
+                out.append(PAGE_BREAK)
+            elif tag in _BREAKS:
+                out.append(_BREAKS[tag])
+            elif tag != _DELETED:
+                walk(child)
+
+    walk(p)
+    return "".join(out)
+
+
+def _paragraphs(el: Element) -> Iterator[str]:
+    """Text of each outermost paragraph under el (paragraphs nested in text boxes are part of
+    the paragraph holding the box)."""
+    for child in el:
+        if child.tag == P:
+            yield _para_text(child)
+        else:
+            yield from _paragraphs(child)
+
+
+def _cell_text(tc: Element) -> str:
+    """All paragraphs of a cell (including nested tables) on one line."""
+    parts = (" ".join(text.split()) for text in _paragraphs(tc))
+    return " ".join(t for t in parts if t)
+
+
+def iter_part(source: IO[bytes]) -> Iterator[str]:
+    """Blocks of one WordprocessingML part in document order: a paragraph's text, or one table
+    row with its cells joined by CELL_SEPARATOR. Finished elements are dropped from the tree as
+    they are emitted, so only the block being read is held in memory."""
+    stack: list[Element] = []
+    p_depth = tbl_depth = 0
+    for event, el in iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(el)
+            if el.tag == P:
+                p_depth += 1
+            elif el.tag == TBL:
+                tbl_depth += 1
+            continue
+
+        stack.pop()
+        done = False
+        if el.tag == P:
+            p_depth -= 1
+            # Paragraphs inside tables are emitted with their row; nested ones (text boxes) with the outer one
+            if p_depth == 0 and tbl_depth == 0:
+                yield _para_text(el)
+                done = True
+        elif el.tag == TR and tbl_depth == 1 and p_depth == 0:
+            cells = [_cell_text(tc) for tc in el.iterfind(TC)]
+            if any(cells):
+                yield CELL_SEPARATOR.join(cells)
+            done = True
+        elif el.tag == TBL:
+            tbl_depth -= 1
+            done = tbl_depth == 0 and p_depth == 0
+        if done:
+            el.clear()
+            if stack:
+                stack[-1].remove(el)
+
+
+def _relationships(zf: zipfile.ZipFile, part: str) -> list[tuple[str, str]]:
+    """(type, target part name) for each relationship of a part."""
+    folder, name = posixpath.split(part)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_name not in zf.NameToInfo:
+        return []
+    rels = []
+    with zf.open(rels_name) as f:
+        for _, el in iterparse(f):
+            if el.tag == _REL + "Relationship" and el.get("TargetMode") != "External":
+                target = el.get("Target", "")
+                path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+                rels.append((el.get("Type", ""), path))
+    return rels
+
+
+def _main_part(zf: zipfile.ZipFile) -> str:
+    for rel_type, target in _relationships(zf, ""):
+        if rel_type == _OFFICE_DOCUMENT:
+            return target
+    return "word/document.xml"
+
+
+def extract_docx(source: Union[str, IO[bytes]]) -> str:
+    """Text of a .docx (path or binary file object). Raises ValueError for files that are not
+    valid DOCX packages."""
+    try:
+        with zipfile.ZipFile(source) as zf:
+            main = _main_part(zf)
+            if main not in zf.NameToInfo:
+                raise ValueError("Not a Word document: no main document part")
+            related = _relationships(zf, main)
+            headers = [t for kind, t in related if kind.endswith(_HEADER_TYPES) and t in zf.NameToInfo]
+            # Footnotes, then endnotes, then footers
+            trailers = sorted(
+                (i, t)
+                for kind, t in related
+                for i, suffix in enumerate(_TRAILER_TYPES)
+                if kind.endswith(suffix) and t in zf.NameToInfo
+            )
+
+            blocks: list[str] = []
+            seen: set[str] = set()
+
+            def add_part(name: str, dedupe: bool = False) -> None:
+                with zf.open(name) as f:
+                    for block in iter_part(f):
+                        key = " ".join(block.split())
+                        # Sections often repeat the same header/footer; keep one copy of each line
+                        if dedupe:
+                            if not key or key in seen:
+                                continue
+                            seen.add(key)
+                        elif not key and name != main:
+                            continue
+                        blocks.append(block)
+
+            for name in sorted(set(headers)):
+                add_part(name, dedupe=True)
+            add_part(main)
+            for i, name in dict.fromkeys(trailers):
+                add_part(name, dedupe=_TRAILER_TYPES[i] == "/footer")
+    except (zipfile.BadZipFile, ParseError, KeyError) as e:
+        raise ValueError(f"Could not read Word document: {e}") from e
+    return "\n".join(blocks)
@@ -0,0 +1,297 @@
+"""
+Export builders: the reviewed document as HTML (risks highlighted in place) or text (risks marked),
+and the summary as Markdown. Clauses are located as document_store.locate_risks locates them (a
+window at a time, then in the compacted prompt text the model quoted from). Each builder yields the
+export in pieces, rendering the document a window at a time, so responses stream it with a working
+set that grows only with the number of highlighted clauses. Responses are compressed (brotli when installed, otherwise gzip) as the
+client accepts, and carry a strong ETag derived from the document and its analysis, so a repeated
+download can be answered with 304.
+"""
+import hashlib
+import itertools
+import re
+import time
+import zlib
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.schemas import DocumentSummary
+from app.services.document_store import clause_spans, document_id
+from app.services.highlight import Span
+from app.services.metrics import record
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bump when an export's layout changes, so earlier ETags stop matching
+EXPORT_VERSION = "1"
+# Characters of document text escaped per step, and the size pieces are batched to before sending
+_WINDOW_CHARS = 64 * 1024
+_CHUNK_CHARS = 64 * 1024
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+_Q_RE = re.compile(r"q\s*=\s*([0-9.]+)")
+
+
+def escape_html(s: str) -> str:
+    return (s or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def _rendered(
+    text: str, spans: Iterable[Span], wrap: Callable[[str, Span], str], escape: Callable[[str], str] = lambda s: s
+) -> Iterator[str]:
+    """highlight.render_spans in pieces: the text between spans is cut into windows."""
+    pos = 0
+    for s in itertools.chain(spans, [Span(len(text), len(text), None)]):
+        for i in range(pos, s.start, _WINDOW_CHARS):
+            yield escape(text[i:min(i + _WINDOW_CHARS, s.start)])
+        if s.risk is not None:
+            yield wrap(escape(text[s.start:s.end]), s)
+        pos = s.end
+
+
+def _lines(pieces: Iterable[str]) -> Iterator[str]:
+    """The lines of "".join(pieces), without their line breaks."""
+    tail = ""
+    for piece in pieces:
+        parts = (tail + piece).split("\n")
+        tail = parts.pop()
+        yield from parts
+    yield tail
+
+
+def _joined(pieces: Iterable[str], sep: str) -> Iterator[str]:
+    for i, piece in enumerate(pieces):
+        yield piece if i == 0 else sep + piece
+
+
+def _structured_html(lines: Iterable[str]) -> Iterator[str]:
+    """HTML for each line of plain text, keeping headings, bullets and paragraphs.
+    Lines may already contain <mark> tags and are not escaped again."""
+    in_list = False
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+
+        if not stripped:
+            if in_list:
+                yield "</ul>"
+                in_list = False
+            yield "<br>"
+            continue
+
+        # Bullet line: ● • - * or numbered at start (content may have <mark>)
+        if re.match(r"^[\s]*(●|•|[-*]|\d+\.)\s", line) or stripped.startswith("●") or stripped.startswith("•"):
+            if not in_list:
+                yield "<ul>"
+                in_list = True
+            content = re.sub(r"^[\s]*(●|•|[-*]|\d+\.)\s*", "", stripped)
+            yield f"<li>{content}</li>"
+            continue
+
+        if in_list:
+            yield "</ul>"
+            in_list = False
+
+        # Short line that looks like a heading
+        is_main_heading = i == 0 and len(stripped) < 80
+        is_short_heading = len(stripped) < 60 and not stripped.endswith(".") and stripped and stripped[0].isupper()
+        if is_main_heading:
+            yield f"<h2 class='doc-title'>{stripped}</h2>"
+        elif is_short_heading:
+            yield f"<h3 class='doc-heading'>{stripped}</h3>"
+        else:
+            yield f"<p class='doc-para'>{line}</p>"
+
+    if in_list:
+        yield "</ul>"
+
+
+def html_export(text: str, summary: DocumentSummary, filename: str = "document") -> Iterator[str]:
+    """HTML review: the document with risks highlighted in place, key points and questions at the end."""
+    spans = clause_spans(text, summary.flagged_risks or [])
+    # Both come from the client (an upload's name, the filename query parameter) or the model
+    filename = escape_html(filename)
+    doc_type = escape_html(summary.document_type or "Unknown")
+    yield f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Doc Review - {filename}</title>
+<style>
+body {{ font-family: Georgia, 'Times New Roman', serif; max-width: 800px; margin: 2rem auto; padding: 0 1rem; line-height: 1.6; color: #1a1a1a; }}
+.document {{ margin-bottom: 2rem; }}
+.document .doc-title {{ font-size: 1.5rem; font-weight: 700; margin: 1.5rem 0 0.5rem; }}
+.document .doc-heading {{ font-size: 1.15rem; font-weight: 600; margin: 1.25rem 0 0.5rem; }}
+.document .doc-para {{ margin: 0.5rem 0; text-align: justify; }}
+.document ul {{ margin: 0.5rem 0; padding-left: 1.5rem; }}
+.document li {{ margin: 0.25rem 0; }}
+mark.risk-low {{ background: rgba(34, 197, 94, 0.3); border-bottom: 2px solid #22c55e; padding: 0 2px; }}
+mark.risk-medium {{ background: rgba(234, 179, 8, 0.3); border-bottom: 2px solid #eab308; padding: 0 2px; }}
+mark.risk-high {{ background: rgba(239, 68, 68, 0.3); border-bottom: 2px solid #ef4444; padding: 0 2px; }}
+.key-points, .questions-section {{ background: #f8fafc; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; }}
+.key-points {{ border-left: 4px solid #6366f1; }}
+.questions-section {{ border-left: 4px solid #22c55e; }}
+.key-points h2, .questions-section h2 {{ margin-top: 0; font-size: 1.1rem; }}
+.key-points ul, .questions-section ul {{ margin: 0; padding-left: 1.25rem; }}
+</style>
+</head>
+<body>
+<h1>Document Review</h1>
+<p><strong>File:</strong> {filename} &nbsp;|&nbsp; <strong>Type:</strong> {doc_type}</p>
+<div class="document">"""
+
+    def wrap(m: str, s: Span) -> str:
+        return f'<mark class="risk-{s.risk.risk_level}" title="{escape_html(s.risk.description or "")}">{m}</mark>'
+
+    yield from _joined(_structured_html(_lines(_rendered(text, spans, wrap, escape_html))), "\n")
+
+    key_points = "".join(f"<li>{escape_html(b)}</li>" for b in (summary.summary or []))
+    yield f"""</div>
+<div class="key-points">
+<h2>Key Points</h2>
+<ul>{key_points}</ul>
+</div>"""
+    questions = summary.questions_to_ask or []
+    if questions:
+        questions_html = "".join(f"<li>{escape_html(q)}</li>" for q in questions)
+        yield f"""
+<div class="questions-section">
+<h2>Questions to Ask Before Signing</h2>
+<ul>{questions_html}</ul>
+</div>"""
+    yield """
+</body>
+</html>"""
+
+
+def marked_text(text: str, risks: list) -> Iterator[str]:
+    """The text with risky clauses wrapped in >> [RISK - LEVEL] ... << markers, in pieces."""
+    spans = clause_spans(text, risks or [])
+    return _rendered(text, spans, lambda m, s: f">> [RISK - {s.risk.risk_level.upper()}] {m} <<")
+
+
+def text_export(text: str, summary: DocumentSummary) -> Iterator[str]:
+    """Plain-text review: the document with risks marked, then key points, questions and risks."""
+    yield "=== DOCUMENT (flagged clauses marked with >> [RISK - level] ... <<) ===\n\n"
+    yield from marked_text(text, summary.flagged_risks or [])
+    lines = ["", "", "", "=== KEY POINTS ===", ""]
+    for bullet in summary.summary or []:
+        lines.append(f"• {bullet}")
+    lines.append("")
+    questions = summary.questions_to_ask or []
+    if questions:
+        lines.append("=== QUESTIONS TO ASK BEFORE SIGNING ===")
+        lines.append("")
+        for q in questions:
+            lines.append(f"? {q}")
+        lines.append("")
+    if summary.document_type:
+        lines.append(f"Document type: {summary.document_type}")
+    lines.append("")
+    if summary.flagged_risks:
+        lines.append("=== FLAGGED RISKS ===")
+        for i, r in enumerate(summary.flagged_risks, 1):
+            lines.append(f"{i}. [{r.risk_level.upper()}] {r.description}")
+            lines.append(f"   Clause: {r.clause[:300]}{'...' if len(r.clause) > 300 else ''}")
+            lines.append("")
+    yield "\n".join(lines)
+
+
+def summary_export(summary: DocumentSummary) -> Iterator[str]:
+    """Markdown summary: key points, document type and flagged risks."""
+    lines = [
+        "# Document Summary",
+        "",
+        "## Key Points",
+        "",
+    ]
+    for bullet in summary.summary:
+        lines.append(f"- {bullet}")
+    lines.append("")
+
+    if summary.document_type:
+        lines.append(f"**Document type:** {summary.document_type}")
+        lines.append("")
+
+    if summary.flagged_risks:
+        lines.append("## Flagged Risks")
+        lines.append("")
+        for i, r in enumerate(summary.flagged_risks, 1):
+            lines.append(f"### {i}. [{r.risk_level.upper()}] {r.description}")
+            lines.append("")
+            lines.append(f"> {r.clause[:500]}{'...' if len(r.clause) > 500 else ''}")
+            lines.append("")
+    yield "\n".join(lines)
+
+
+def export_etag(kind: str, summary: DocumentSummary, text: str = "", filename: str = "") -> str:
+    """Strong validator for an export of `text` with `summary`: the same inputs give the same bytes."""
+    h = hashlib.sha256()
+    for part in (EXPORT_VERSION, kind, filename, document_id(text), summary.model_dump_json()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """"br" (when brotli is installed) or "gzip" if the Accept-Encoding header allows it, else "identity"."""
+    accepted: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        m = _Q_RE.search(params)
+        try:
+            accepted[name.strip().lower()] = float(m.group(1)) if m else 1.0
+        except ValueError:
+            continue
+    for encoding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def representation_etag(etag: str, encoding: str) -> str:
+    """Quoted ETag for the export sent with `encoding`; each encoding is a different representation."""
+    return f'"{etag}"' if encoding == "identity" else f'"{etag}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (weak comparison) against a quoted ETag."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def encoded(pieces: Iterable[str], encoding: str, stage: str = "export") -> Iterator[bytes]:
+    """Pieces batched into ~_CHUNK_CHARS blocks, UTF-8 encoded and compressed. The time spent
+    producing and compressing them is recorded as `stage` once the export is done."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=_BROTLI_QUALITY)
+        compress, finish = compressor.process, compressor.finish
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(_GZIP_LEVEL, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    else:
+        compress, finish = (lambda b: b), (lambda: b"")
+
+    # Time spent suspended at a yield (the client reading) is not counted
+    busy = 0.0
+    start = time.perf_counter()
+    batch: list[str] = []
+    size = 0
+    for piece in pieces:
+        batch.append(piece)
+        size += len(piece)
+        if size >= _CHUNK_CHARS:
+            out = compress("".join(batch).encode("utf-8"))
+            batch, size = [], 0
+            if out:
+                busy += time.perf_counter() - start
+                yield out
+                start = time.perf_counter()
+    out = compress("".join(batch).encode("utf-8")) + finish()
+    record(stage, busy + time.perf_counter() - start)
+    if out:
+        yield out
@@ -1,12 +1,65 @@
 """
 Extract text from PDF, Word (.docx), and scanned images.
 Supports native text extraction and OCR fallback for scanned docs.
+Parsers are imported on first use, so importing the app stays fast.
 """
+import asyncio
+import contextvars
+import functools
 import io
-import re
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional, Union
 
-import pdfplumber
-from docx import Document
+from app.config import (
+    DOCX_EXTRACTOR,
+    EXTRACT_POOL,
+    EXTRACT_WORKERS,
+    MAX_PAGES,
+    OCR_CONCURRENCY,
+    PDF_MIN_PAGE_CHARS,
+    PDF_PARALLEL_MIN_PAGES,
+)
+from app.services.docx_text import extract_docx
+from app.services.metrics import OCR_PAGES, timed
+from app.services.ocr import (
+    ProgressCallback,
+    get_page_pool,
+    image_frames,
+    ocr_image_path,
+    ocr_pdf_path,
+    page_workers,
+    run_pages_inline,
+    spilled_file,
+)
+from app.services.scheduler import get_scheduler
+
+# Extractors accept the raw bytes or, preferably, a path to the spooled upload
+Source = Union[bytes, str]
+
+_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+# Leading PDF pages checked to decide whether a PDF goes to the OCR lane
+_PROBE_PAGES = 3
+
+_executor: Optional[Executor] = None
+
+
+class DocumentTooLarge(ValueError):
+    """Upload exceeds the configured size or page limit."""
+
+
+def _open(source: Source) -> Union[str, IO[bytes]]:
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+@contextmanager
+def _file_path(source: Source, suffix: str = ".pdf") -> Iterator[str]:
+    if isinstance(source, str):
+        yield source
+    else:
+        with spilled_file(source, suffix) as path:
+            yield path
 
 
 def _clean(text: str) -> str:
@@ -15,82 +68,229 @@ def _clean(text: str) -> str:
     return text.strip()
 
 
-def _extract_pdf_native(data: bytes) -> str:
-    parts = []
-    with pdfplumber.open(io.BytesIO(data)) as pdf:
+def _native_pages(path: str, first: int, last: int) -> list[tuple[int, str, bool]]:
+    """(page_number, native_text, has_images) for pages first..last (1-based, inclusive)."""
+    import pdfplumber
+
+    out = []
+    with pdfplumber.open(path, pages=list(range(first, last + 1))) as pdf:
         for page in pdf.pages:
-            t = page.extract_text() or ""
-            if t.strip():
-                parts.append(t)
-    return _clean("\n\n".join(parts))
+            out.append((page.page_number, page.extract_text() or "", bool(page.images)))
+    return out
 
 
-def _extract_pdf_ocr(data: bytes) -> str:
-    try:
-        import pytesseract
-        from pdf2image import convert_from_bytes
-        from PIL import Image
-    except ImportError:
-        return ""
+def _extract_pdf_native_pages(path: str) -> list[tuple[int, str, bool]]:
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        total = len(pdf.pages)
+    if total > MAX_PAGES:
+        raise DocumentTooLarge(f"Document has {total} pages; the limit is {MAX_PAGES}.")
+    workers = page_workers()
+    if total < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        return _native_pages(path, 1, total) if total else []
+    step = -(-total // workers)
+    ranges = [(first, min(total, first + step - 1)) for first in range(1, total + 1, step)]
+    pool = get_page_pool()
+    futures = [pool.submit(_native_pages, path, first, last) for first, last in ranges]
+    return [row for fut in futures for row in fut.result()]
+
+
+def _needs_ocr(text: str, has_images: bool) -> bool:
+    """A page needs OCR when its text layer is (nearly) empty but it has something to rasterize."""
+    return has_images and len("".join(text.split())) < PDF_MIN_PAGE_CHARS
+
+
+def _extract_pdf(source: Source, on_progress: Optional[ProgressCallback] = None) -> list[str]:
+    """Per-page hybrid: keep native text where the page has it, OCR only the pages that don't."""
+    with _file_path(source) as path:
+        with timed("pdf_text"):
+            pages = _extract_pdf_native_pages(path)
+        texts = {page_no: text for page_no, text, _ in pages}
+        scanned = [page_no for page_no, text, has_images in pages if _needs_ocr(text, has_images)]
+        if scanned:
+            texts.update(_extract_pdf_ocr(path, scanned, on_progress))
+    return [texts[n] for n in sorted(texts)]
+
+
+def _extract_pdf_ocr(
+    path: str, pages: list[int], on_progress: Optional[ProgressCallback] = None
+) -> dict[int, str]:
+    """OCR text of the scanned pages; none when OCR fails or pytesseract/pdf2image are missing,
+    so the native text is kept."""
     try:
-        images = convert_from_bytes(data, dpi=200)
-        parts = []
-        for img in images:
-            text = pytesseract.image_to_string(img, lang="eng")
-            if text.strip():
-                parts.append(text)
-        return _clean("\n\n".join(parts))
+        with timed("ocr"):
+            texts = ocr_pdf_path(path, pages=pages, on_progress=on_progress)
     except Exception:
-        return ""
+        return {}
+    OCR_PAGES.inc(len(texts))
+    return texts
 
 
-def _extract_image_ocr(data: bytes) -> str:
+def _extract_image_ocr(
+    filename: str, source: Source, on_progress: Optional[ProgressCallback] = None
+) -> list[str]:
+    """OCR every frame of the image (multi-page TIFFs included); each frame is a page."""
     try:
-        import pytesseract
-        from PIL import Image, ImageEnhance
+        import pytesseract  # noqa: F401
+        from PIL import Image  # noqa: F401
     except ImportError as e:
         raise ValueError(
             "Image OCR requires pytesseract and Pillow. Install: pip install pytesseract Pillow"
         ) from e
-    try:
-        img = Image.open(io.BytesIO(data))
-        # Convert to RGB - PNG screenshots often have alpha, pytesseract works best with RGB
-        if img.mode in ("RGBA", "LA", "P"):
-            img = img.convert("RGBA")
-            bg = Image.new("RGB", img.size, (255, 255, 255))
-            bg.paste(img, mask=img.split()[-1])
-            img = bg
-        elif img.mode != "RGB":
-            img = img.convert("RGB")
-        # Improve OCR on screenshots: slight contrast boost
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(1.15)
-        text = pytesseract.image_to_string(img, lang="eng")
-        return _clean(text)
-    except Exception as e:
-        err = str(e).lower()
-        if "tesseract" in err or "not found" in err:
-            raise ValueError(
-                "Tesseract OCR is not installed. On Mac: brew install tesseract"
-            ) from e
-        raise ValueError(f"Image OCR failed: {e}") from e
-
-
-def extract_text(filename: str, data: bytes) -> str:
+    with _file_path(source, "." + filename.rsplit(".", 1)[-1]) as path:
+        try:
+            frames = image_frames(path)
+        except Exception as e:
+            raise ValueError(f"Image OCR failed: {e}") from e
+        if frames > MAX_PAGES:
+            raise DocumentTooLarge(f"Image has {frames} pages; the limit is {MAX_PAGES}.")
+        try:
+            with timed("ocr"):
+                texts = ocr_image_path(path, on_progress)
+        except Exception as e:
+            err = str(e).lower()
+            if "tesseract" in err or "not found" in err:
+                raise ValueError(
+                    "Tesseract OCR is not installed. On Mac: brew install tesseract"
+                ) from e
+            raise ValueError(f"Image OCR failed: {e}") from e
+    OCR_PAGES.inc(len(texts))
+    return [texts[n] for n in sorted(texts)]
+
+
+def _extract_docx_python_docx(source: Source) -> str:
+    """Previous extractor: full python-docx DOM, body paragraphs only (no tables, headers,
+    footers or notes). Kept behind DOCX_EXTRACTOR=python-docx and for benchmarks."""
+    from docx import Document
+
+    doc = Document(_open(source))
+    return "\n".join(p.text if p.text else "" for p in doc.paragraphs)
+
+
+def extract_pages(filename: str, source: Source, on_progress: Optional[ProgressCallback] = None) -> list[str]:
+    """Raw text of each page: PDF pages, image frames, DOCX pages split at page breaks.
+    source is the file's bytes or a path to it. on_progress(pages_done, pages_total) is called
+    as scanned PDF pages or image frames finish OCR. Raises DocumentTooLarge past MAX_PAGES."""
     name = (filename or "").lower()
 
     if name.endswith(".pdf"):
-        text = _extract_pdf_native(data)
-        if not text.strip():
-            text = _extract_pdf_ocr(data)
-        return text
+        return _extract_pdf(source, on_progress)
 
     if name.endswith(".docx"):
-        doc = Document(io.BytesIO(data))
-        paras = [p.text if p.text else "" for p in doc.paragraphs]
-        return _clean("\n".join(paras))
+        with timed("docx"):
+            if DOCX_EXTRACTOR == "python-docx":
+                return [_extract_docx_python_docx(source)]
+            # Back-to-back breaks (an explicit break then Word's rendered one) are not real pages
+            pages = [p for p in extract_docx(_open(source)).split("\f") if p.strip()]
+            if len(pages) > MAX_PAGES:
+                raise DocumentTooLarge(f"Document has {len(pages)} pages; the limit is {MAX_PAGES}.")
+            return pages or [""]
+
+    if name.endswith(_IMAGE_SUFFIXES):
+        return _extract_image_ocr(name, source, on_progress)
+
+    return []
+
+
+def join_pages(pages: list[str]) -> tuple[str, list[int]]:
+    """Document text (non-empty pages separated by a blank line) and the offset each page starts
+    at. Empty pages keep their number and start where the next page does."""
+    parts: list[str] = []
+    starts: list[int] = []
+    size = empty = 0
+    for page in pages:
+        text = _clean(page)
+        if not text:
+            empty += 1
+            continue
+        if parts:
+            size += 2
+        starts.extend([size] * (empty + 1))
+        empty = 0
+        parts.append(text)
+        size += len(text)
+    starts.extend([size] * empty)
+    return "\n\n".join(parts), starts
+
+
+def extract_text(filename: str, source: Source, on_progress: Optional[ProgressCallback] = None) -> str:
+    """Text of the whole document; see extract_pages."""
+    return join_pages(extract_pages(filename, source, on_progress))[0]
+
+
+def extraction_lane(filename: str, source: Source) -> str:
+    """Scheduler lane for extracting this file: "ocr" for images and for PDFs whose first pages
+    have no text layer, "extract" for everything else. Opens PDFs: see _needs_probe."""
+    name = (filename or "").lower()
+    if name.endswith(_IMAGE_SUFFIXES):
+        return "ocr"
+    if not _needs_probe(name):
+        return "extract"
+    import pdfplumber
+
+    try:
+        with _file_path(source) as path, pdfplumber.open(path) as pdf:
+            probe = pdf.pages[:_PROBE_PAGES]
+            if any(_needs_ocr(page.extract_text() or "", bool(page.images)) for page in probe):
+                return "ocr"
+    except Exception:
+        pass  # unreadable PDFs fail fast in extraction itself
+    return "extract"
+
+
+def _needs_probe(filename: str) -> bool:
+    """Only a PDF's lane depends on its content, which takes parsing its first pages."""
+    return (filename or "").lower().endswith(".pdf")
+
+
+def _get_executor() -> Executor:
+    """Extraction pool: one worker per slot of the extract and OCR lanes, so documents waiting
+    on OCR never hold the workers native extraction needs. Worker processes do their page work
+    inline rather than each starting a page pool."""
+    global _executor
+    if _executor is None:
+        workers = EXTRACT_WORKERS + OCR_CONCURRENCY
+        if EXTRACT_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers, initializer=run_pages_inline)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+    return _executor
+
+
+async def extract_pages_async(
+    filename: str, source: Source, on_progress: Optional[ProgressCallback] = None
+) -> list[str]:
+    """Run extract_pages on the bounded extraction pool so the event loop stays responsive.
+    Pass a path rather than bytes so nothing is copied to the worker. Progress callbacks
+    cannot cross a process boundary, so they are dropped when EXTRACT_POOL=process (and so are
+    the per-stage timings recorded inside the worker; the overall "extract" stage still counts)."""
+    return await _run_extraction(extract_pages, filename, source, on_progress)
 
-    if name.endswith((".png", ".jpg", ".jpeg", ".tiff", ".bmp")):
-        return _extract_image_ocr(data)
 
-    return ""
+async def _run_extraction(fn, filename: str, source: Source, on_progress: Optional[ProgressCallback]):
+    """Run fn on the extraction pool once the file's scheduler lane (extract or OCR) has a free
+    slot; smaller files go first. A PDF is probed for a text layer on the pool while holding an
+    extract slot; if it needs OCR, that slot is given up before it queues for the OCR lane. May
+    raise Overloaded for requests that would wait too long."""
+    size = os.path.getsize(source) if isinstance(source, str) else len(source)
+    executor = _get_executor()
+    call = functools.partial(fn, filename, source, on_progress)
+    if isinstance(executor, ProcessPoolExecutor):
+        call = functools.partial(fn, filename, source, None)
+    else:
+        # run_in_executor does not carry contextvars; copy them so stage timings reach the request
+        call = functools.partial(contextvars.copy_context().run, call)
+    loop = asyncio.get_running_loop()
+    scheduler = get_scheduler()
+    if _needs_probe(filename):
+        async with scheduler.lane("extract").slot(size):
+            lane = await loop.run_in_executor(executor, extraction_lane, filename, source)
+            if lane == "extract":
+                with timed("extract"):
+                    return await loop.run_in_executor(executor, call)
+    else:
+        lane = extraction_lane(filename, source)
+    async with scheduler.lane(lane).slot(size):
+        with timed("extract"):
+            return await loop.run_in_executor(executor, call)
@@ -0,0 +1,172 @@
+"""
+Single-pass clause matcher for risk highlighting in exports.
+The document is indexed once (whitespace collapsed, lowercased, with a map back to original
+offsets). All clauses are compiled into one trie-shaped regex, so a single scan finds every
+clause occurrence. Overlaps are resolved longest-clause-first and returned as character spans.
+"""
+import re
+from bisect import bisect_right, insort
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+# Every character str.split() treats as whitespace, folded to a plain space
+_WHITESPACE = str.maketrans({
+    c: " "
+    for c in "\t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0\u1680\u2028\u2029\u202f\u205f\u3000"
+    + "".join(chr(c) for c in range(0x2000, 0x200B))
+})
+_RUN_RE = re.compile(r" {2,}")
+
+MIN_CLAUSE_CHARS = 5
+
+
+@dataclass
+class Span:
+    start: int
+    end: int
+    risk: object  # FlaggedRisk or anything with clause / risk_level / description
+
+
+class NormalizedIndex:
+    """Whitespace-collapsed view of a text that maps positions back to the original."""
+
+    def __init__(self, text: str):
+        folded = text.translate(_WHITESPACE)
+        self._run_starts: list[int] = []  # position of each collapsed run in the normalized text
+        self._removed: list[int] = []     # characters removed up to and including that run
+        removed = 0
+        for m in _RUN_RE.finditer(folded):
+            self._run_starts.append(m.start() - removed)
+            removed += m.end() - m.start() - 1
+            self._removed.append(removed)
+        normalized = _RUN_RE.sub(" ", folded) if self._run_starts else folded
+        lowered = normalized.lower()
+        # lower() can change length for a few non-ASCII characters; match case-insensitively instead
+        self.case_folded = len(lowered) == len(normalized)
+        self.text = lowered if self.case_folded else normalized
+
+    def original(self, pos: int) -> int:
+        k = bisect_right(self._run_starts, pos) - 1
+        if k < 0:
+            return pos
+        if pos == self._run_starts[k]:
+            return pos + (self._removed[k - 1] if k else 0)
+        return pos + self._removed[k]
+
+
+def normalize_clause(clause: str) -> str:
+    return " ".join((clause or "").split())
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Regex alternation shaped like a trie, so the engine only follows branches that match.
+    Optional tails are greedy, so the longest clause starting at a position wins."""
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        prefix = []
+        # Walk single-child chains iteratively; recurse only at branch points
+        while len(node) == 1 and "" not in node:
+            (ch, node), = node.items()
+            prefix.append(re.escape(ch))
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            tail = ""
+        elif "" in node:
+            tail = "(?:" + "|".join(branches) + ")?"
+        elif len(branches) == 1:
+            tail = branches[0]
+        else:
+            tail = "(?:" + "|".join(branches) + ")"
+        return "".join(prefix) + tail
+
+    return build(trie)
+
+
+def find_clause_spans(text: str, risks: list, index: Optional[NormalizedIndex] = None) -> list[Span]:
+    """Character spans in `text` for every occurrence of every risk's clause, non-overlapping,
+    sorted by start. Whitespace differences and case are ignored, as in the old regex loop."""
+    by_clause: dict[str, object] = {}
+    for r in sorted(risks or [], key=lambda r: len(r.clause or ""), reverse=True):
+        clause = normalize_clause(r.clause)
+        if len(clause) < MIN_CLAUSE_CHARS:
+            continue
+        by_clause.setdefault(clause.lower(), r)
+    if not by_clause or not text:
+        return []
+
+    index = index or NormalizedIndex(text)
+    flags = 0 if index.case_folded else re.IGNORECASE
+    matcher = re.compile("(?=(" + _trie_pattern(list(by_clause)) + "))", flags)
+    candidates = [(m.start(), m.end(1)) for m in matcher.finditer(index.text)]
+
+    # Longest first; keep a match only if it does not overlap one already kept
+    candidates.sort(key=lambda c: (c[0] - c[1], c[0]))
+    kept_starts: list[int] = []
+    kept: dict[int, int] = {}
+    for start, end in candidates:
+        i = bisect_right(kept_starts, start)
+        if i and kept[kept_starts[i - 1]] > start:
+            continue
+        if i < len(kept_starts) and kept_starts[i] < end:
+            continue
+        insort(kept_starts, start)
+        kept[start] = end
+
+    spans = []
+    for start in kept_starts:
+        end = kept[start]
+        matched = index.text[start:end].lower()
+        risk = by_clause.get(matched) or next(
+            (r for k, r in by_clause.items() if k.casefold() == matched.casefold()),
+            next(iter(by_clause.values())),
+        )
+        spans.append(Span(index.original(start), index.original(end - 1) + 1, risk))
+    return spans
+
+
+def iter_clause_spans(text: str, risks: list, window: int = 256 * 1024) -> Iterator[Span]:
+    """find_clause_spans a window of text at a time, so the working set stays the same however
+    long the text is. Each window looks far enough ahead to see clauses crossing into the next."""
+    longest = max((len(normalize_clause(r.clause)) for r in risks or []), default=0)
+    if longest < MIN_CLAUSE_CHARS:
+        return
+    lookahead = 2 * longest + 1024
+    pos = 0
+    while pos < len(text):
+        end = pos + window
+        stop = min(len(text), end + lookahead)
+        last = stop == len(text)
+        next_pos = end
+        for span in find_clause_spans(text[pos:stop], risks):
+            if not last and span.start + pos >= end:
+                break
+            span.start += pos
+            span.end += pos
+            next_pos = max(next_pos, span.end)
+            yield span
+        if last:
+            return
+        pos = next_pos
+
+
+def render_spans(
+    text: str,
+    spans: list[Span],
+    wrap: Callable[[str, Span], str],
+    escape: Callable[[str], str] = lambda s: s,
+) -> str:
+    """Rebuild text with each span replaced by wrap(escape(matched_text), span)."""
+    out = []
+    pos = 0
+    for s in spans:
+        out.append(escape(text[pos:s.start]))
+        out.append(wrap(escape(text[s.start:s.end]), s))
+        pos = s.end
+    out.append(escape(text[pos:]))
+    return "".join(out)
@@ -0,0 +1,317 @@
+"""
+Background batch analysis: a SQLite-backed job queue and a local asyncio worker pool.
+Uploads are stored on disk and queue state lives in SQLite, so jobs survive restarts.
+Each document runs the extract stage then the analyze stage, each with its own concurrency cap.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from app.config import (
+    JOB_EXTRACT_CONCURRENCY,
+    JOB_LLM_CONCURRENCY,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_DELAY,
+    JOB_WORKERS,
+    JOBS_DB,
+    JOBS_DIR,
+)
+from app.schemas import DocumentSummary, JobDocument, JobStatus
+from app.services.ai_analyzer import analysis_key, analyze_document_async
+from app.services.document_store import get_document_store
+from app.services.extract_text import extract_pages_async, join_pages
+from app.services.scheduler import PRIORITY_BATCH, set_priority
+from app.services.search_index import record_analysis_async
+from app.services.tenants import current_tenant, set_tenant
+from app.services.uploads import SpooledUpload
+
+
+def transient_errors() -> tuple[type[Exception], ...]:
+    """LLM failures worth retrying; anything else fails the document immediately."""
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+    return APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    tenant TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS job_documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_total INTEGER NOT NULL DEFAULT 0,
+    char_count INTEGER NOT NULL DEFAULT 0,
+    document_id TEXT,
+    analysis_id TEXT,
+    result TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_documents_job ON job_documents(job_id);
+CREATE INDEX IF NOT EXISTS job_documents_status ON job_documents(status, not_before);
+"""
+
+
+def _safe_name(filename: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.basename(filename or "document"))[:120]
+
+
+class JobStore:
+    def __init__(self, db_path: str, upload_dir: str):
+        self.upload_dir = upload_dir
+        os.makedirs(upload_dir, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def create_job(self, uploads: list[SpooledUpload], tenant: str = "") -> str:
+        """Move spooled uploads into the job's directory and queue one row per file."""
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.upload_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        now = time.time()
+        rows = []
+        for i, upload in enumerate(uploads):
+            path = os.path.join(job_dir, f"{i:05d}-{_safe_name(upload.filename)}")
+            shutil.move(upload.path, path)
+            rows.append((job_id, upload.filename or "document", path, now))
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute("INSERT INTO jobs (id, created, tenant) VALUES (?, ?, ?)", (job_id, now, tenant))
+            self._db.executemany(
+                "INSERT INTO job_documents (job_id, filename, path, updated) VALUES (?, ?, ?, ?)", rows
+            )
+            self._db.execute("COMMIT")
+        return job_id
+
+    def claim_next(self) -> Optional[tuple[int, str, str, int, str]]:
+        """Atomically move the oldest runnable document to 'extracting'.
+        Returns (id, filename, path, attempts, tenant) or None."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT d.id, d.filename, d.path, d.attempts, j.tenant FROM job_documents d "
+                "JOIN jobs j ON j.id = d.job_id "
+                "WHERE d.status = 'queued' AND d.not_before <= ? ORDER BY d.id LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE job_documents SET status = 'extracting', updated = ? WHERE id = ?",
+                    (time.time(), row[0]),
+                )
+            self._db.execute("COMMIT")
+        return row
+
+    def update(self, doc_id: int, **fields) -> None:
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE job_documents SET {cols} WHERE id = ?", (*fields.values(), doc_id))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def requeue_interrupted(self) -> int:
+        """Documents left mid-stage by a crash or restart go back on the queue."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE job_documents SET status = 'queued', updated = ? "
+                "WHERE status IN ('extracting', 'analyzing')",
+                (time.time(),),
+            )
+        return cur.rowcount
+
+    def next_wakeup(self) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(not_before) FROM job_documents WHERE status = 'queued'"
+            ).fetchone()
+        return row[0]
+
+    def get_job(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            job = self._db.execute("SELECT id, created FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = self._db.execute(
+                "SELECT id, filename, status, attempts, error, pages_done, pages_total, char_count, "
+                "document_id, analysis_id, result FROM job_documents WHERE job_id = ? ORDER BY id",
+                (job_id,),
+            ).fetchall()
+        docs = [
+            JobDocument(
+                id=r[0],
+                filename=r[1],
+                status=r[2],
+                attempts=r[3],
+                error=r[4],
+                pages_done=r[5],
+                pages_total=r[6],
+                char_count=r[7],
+                document_id=r[8],
+                analysis_id=r[9],
+                summary=DocumentSummary.model_validate(json.loads(r[10])) if r[10] else None,
+            )
+            for r in rows
+        ]
+        counts: dict[str, int] = {}
+        for d in docs:
+            counts[d.status] = counts.get(d.status, 0) + 1
+        if counts.get("done", 0) + counts.get("failed", 0) == len(docs):
+            status = "done"
+        elif counts.get("queued", 0) == len(docs):
+            status = "queued"
+        else:
+            status = "running"
+        return JobStatus(id=job[0], status=status, created=job[1], counts=counts, documents=docs)
+
+
+class JobRunner:
+    """Pulls documents off the queue and runs them through extract -> analyze."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self._extract_limit = asyncio.Semaphore(JOB_EXTRACT_CONCURRENCY)
+        self._llm_limit = asyncio.Semaphore(JOB_LLM_CONCURRENCY)
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, requeue: bool = True) -> None:
+        if requeue:
+            self.store.requeue_interrupted()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    async def _worker(self) -> None:
+        # Batch work queues behind interactive requests in the scheduler and is never shed
+        set_priority(PRIORITY_BATCH)
+        while True:
+            self._wake.clear()
+            claimed = self.store.claim_next()
+            if claimed is None:
+                await self._sleep_until_work()
+                continue
+            await self._process(*claimed)
+
+    async def _sleep_until_work(self) -> None:
+        wakeup = self.store.next_wakeup()
+        timeout = 5.0 if wakeup is None else max(0.05, min(5.0, wakeup - time.time()))
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, doc_id: int, filename: str, path: str, attempts: int, tenant: str) -> None:
+        set_tenant(tenant)
+        try:
+            def on_progress(done: int, total: int) -> None:
+                self.store.update(doc_id, pages_done=done, pages_total=total)
+
+            async with self._extract_limit:
+                pages = await extract_pages_async(filename, path, on_progress)
+            text, page_starts = join_pages(pages)
+            if not text.strip():
+                raise ValueError("No readable text found.")
+            doc = get_document_store().put(text, page_starts, filename)
+
+            self.store.update(doc_id, status="analyzing", char_count=len(text))
+            async with self._llm_limit:
+                summary = await analyze_document_async(text)
+        except transient_errors() as e:
+            attempts += 1
+            if attempts < JOB_MAX_ATTEMPTS:
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, JOB_RETRY_DELAY * 2 ** (attempts - 1))
+                self.store.update(
+                    doc_id, status="queued", attempts=attempts, error=str(e), not_before=time.time() + delay
+                )
+                self.notify()
+                return
+            self._finish(doc_id, path, status="failed", attempts=attempts, error=str(e))
+            return
+        except Exception as e:
+            self._finish(doc_id, path, status="failed", attempts=attempts + 1, error=str(e))
+            return
+
+        summary = await record_analysis_async(doc, text, summary)
+        self._finish(
+            doc_id,
+            path,
+            status="done",
+            attempts=attempts + 1,
+            error=None,
+            document_id=doc.id,
+            analysis_id=analysis_key(text),
+            result=json.dumps(summary.model_dump()),
+        )
+
+    def _finish(self, doc_id: int, path: str, **fields) -> None:
+        self.store.update(doc_id, **fields)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+_store: Optional[JobStore] = None
+_runner: Optional[JobRunner] = None
+
+
+def get_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore(JOBS_DB, JOBS_DIR)
+    return _store
+
+
+def start_runner(requeue: bool = True) -> JobRunner:
+    """Start the worker pool. Pass requeue=False when several processes share the queue, so one
+    starting up does not requeue documents another is working on."""
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(get_store())
+        _runner.start(requeue)
+    return _runner
+
+
+async def stop_runner() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
+
+
+def submit_job(uploads: list[SpooledUpload]) -> str:
+    job_id = get_store().create_job(uploads, current_tenant())
+    if _runner is not None:
+        _runner.notify()
+    return job_id
@@ -0,0 +1,111 @@
+"""
+Incremental parser for the analysis JSON as it streams from the model.
+Emits each top-level array element (summary bullet, flagged risk, question) and each
+top-level scalar (document_type) as soon as it is complete.
+"""
+import json
+from typing import Any, Optional
+
+
+class JsonItemStream:
+    """Feed raw text chunks; get back (top_level_key, value) pairs as values complete.
+
+    Only the structure the analysis prompt asks for is tracked: one top-level object whose
+    values are scalars or arrays. Anything before the first "{" (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._i = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._key: Optional[str] = None
+        self._expect_key = False
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        self.text += chunk
+        events: list[tuple[str, Any]] = []
+        t = self.text
+        while self._i < len(t) and not self._done:
+            i = self._i
+            c = t[i]
+            self._i += 1
+
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = self._load(t[self._str_start:i + 1])
+                        self._expect_key = False
+                    elif self._depth == 2 and self._item_start == self._str_start:
+                        self._emit_item(t[self._item_start:i + 1], events)
+                continue
+
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if c == '"':
+                self._mark_start(i)
+                self._in_str = True
+                self._str_start = i
+            elif c in " \t\r\n:":
+                continue
+            elif c in "{[":
+                self._mark_start(i, container=True)
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    self._emit_scalar(t[self._value_start:i] if self._value_start is not None else "", events)
+                elif self._depth == 2 and self._item_start is not None:
+                    self._emit_item(t[self._item_start:i], events)
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None:
+                    self._emit_item(t[self._item_start:i + 1], events)
+                if self._depth == 0:
+                    self._done = True
+            elif c == ",":
+                if self._depth == 1:
+                    self._emit_scalar(t[self._value_start:i] if self._value_start is not None else "", events)
+                    self._expect_key = True
+                elif self._depth == 2 and self._item_start is not None:
+                    self._emit_item(t[self._item_start:i], events)
+            else:
+                self._mark_start(i)
+        return events
+
+    def _mark_start(self, i: int, container: bool = False) -> None:
+        if self._depth == 1 and not self._expect_key and not container and self._value_start is None:
+            self._value_start = i
+        elif self._depth == 2 and self._item_start is None:
+            self._item_start = i
+
+    def _emit_item(self, raw: str, events: list) -> None:
+        self._item_start = None
+        value = self._load(raw)
+        if value is not None and self._key:
+            events.append((self._key, value))
+
+    def _emit_scalar(self, raw: str, events: list) -> None:
+        start, self._value_start = self._value_start, None
+        if start is None or not self._key:
+            return
+        events.append((self._key, self._load(raw)))
+
+    @staticmethod
+    def _load(raw: str) -> Any:
+        try:
+            return json.loads(raw.strip())
+        except ValueError:
+            return None
@@ -0,0 +1,223 @@
+"""
+In-process metrics: stage latency histograms and counters, rendered in Prometheus text format.
+Stages timed while serving a request are also collected per request and sent back in a
+Server-Timing header, so a slow response shows where its time went.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+# Seconds; wide enough for sub-millisecond parsing up to multi-minute OCR runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# (stage, seconds) pairs for the request being served; None outside a request
+_request_timings: ContextVar[Optional[list[tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        # Unlabelled counters start at 0 so the series exists before the first event
+        self._values: dict[tuple[str, ...], float] = {} if labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                out.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return out
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets))
+        # labels -> ([count per bucket, +Inf last], sum)
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total = self._series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = _labels(self.label_names, labels, f'le="{bound:g}"')
+                    out.append(f"{self.name}_bucket{le} {cumulative}")
+                cumulative += counts[-1]
+                inf = _labels(self.label_names, labels, 'le="+Inf"')
+                out.append(f"{self.name}_bucket{inf} {cumulative}")
+                out.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total[0]:.6f}")
+                out.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return out
+
+
+STAGE_SECONDS = Histogram(
+    "docreviewer_stage_seconds", "Time spent in each processing stage.", labels=("stage",)
+)
+HTTP_SECONDS = Histogram(
+    "docreviewer_http_request_seconds",
+    "Time to first response byte, by route.",
+    labels=("method", "route", "status"),
+)
+OCR_PAGES = Counter("docreviewer_ocr_pages_total", "Pages (or images) run through OCR.")
+LLM_TOKENS = Counter("docreviewer_llm_tokens_total", "LLM tokens reported in response usage.", labels=("kind",))
+PROMPT_TOKENS = Counter(
+    "docreviewer_prompt_tokens_total",
+    "Document tokens before (original) and after (sent) prompt compaction.",
+    labels=("kind",),
+)
+CLAUSE_CHARS = Counter(
+    "docreviewer_clause_index_chars_total",
+    "Document characters whose risk verdicts were reused from the clause index vs sent to the model.",
+    labels=("result",),
+)
+LLM_CALLS = Counter("docreviewer_llm_calls_total", "LLM completion calls.", labels=("mode",))
+DOCUMENT_LOOKUPS = Counter(
+    "docreviewer_document_store_lookups_total",
+    "Uploads looked up in the document store by content hash (a hit skips extraction).",
+    labels=("result",),
+)
+SCHED_DECISIONS = Counter(
+    "docreviewer_scheduler_requests_total",
+    "Work admitted to or shed from each scheduler lane.",
+    labels=("lane", "result"),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "docreviewer_queue_wait_seconds", "Time work waited for a scheduler slot.", labels=("lane",)
+)
+LLM_EVENTS = Counter(
+    "docreviewer_llm_events_total",
+    "Analyses coalesced onto an identical in-flight request, hedged calls (and hedges that answered "
+    "first), retries, calls sent to the fallback model, documents micro-batched and documents a "
+    "batch answer left out (sent again on their own).",
+    labels=("event",),
+)
+LLM_BATCH_DOCUMENTS = Histogram(
+    "docreviewer_llm_batch_documents",
+    "Documents per micro-batched LLM request.",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32),
+)
+
+_METRICS = (
+    STAGE_SECONDS,
+    HTTP_SECONDS,
+    OCR_PAGES,
+    LLM_TOKENS,
+    PROMPT_TOKENS,
+    CLAUSE_CHARS,
+    LLM_CALLS,
+    DOCUMENT_LOOKUPS,
+    SCHED_DECISIONS,
+    QUEUE_WAIT_SECONDS,
+    LLM_EVENTS,
+    LLM_BATCH_DOCUMENTS,
+)
+
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the block as `stage` in the histogram and in the current request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record_usage(usage) -> None:
+    """Count prompt/completion tokens from an OpenAI response `usage` object (may be None)."""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, "prompt")
+    LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, "completion")
+
+
+def server_timing(timings: list[tuple[str, float]]) -> str:
+    """Server-Timing header value; repeated stages (e.g. chunked LLM calls) are summed."""
+    totals: dict[str, float] = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+def render(extra: Optional[Callable[[], list[str]]] = None) -> str:
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    if extra is not None:
+        lines.extend(extra())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: collects stage timings for each HTTP request, adds a Server-Timing
+    header and records request latency by route template (not raw path, to bound cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: list[tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                route = scope.get("route")
+                HTTP_SECONDS.observe(
+                    elapsed, scope.get("method", ""), getattr(route, "path", "unmatched"), str(message["status"])
+                )
+                value = server_timing(timings + [("total", elapsed)])
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,106 @@
+"""
+Micro-batching: small pieces of work submitted close together are collected and handed to one
+send() call. A batch goes out when the window since its first item closes, or as soon as it holds
+max_items items or max_cost cost (an item that would take it past max_cost starts the next batch).
+When the system is idle (idle() is true and no batch is being sent) an item is sent at once rather
+than waiting out the window for company that is not coming. Each caller awaits only its own item's
+result.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.services.scheduler import current_priority, set_priority
+
+# send(key, values) returns one result per value, in order; an exception in the list fails only
+# that value's caller, an exception raised (or a list of the wrong length) fails the whole batch
+Send = Callable[[Hashable, list[Any]], Awaitable[list[Any]]]
+
+
+@dataclass
+class _Item:
+    value: Any
+    priority: int
+    future: asyncio.Future
+
+
+@dataclass
+class _Batch:
+    items: list[_Item] = field(default_factory=list)
+    cost: float = 0.0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Batches are kept per key (items with different keys never share a batch) and bound to the
+    event loop the batcher was created on."""
+
+    def __init__(
+        self, send: Send, window: float, max_items: int, max_cost: float,
+        idle: Optional[Callable[[], bool]] = None,
+    ):
+        self.send = send
+        self.window = window
+        self.max_items = max_items
+        self.max_cost = max_cost
+        self.idle = idle
+        self.loop = asyncio.get_running_loop()
+        self._open: dict[Hashable, _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, value: Any, cost: float = 1.0) -> Any:
+        batch = self._open.get(key)
+        if batch is not None and batch.cost + cost > self.max_cost:
+            self._flush(key)
+            batch = None
+        opened = batch is None
+        if opened:
+            batch = self._open[key] = _Batch()
+            batch.timer = self.loop.call_later(self.window, self._flush, key)
+        item = _Item(value, current_priority(), self.loop.create_future())
+        batch.items.append(item)
+        batch.cost += cost
+        if len(batch.items) >= self.max_items or batch.cost >= self.max_cost or (opened and self._idle()):
+            self._flush(key)
+        return await item.future
+
+    def _idle(self) -> bool:
+        """Nothing else is waiting or being sent, and idle() agrees."""
+        return self.idle is not None and len(self._open) == 1 and not self._tasks and self.idle()
+
+    def _flush(self, key: Hashable) -> None:
+        batch = self._open.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        # Sent in a task of its own, so a caller that goes away does not cancel the others' results
+        task = self.loop.create_task(self._send(key, batch.items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: Hashable, items: list[_Item]) -> None:
+        # The batch waits for LLM slots at the most urgent of its items' priorities
+        set_priority(min(item.priority for item in items))
+        try:
+            results = await self.send(key, [item.value for item in items])
+        except BaseException as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        if len(results) != len(items):
+            # Results are matched to items by position; a list of another length cannot be
+            error = RuntimeError(f"batch send returned {len(results)} results for {len(items)} items")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(error)
+            return
+        for item, result in zip(items, results):
+            if item.future.done():
+                continue
+            if isinstance(result, BaseException):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
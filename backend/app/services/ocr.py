@@ -0,0 +1,280 @@
+"""
+Page-streaming OCR for scanned PDFs and images.
+PDF pages are rendered a small window at a time (first_page/last_page) inside worker processes
+and OCR'd in parallel, so peak memory is bounded by the window size, not the page count.
+Images are flattened to grayscale, downscaled to a sane resolution and binarized before OCR;
+multi-page TIFFs are OCR'd frame by frame in the workers, and very tall single images are cut
+into tiles at blank rows so one large photo also spreads across the pool.
+"""
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.config import (
+    OCR_DPI,
+    OCR_IMAGE_DPI,
+    OCR_MAX_IMAGE_SIDE,
+    OCR_TILE_HEIGHT,
+    OCR_WINDOW,
+    OCR_WORKERS,
+)
+
+# Called as on_progress(pages_done, pages_total) after each page is OCR'd
+ProgressCallback = Callable[[int, int], None]
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Extraction threads reach get_page_pool concurrently; only one may create the pool
+_pool_lock = threading.Lock()
+# True in the extraction pool's worker processes (EXTRACT_POOL=process). Page work runs inline
+# there: documents are already spread over processes, and a page pool in each worker would start
+# OCR_WORKERS more processes per worker
+_inline = False
+
+
+def run_pages_inline() -> None:
+    """Initializer for worker processes that must not start a page pool of their own."""
+    global _inline
+    _inline = True
+
+
+def page_workers() -> int:
+    """Processes per-page work is spread over (1: it runs inline)."""
+    return 1 if _inline else max(1, OCR_WORKERS)
+
+
+def get_page_pool() -> ProcessPoolExecutor:
+    """Process pool shared by per-page PDF work (rendering, OCR, native parsing)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=page_workers())
+    return _pool
+
+
+def _ocr_window(path: str, first: int, last: int, dpi: int) -> list[tuple[int, str]]:
+    """Worker: render pages first..last (1-based, inclusive) and OCR them one at a time."""
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(path, dpi=dpi, first_page=first, last_page=last)
+    out = []
+    for offset, img in enumerate(images):
+        out.append((first + offset, pytesseract.image_to_string(img, lang="eng")))
+        img.close()
+    return out
+
+
+def _windows(pages: Iterable[int], size: int) -> list[tuple[int, int]]:
+    """Group sorted page numbers into contiguous runs of at most `size` pages."""
+    runs: list[tuple[int, int]] = []
+    for p in sorted(set(pages)):
+        if runs and runs[-1][1] == p - 1 and p - runs[-1][0] < size:
+            runs[-1] = (runs[-1][0], p)
+        else:
+            runs.append((p, p))
+    return runs
+
+
+def page_count(path: str) -> int:
+    from pdf2image import pdfinfo_from_path
+
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+def _bounded_results(calls: list[tuple]) -> Iterator:
+    """Run calls (fn, *args) on the page pool, at most two per worker in flight so queued work
+    does not pile up in memory; yield each result as it finishes. Runs inline, in order, in
+    processes set up with run_pages_inline."""
+    if _inline:
+        for fn, *args in calls:
+            yield fn(*args)
+        return
+    pool = get_page_pool()
+    max_inflight = max(1, OCR_WORKERS) * 2
+    todo = list(reversed(calls))
+    inflight: set[Future] = set()
+    try:
+        while todo or inflight:
+            while todo and len(inflight) < max_inflight:
+                fn, *args = todo.pop()
+                inflight.add(pool.submit(fn, *args))
+            finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                yield fut.result()
+    finally:
+        for fut in inflight:
+            fut.cancel()
+
+
+def ocr_pdf_path(
+    path: str,
+    pages: Optional[Iterable[int]] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    dpi: int = OCR_DPI,
+    window: int = OCR_WINDOW,
+) -> dict[int, str]:
+    """OCR the given 1-based pages (all pages if None). Returns {page_number: text}."""
+    if pages is None:
+        pages = range(1, page_count(path) + 1)
+    todo = _windows(pages, max(1, window))
+    total = sum(last - first + 1 for first, last in todo)
+    results: dict[int, str] = {}
+    for rows in _bounded_results([(_ocr_window, path, first, last, dpi) for first, last in todo]):
+        for page_no, text in rows:
+            results[page_no] = text
+            if on_progress is not None:
+                on_progress(len(results), total)
+    return results
+
+
+def _otsu_threshold(histogram: list[int]) -> int:
+    """Gray level that best separates ink from paper (maximizes between-class variance)."""
+    total = sum(histogram)
+    sum_all = sum(i * n for i, n in enumerate(histogram))
+    best, threshold = -1.0, 127
+    weight = level_sum = 0
+    for level, n in enumerate(histogram):
+        weight += n
+        if weight == 0:
+            continue
+        rest = total - weight
+        if rest == 0:
+            break
+        level_sum += level * n
+        diff = level_sum / weight - (sum_all - level_sum) / rest
+        between = weight * rest * diff * diff
+        if between > best:
+            best, threshold = between, level
+    return threshold
+
+
+def prepare_image(img, dpi: int = OCR_IMAGE_DPI, max_side: int = OCR_MAX_IMAGE_SIDE):
+    """Bilevel image ready for OCR: transparency flattened onto white, downscaled when scanned
+    above `dpi` or larger than `max_side` pixels, then thresholded (Otsu). JPEGs are decoded
+    at reduced size directly, so a large photo is never held at full resolution."""
+    from PIL import Image
+
+    scale = min(1.0, max_side / max(img.size))
+    src_dpi = img.info.get("dpi")
+    if src_dpi:
+        try:
+            scale = min(scale, dpi / float(src_dpi[0]))
+        except (TypeError, ValueError, ZeroDivisionError):
+            pass
+    target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    if scale < 1 and img.format == "JPEG":
+        img.draft("L", target)
+
+    if img.mode == "1" and scale >= 1:
+        return img.copy()
+    if img.mode in ("RGBA", "LA", "PA", "P"):
+        rgba = img.convert("RGBA")
+        img = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        img.alpha_composite(rgba)
+    gray = img.convert("L")
+    if gray.size != target and scale < 1:
+        gray = gray.resize(target, Image.Resampling.LANCZOS)
+    threshold = _otsu_threshold(gray.histogram())
+    return gray.point([255 if level > threshold else 0 for level in range(256)], "1")
+
+
+def _tile_bounds(img, tile_height: int) -> list[tuple[int, int]]:
+    """(top, bottom) rows of horizontal tiles about tile_height tall, each cut at the blankest
+    row near its target so no text line is split."""
+    from PIL import Image
+
+    height = img.height
+    if height < 2 * tile_height:
+        return [(0, height)]
+    # Mean brightness of each row (255 = blank)
+    rows = img.convert("L").resize((1, height), Image.Resampling.BOX).tobytes()
+    count = round(height / tile_height)
+    search = height // count // 4
+    bounds = []
+    top = 0
+    for k in range(1, count):
+        target = k * height // count
+        window = range(max(top + 1, target - search), min(height, target + search))
+        cut = max(window, key=lambda y: (rows[y], -abs(y - target)))
+        bounds.append((top, cut))
+        top = cut
+    bounds.append((top, height))
+    return bounds
+
+
+def _ocr_frame(path: str, frame: int) -> tuple[int, str]:
+    """Worker: load one frame of a (multi-page) image, prepare and OCR it."""
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.seek(frame)
+        text = pytesseract.image_to_string(prepare_image(img), lang="eng")
+    return frame, text
+
+
+def _ocr_tile(index: int, size: tuple[int, int], data: bytes) -> tuple[int, str]:
+    """Worker: OCR one bilevel tile (1 bit per pixel, so it is cheap to send)."""
+    import pytesseract
+    from PIL import Image
+
+    return index, pytesseract.image_to_string(Image.frombytes("1", size, data), lang="eng")
+
+
+def image_frames(path: str) -> int:
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def ocr_image_path(path: str, on_progress: Optional[ProgressCallback] = None) -> dict[int, str]:
+    """OCR every frame of an image file. Returns {frame_number (1-based): text}. Multi-frame
+    images are OCR'd one frame per task; a single tall image is split into tiles whose text is
+    stitched back in order."""
+    frames = image_frames(path)
+    if frames > 1:
+        results: dict[int, str] = {}
+        for frame, text in _bounded_results([(_ocr_frame, path, i) for i in range(frames)]):
+            results[frame + 1] = text
+            if on_progress is not None:
+                on_progress(len(results), frames)
+        return results
+
+    from PIL import Image
+
+    with Image.open(path) as img:
+        prepared = prepare_image(img)
+    bounds = _tile_bounds(prepared, OCR_TILE_HEIGHT) if page_workers() > 1 else [(0, prepared.height)]
+    if len(bounds) == 1:
+        import pytesseract
+
+        text = pytesseract.image_to_string(prepared, lang="eng")
+    else:
+        calls = []
+        for i, (top, bottom) in enumerate(bounds):
+            tile = prepared.crop((0, top, prepared.width, bottom))
+            calls.append((_ocr_tile, i, tile.size, tile.tobytes()))
+        prepared.close()
+        tiles = dict(_bounded_results(calls))
+        text = "\n".join(tiles[i].strip("\n") for i in range(len(bounds)))
+    if on_progress is not None:
+        on_progress(1, 1)
+    return {1: text}
+
+
+@contextmanager
+def spilled_file(data: bytes, suffix: str = ".pdf") -> Iterator[str]:
+    """Write the upload to a temp file once so workers read from disk instead of copying bytes."""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield path
+    finally:
+        os.unlink(path)
+
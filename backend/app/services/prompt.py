@@ -0,0 +1,250 @@
+"""
+Prompt preparation: compact extracted text before it is sent to the model.
+Repeated page headers/footers and page-number lines are dropped, layout whitespace is collapsed,
+and the result is cut to a token budget (not a character count). The compacted text keeps a map
+back to offsets in the original, so positions found in the prompt can be located in the document.
+"""
+import math
+import re
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Protocol
+
+from app.config import OPENAI_MODEL, PROMPT_MAX_TOKENS, PROMPT_TOKENIZER
+
+# Lines at the top/bottom of a page that are checked for repeated headers and footers
+EDGE_LINES = 2
+# A header/footer must repeat on at least this many pages, and on half of them
+MIN_REPEATS = 3
+MAX_BOILERPLATE_CHARS = 100
+
+_BLOCK_SPLIT_RE = re.compile(r"\n[ \t\f\v\r]*\n")
+_RUN_RE = re.compile(r"\S+(?: \S+)*")
+_DIGITS_RE = re.compile(r"\d+")
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s*)?[-–—(\[ ]*#[-–—)\] ]*(?:(?:of|/)\s*#)?$")
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+    def prefix_chars(self, text: str, max_tokens: int) -> int:
+        """Length of the longest prefix of text that fits in max_tokens."""
+        ...
+
+
+class HeuristicTokenizer:
+    """Offline estimate close to BPE tokenizers on English prose: one token per punctuation
+    mark, per run of up to 8 word characters, per line break and per run of layout whitespace."""
+
+    name = "heuristic"
+    _TOKEN_RE = re.compile(r"\w{1,8}|[^\w\s]|\s{2,}|\n")
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in self._TOKEN_RE.finditer(text))
+
+    def prefix_chars(self, text: str, max_tokens: int) -> int:
+        if max_tokens <= 0:
+            return 0
+        for i, m in enumerate(self._TOKEN_RE.finditer(text), 1):
+            if i == max_tokens:
+                return m.end()
+        return len(text)
+
+
+class TiktokenTokenizer:
+    name = "tiktoken"
+
+    def __init__(self, model: str):
+        import tiktoken
+
+        try:
+            self._enc = tiktoken.encoding_for_model(model.split("/")[-1])
+        except KeyError:
+            self._enc = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        return len(self._enc.encode(text, disallowed_special=()))
+
+    def prefix_chars(self, text: str, max_tokens: int) -> int:
+        tokens = self._enc.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return len(text)
+        return len(self._enc.decode(tokens[:max_tokens]))
+
+
+_tokenizer: Optional[Tokenizer] = None
+
+
+def get_tokenizer() -> Tokenizer:
+    """PROMPT_TOKENIZER=auto uses tiktoken when it is installed (and its encoding can be loaded),
+    otherwise the offline heuristic."""
+    global _tokenizer
+    if _tokenizer is None:
+        if PROMPT_TOKENIZER in ("auto", "tiktoken"):
+            try:
+                _tokenizer = TiktokenTokenizer(OPENAI_MODEL)
+            except Exception:
+                if PROMPT_TOKENIZER == "tiktoken":
+                    raise
+        if _tokenizer is None:
+            _tokenizer = HeuristicTokenizer()
+    return _tokenizer
+
+
+def set_tokenizer(tokenizer: Optional[Tokenizer]) -> None:
+    """Plug in another tokenizer (anything with count() and prefix_chars()); None resets."""
+    global _tokenizer
+    _tokenizer = tokenizer
+
+
+@dataclass
+class CompactText:
+    """Compacted text plus a piecewise map back to the original: piece k of the compacted text
+    starts at comp_starts[k], is copied verbatim from orig_starts[k] and is lengths[k] long.
+    Characters between pieces are inserted separators (a space or line breaks)."""
+
+    text: str
+    comp_starts: list[int] = field(default_factory=list)
+    orig_starts: list[int] = field(default_factory=list)
+    lengths: list[int] = field(default_factory=list)
+
+    def original(self, pos: int) -> int:
+        """Offset in the original text of compacted position pos (separators map to the end of
+        the preceding piece)."""
+        k = bisect_right(self.comp_starts, pos) - 1
+        if k < 0:
+            return self.orig_starts[0] if self.orig_starts else 0
+        return self.orig_starts[k] + min(pos - self.comp_starts[k], self.lengths[k])
+
+    def original_span(self, start: int, end: int) -> tuple[int, int]:
+        if end <= start:
+            o = self.original(start)
+            return o, o
+        return self.original(start), self.original(end - 1) + 1
+
+
+def _line_key(line: str) -> str:
+    """Comparison key for header/footer detection. Digits are ignored only in page-number lines
+    ("Page 3 of 40", "- 12 -"), so numbered headings like "Section 4" never look repeated."""
+    key = " ".join(line.split()).lower()
+    masked = _DIGITS_RE.sub("#", key)
+    return masked if "page" in masked or _PAGE_NUMBER_RE.match(masked) else key
+
+
+def _blocks(text: str) -> list[list[tuple[int, int]]]:
+    """Page-like blocks (separated by blank lines), each a list of (start, end) of its non-empty lines.
+    Extraction joins PDF pages with a blank line, so for PDFs a block is usually one page."""
+    blocks = []
+    pos = 0
+    for sep in list(_BLOCK_SPLIT_RE.finditer(text)) + [None]:
+        end = sep.start() if sep else len(text)
+        lines = []
+        line_start = pos
+        while line_start <= end:
+            nl = text.find("\n", line_start, end)
+            line_end = end if nl == -1 else nl
+            if text[line_start:line_end].strip():
+                lines.append((line_start, line_end))
+            line_start = line_end + 1
+        if lines:
+            blocks.append(lines)
+        pos = sep.end() if sep else len(text)
+    return blocks
+
+
+def _boilerplate(text: str, blocks: list[list[tuple[int, int]]]) -> set[tuple[int, int]]:
+    """Lines to drop: short lines that repeat at the edges of many blocks. Page-number lines repeat
+    once their digits are masked (_line_key); a lone "(3)" or "3" that does not recur is list
+    numbering or content, and is kept."""
+    edges = []
+    for lines in blocks:
+        edge = lines[:EDGE_LINES] + [ln for ln in lines[-EDGE_LINES:] if ln not in lines[:EDGE_LINES]]
+        edges.append([(ln, _line_key(text[ln[0]:ln[1]])) for ln in edge])
+
+    counts: Counter = Counter()
+    for edge in edges:
+        counts.update({key for _, key in edge if len(key) <= MAX_BOILERPLATE_CHARS})
+    min_repeats = max(MIN_REPEATS, math.ceil(len(blocks) / 2))
+    repeated = {key for key, n in counts.items() if n >= min_repeats}
+
+    drop = set()
+    for edge in edges:
+        for ln, key in edge:
+            if key in repeated:
+                drop.add(ln)
+    return drop
+
+
+def compact(text: str) -> CompactText:
+    """Drop repeated headers/footers and page numbers; collapse runs of spaces and blank lines."""
+    blocks = _blocks(text or "")
+    drop = _boilerplate(text, blocks) if len(blocks) >= MIN_REPEATS else set()
+
+    out: list[str] = []
+    result = CompactText(text="")
+    size = 0
+    for lines in blocks:
+        kept = [ln for ln in lines if ln not in drop]
+        if not kept:
+            continue
+        for i, (start, end) in enumerate(kept):
+            if size:
+                sep = "\n" if i else "\n\n"
+                out.append(sep)
+                size += len(sep)
+            first = True
+            for m in _RUN_RE.finditer(text, start, end):
+                if not first:
+                    out.append(" ")
+                    size += 1
+                first = False
+                piece = m.group()
+                result.comp_starts.append(size)
+                result.orig_starts.append(m.start())
+                result.lengths.append(len(piece))
+                out.append(piece)
+                size += len(piece)
+    result.text = "".join(out)
+    return result
+
+
+@dataclass
+class PreparedPrompt:
+    source: str                # original text
+    compacted: CompactText     # compacted (and possibly truncated) text with offset map
+    original_tokens: int       # tokens the old verbatim 120k-character slice would have cost
+    tokens: int                # tokens actually sent
+    truncated: bool
+
+    @property
+    def text(self) -> str:
+        return self.compacted.text
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+def prepare_prompt(text: str, max_tokens: int = PROMPT_MAX_TOKENS) -> PreparedPrompt:
+    tokenizer = get_tokenizer()
+    compacted = compact(text)
+    tokens = tokenizer.count(compacted.text)
+    truncated = tokens > max_tokens
+    if truncated:
+        cut = tokenizer.prefix_chars(compacted.text, max_tokens)
+        compacted.text = compacted.text[:cut]
+        keep = bisect_right(compacted.comp_starts, cut)
+        del compacted.comp_starts[keep:], compacted.orig_starts[keep:], compacted.lengths[keep:]
+        if compacted.lengths:
+            compacted.lengths[-1] = min(compacted.lengths[-1], cut - compacted.comp_starts[-1])
+        tokens = tokenizer.count(compacted.text)
+    return PreparedPrompt(
+        source=text,
+        compacted=compacted,
+        original_tokens=tokenizer.count(text[:120000]),
+        tokens=tokens,
+        truncated=truncated,
+    )
@@ -0,0 +1,92 @@
+"""
+Revision-aware re-analysis: when an upload is a new version of an analyzed document, diff the
+two texts section by section and send only modified or added sections to the model. The result is
+merged into the previous version's summary, and a change report lists what moved.
+"""
+from difflib import SequenceMatcher
+from typing import Optional
+
+from app.config import OPENAI_MODEL
+from app.schemas import ChangeReport, DocumentSummary, SectionChange
+from app.services.ai_analyzer import SYSTEM_PROMPT, analyze_excerpt_async, merge_revision
+from app.services.analysis_cache import CachedAnalysis, cache_key, get_cache
+from app.services.clause_index import Unit, split_units
+from app.services.highlight import normalize_clause
+from app.services.metrics import timed
+
+REVISION_PREFACE = (
+    "The sections below were changed or added in a new version of a document that was already "
+    "reviewed; the rest of the document is unchanged."
+)
+
+
+def _key(unit: Unit) -> str:
+    return normalize_clause(unit.text).lower()
+
+
+def revision_key(text: str, previous_id: str, model: Optional[str] = None) -> str:
+    """Cache key of `text` analyzed as a revision of `previous_id`. The merged summary is not a full
+    analysis of `text`, so it is kept apart from analysis_key(text) and never served for it."""
+    return cache_key(text, model or OPENAI_MODEL, f"{SYSTEM_PROMPT}\0revision of {previous_id}")
+
+
+def diff_sections(old: str, new: str) -> list[tuple[str, Optional[Unit], Optional[Unit]]]:
+    """Align the two versions' sections. Returns (status, old_unit, new_unit) in new-document order,
+    with status unchanged, modified, added or removed. Inside a changed run, sections are paired
+    by heading first, then by position."""
+    old_units, new_units = split_units(old), split_units(new)
+    matcher = SequenceMatcher(None, [_key(u) for u in old_units], [_key(u) for u in new_units], autojunk=False)
+    out: list[tuple[str, Optional[Unit], Optional[Unit]]] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            out.extend(("unchanged", o, n) for o, n in zip(old_units[i1:i2], new_units[j1:j2]))
+            continue
+        olds = list(old_units[i1:i2])
+        pairs: dict[int, Unit] = {}
+        for j, n in enumerate(new_units[j1:j2]):
+            match = next((o for o in olds if n.heading and o.heading == n.heading), None)
+            if match is not None:
+                olds.remove(match)
+                pairs[j] = match
+        for j, n in enumerate(new_units[j1:j2]):
+            if j not in pairs and olds:
+                pairs[j] = olds.pop(0)
+            out.append(("modified", pairs[j], n) if j in pairs else ("added", None, n))
+        out.extend(("removed", o, None) for o in olds)
+    return out
+
+
+async def analyze_revision_async(
+    text: str, previous: CachedAnalysis, model: Optional[str] = None
+) -> tuple[DocumentSummary, ChangeReport]:
+    """Analyze `text` as a new version of `previous`; only changed sections reach the model. The
+    merged summary is cached under revision_key."""
+    with timed("diff"):
+        diff = diff_sections(previous.text, text)
+    changed = [n for status, _, n in diff if status in ("modified", "added")]
+    body = "".join(n.text for n in changed)
+
+    changes = await analyze_excerpt_async(body, model, REVISION_PREFACE) if body.strip() else None
+    summary, added, removed = merge_revision(previous.summary, changes, text)
+
+    counts = {"unchanged": 0, "modified": 0, "added": 0, "removed": 0}
+    for status, _, _ in diff:
+        counts[status] += 1
+    report = ChangeReport(
+        previous_id=previous.analysis_id,
+        sections_unchanged=counts["unchanged"],
+        sections_modified=counts["modified"],
+        sections_added=counts["added"],
+        sections_removed=counts["removed"],
+        changes=[
+            SectionChange(status=status, heading=(n or o).heading, chars=len((n or o).text))
+            for status, o, n in diff
+            if status != "unchanged"
+        ],
+        risks_added=added,
+        risks_removed=removed,
+        chars_analyzed=len(body),
+        chars_total=len(text),
+    )
+    get_cache().put(revision_key(text, previous.analysis_id, model), text, summary)
+    return summary, report
@@ -0,0 +1,225 @@
+"""
+Admission control for the expensive stages. Native extraction, OCR and LLM calls each run in a
+lane: a concurrency cap plus a bounded wait queue served by priority (pasted text first, then
+uploads, then batch jobs; smaller work first within a priority). Work that would wait longer than
+the lane's budget, or find the queue ahead of it full, is refused up front with Overloaded (429 +
+Retry-After) rather than timing out behind a burst of scanned uploads. Batch jobs are never
+refused; they wait their turn.
+"""
+import asyncio
+import itertools
+import math
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from app.config import (
+    EXTRACT_WORKERS,
+    LLM_CONCURRENCY,
+    OCR_CONCURRENCY,
+    SCHED_MAX_WAIT,
+    SCHED_OCR_MAX_WAIT,
+    SCHED_QUEUE_SIZE,
+)
+from app.services.metrics import QUEUE_WAIT_SECONDS, SCHED_DECISIONS
+
+PRIORITY_INTERACTIVE = 0  # pasted text: no extraction, the user is waiting
+PRIORITY_UPLOAD = 1
+PRIORITY_BATCH = 2  # background jobs: never shed
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_UPLOAD: "upload", PRIORITY_BATCH: "batch"}
+
+# Weight of the latest slot hold time in the per-lane service time average
+_SERVICE_ALPHA = 0.2
+# Seconds a slot is assumed to be held until the lane has measured it, so a burst arriving at
+# startup is already bounded by the wait budget
+_INITIAL_SERVICE = {"extract": 1.0, "ocr": 10.0, "llm": 10.0}
+
+_priority: ContextVar[int] = ContextVar("sched_priority", default=PRIORITY_UPLOAD)
+
+
+def set_priority(priority: int) -> None:
+    """Priority of scheduler work done by the current request or task (and tasks it starts)."""
+    _priority.set(priority)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class Overloaded(Exception):
+    """A lane is too busy to take more work at this priority; retry after `retry_after` seconds."""
+
+    def __init__(self, lane: str, retry_after: int, estimated_wait: float):
+        super().__init__(f"Server busy ({lane} queue). Retry in {retry_after} s.")
+        self.lane = lane
+        self.retry_after = retry_after
+        self.estimated_wait = estimated_wait
+
+
+@dataclass(eq=False)
+class _Waiter:
+    priority: int
+    cost: float
+    seq: int
+    enqueued: float
+    future: asyncio.Future
+
+
+class Lane:
+    def __init__(self, name: str, capacity: int, max_queue: int, max_wait: float, service: float = 1.0):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._service = service  # average seconds a slot is held
+        self._waits: deque[float] = deque(maxlen=1000)
+        self.admitted = 0
+        self.shed = 0
+
+    def _ahead(self, priority: int) -> int:
+        return sum(1 for w in self._waiters if w.priority <= priority)
+
+    def estimate_wait(self, priority: int = PRIORITY_UPLOAD) -> float:
+        """Seconds new work at `priority` would queue: everything at the same or a higher
+        priority drains first, `capacity` at a time."""
+        if self.has_capacity():
+            return 0.0
+        return (self._ahead(priority) + 1) * self._service / self.capacity
+
+    def has_capacity(self) -> bool:
+        """A slot is free and nobody is waiting for one."""
+        return self.in_flight < self.capacity and not self._waiters
+
+    def admit(self, priority: Optional[int] = None) -> None:
+        """Raise Overloaded if work at `priority` should be refused now. Batch work always passes."""
+        priority = current_priority() if priority is None else priority
+        if priority >= PRIORITY_BATCH:
+            return
+        ahead = self._ahead(priority)
+        wait = self.estimate_wait(priority)
+        full = self.in_flight >= self.capacity and ahead >= self.max_queue
+        if not full and wait <= self.max_wait:
+            return
+        self.shed += 1
+        SCHED_DECISIONS.inc(1, self.name, "shed")
+        # Time until the queue ahead is back under its bound and the wait under budget
+        drain = (ahead - self.max_queue + 1) * self._service / self.capacity if full else 0.0
+        raise Overloaded(self.name, max(1, math.ceil(max(drain, wait - self.max_wait))), wait)
+
+    @asynccontextmanager
+    async def slot(
+        self, cost: float = 1.0, priority: Optional[int] = None, shed: bool = True
+    ) -> AsyncIterator[float]:
+        """Hold one of the lane's slots for the block; yields the seconds spent queueing.
+        Cheaper work (lower cost) is served first within a priority. With shed the call is
+        admitted first and may raise Overloaded; pass shed=False for work already admitted."""
+        priority = current_priority() if priority is None else priority
+        if shed:
+            self.admit(priority)
+        waited = await self._acquire(priority, cost)
+        start = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self._release(time.monotonic() - start)
+
+    async def _acquire(self, priority: int, cost: float) -> float:
+        enqueued = time.monotonic()
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+        else:
+            waiter = _Waiter(priority, cost, next(self._seq), enqueued, asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+            try:
+                await waiter.future
+            except BaseException:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.future.cancelled():
+                    # Cancelled after being handed a slot: pass it on
+                    self.in_flight -= 1
+                    self._wake()
+                raise
+        waited = time.monotonic() - enqueued
+        self.admitted += 1
+        self._waits.append(waited)
+        SCHED_DECISIONS.inc(1, self.name, "admitted")
+        QUEUE_WAIT_SECONDS.observe(waited, self.name)
+        return waited
+
+    def _release(self, held: float) -> None:
+        self._service += _SERVICE_ALPHA * (held - self._service)
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.in_flight < self.capacity and self._waiters:
+            waiter = self._next()
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                continue
+            waiter.future.set_result(None)
+            self.in_flight += 1
+
+    def _next(self) -> _Waiter:
+        """Best waiter by (priority, cost, arrival); work queued past the lane's wait budget goes
+        first, oldest first, so large or low-priority work cannot starve."""
+        now = time.monotonic()
+        overdue = [w for w in self._waiters if now - w.enqueued > self.max_wait]
+        if overdue:
+            return min(overdue, key=lambda w: w.seq)
+        return min(self._waiters, key=lambda w: (w.priority, w.cost, w.seq))
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for w in self._waiters:
+            queued[PRIORITY_NAMES[w.priority]] += 1
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "queued_by_priority": queued,
+            "max_queue": self.max_queue,
+            "max_wait_s": self.max_wait,
+            "estimated_wait_s": round(self.estimate_wait(PRIORITY_UPLOAD), 3),
+            "service_s": round(self._service, 3),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "wait_p50_s": round(statistics.median(waits), 4) if waits else 0.0,
+            "wait_p95_s": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+        }
+
+
+class Scheduler:
+    def __init__(self, lanes: list[Lane]):
+        self.lanes = {lane.name: lane for lane in lanes}
+
+    def lane(self, name: str) -> Lane:
+        return self.lanes[name]
+
+    def stats(self) -> dict:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(
+            [
+                Lane("extract", EXTRACT_WORKERS, SCHED_QUEUE_SIZE, SCHED_MAX_WAIT, _INITIAL_SERVICE["extract"]),
+                Lane("ocr", OCR_CONCURRENCY, SCHED_QUEUE_SIZE, SCHED_OCR_MAX_WAIT, _INITIAL_SERVICE["ocr"]),
+                Lane("llm", LLM_CONCURRENCY, SCHED_QUEUE_SIZE, SCHED_MAX_WAIT, _INITIAL_SERVICE["llm"]),
+            ]
+        )
+    return _scheduler
@@ -0,0 +1,428 @@
+"""
+Search across analyzed documents: a SQLite FTS5 index over document text, filename and type, and
+over every flagged risk (level, description, clause). Documents are added whenever an analysis
+finishes, so "which contracts have an auto-renewal clause flagged high" is one indexed query
+instead of re-running analyses. reindex() rebuilds the index from the document store and both
+tiers of the analysis cache, and drops documents the store no longer holds.
+"""
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from app.config import DOCUMENTS_DB, SEARCH_DB, SEARCH_ENABLED
+from app.schemas import DocumentSummary, SearchHit, SearchResponse, SearchRisk
+from app.services.ai_analyzer import analysis_key
+from app.services.analysis_cache import get_cache
+from app.services.document_store import StoredDocument, get_document_store, locate_risks
+
+RISK_LEVELS = ("high", "medium", "low")
+SCOPES = ("all", "text", "risks")
+SNIPPET_TOKENS = 16
+# Reindex writes this many documents per transaction
+BATCH_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_documents (
+    id INTEGER PRIMARY KEY,
+    document_id TEXT NOT NULL UNIQUE,
+    analysis_id TEXT,
+    filename TEXT NOT NULL,
+    document_type TEXT,
+    pages INTEGER NOT NULL DEFAULT 0,
+    chars INTEGER NOT NULL DEFAULT 0,
+    risks_high INTEGER NOT NULL DEFAULT 0,
+    risks_medium INTEGER NOT NULL DEFAULT 0,
+    risks_low INTEGER NOT NULL DEFAULT 0,
+    indexed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_documents_indexed ON search_documents(indexed);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    filename, document_type, body, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS search_risks (
+    id INTEGER PRIMARY KEY,
+    doc INTEGER NOT NULL,
+    risk_level TEXT NOT NULL,
+    description TEXT NOT NULL,
+    clause TEXT NOT NULL,
+    start INTEGER,
+    page INTEGER
+);
+CREATE INDEX IF NOT EXISTS search_risks_doc ON search_risks(doc);
+CREATE INDEX IF NOT EXISTS search_risks_level ON search_risks(risk_level, doc);
+CREATE VIRTUAL TABLE IF NOT EXISTS risks_fts USING fts5(
+    description, clause, content = 'search_risks', content_rowid = 'id', tokenize = 'porter unicode61'
+);
+"""
+
+_TERM_RE = re.compile(r'"[^"]*"\*?|\S+')
+_WORD_RE = re.compile(r"\w+")
+
+
+def fts_query(q: str) -> str:
+    """User query -> FTS5 MATCH expression. Terms are ANDed; "quoted phrases", a trailing * for
+    prefixes and OR / NOT between terms are honoured; everything else is quoted, so punctuation
+    (auto-renewal, 30-day) can never be an FTS syntax error."""
+    out: list[str] = []
+    for raw in _TERM_RE.findall(q or ""):
+        if raw in ("OR", "NOT", "AND"):
+            if out and out[-1] not in ("OR", "NOT", "AND"):
+                out.append(raw)
+            continue
+        words = _WORD_RE.findall(raw)
+        if words:
+            out.append('"' + " ".join(words) + '"' + ("*" if raw.endswith("*") else ""))
+    while out and out[-1] in ("OR", "NOT", "AND"):
+        out.pop()
+    return " ".join(out)
+
+
+def _normalize_level(level: Optional[str]) -> Optional[str]:
+    level = (level or "").strip().lower()
+    return level or None
+
+
+@dataclass
+class _Entry:
+    """A document ready to be written to the index."""
+
+    doc: StoredDocument
+    text: str
+    summary: DocumentSummary
+    analysis_id: Optional[str]
+
+
+@dataclass
+class ReindexReport:
+    documents: int = 0
+    skipped: int = 0  # stored documents without a cached analysis (their index rows are kept)
+    pruned: int = 0  # indexed documents the document store has evicted
+    seconds: float = 0.0
+
+
+class SearchIndex:
+    def __init__(self, db_path: str = ""):
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        if db_path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, doc: StoredDocument, text: str, summary: DocumentSummary, analysis_id: Optional[str] = None) -> None:
+        """Index (or re-index) one analyzed document."""
+        self.add_many([_Entry(doc, text, summary, analysis_id)])
+
+    def add_many(self, entries: Iterable[_Entry]) -> int:
+        count = 0
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for entry in entries:
+                    self._write(entry)
+                    count += 1
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return count
+
+    def _write(self, entry: _Entry) -> None:
+        doc, summary = entry.doc, entry.summary
+        self._delete(doc.id)
+        levels = [_normalize_level(r.risk_level) for r in summary.flagged_risks]
+        cur = self._db.execute(
+            "INSERT INTO search_documents (document_id, analysis_id, filename, document_type, pages, chars, "
+            "risks_high, risks_medium, risks_low, indexed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                doc.id,
+                entry.analysis_id,
+                doc.filename,
+                summary.document_type,
+                doc.pages,
+                doc.chars,
+                levels.count("high"),
+                levels.count("medium"),
+                levels.count("low"),
+                time.time(),
+            ),
+        )
+        rowid = cur.lastrowid
+        self._db.execute(
+            "INSERT INTO documents_fts (rowid, filename, document_type, body) VALUES (?, ?, ?, ?)",
+            (rowid, doc.filename, summary.document_type or "", entry.text),
+        )
+        for r, level in zip(summary.flagged_risks, levels):
+            cur = self._db.execute(
+                "INSERT INTO search_risks (doc, risk_level, description, clause, start, page) VALUES (?, ?, ?, ?, ?, ?)",
+                (rowid, level or "low", r.description or "", r.clause or "", r.start, r.page),
+            )
+            self._db.execute(
+                "INSERT INTO risks_fts (rowid, description, clause) VALUES (?, ?, ?)",
+                (cur.lastrowid, r.description or "", r.clause or ""),
+            )
+
+    def _delete(self, document_id: str) -> None:
+        row = self._db.execute("SELECT id FROM search_documents WHERE document_id = ?", (document_id,)).fetchone()
+        if row is None:
+            return
+        rowid = row[0]
+        # External-content FTS rows are removed with the 'delete' command and their old values
+        for risk_id, description, clause in self._db.execute(
+            "SELECT id, description, clause FROM search_risks WHERE doc = ?", (rowid,)
+        ).fetchall():
+            self._db.execute(
+                "INSERT INTO risks_fts (risks_fts, rowid, description, clause) VALUES ('delete', ?, ?, ?)",
+                (risk_id, description, clause),
+            )
+        self._db.execute("DELETE FROM search_risks WHERE doc = ?", (rowid,))
+        self._db.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+        self._db.execute("DELETE FROM search_documents WHERE id = ?", (rowid,))
+
+    def remove(self, document_id: str) -> None:
+        with self._lock:
+            self._delete(document_id)
+            self._db.commit()
+
+    def prune(self, keep: set[str]) -> int:
+        """Remove every indexed document whose id is not in keep."""
+        with self._lock:
+            ids = [row[0] for row in self._db.execute("SELECT document_id FROM search_documents")]
+            gone = [i for i in ids if i not in keep]
+            for document_id in gone:
+                self._delete(document_id)
+            self._db.commit()
+        return len(gone)
+
+    def search(
+        self,
+        q: str = "",
+        risk_level: Optional[str] = None,
+        document_type: Optional[str] = None,
+        scope: str = "all",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> SearchResponse:
+        """Documents matching q (text and/or risks, per scope), best first (BM25). With risk_level
+        only risks at that level count as matches; without q, documents are filtered and listed
+        newest first. Each hit carries its matching risks and a text snippet."""
+        started = time.perf_counter()
+        match = fts_query(q)
+        level = _normalize_level(risk_level)
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+        if level is not None and level not in RISK_LEVELS:
+            raise ValueError(f"risk_level must be one of {', '.join(RISK_LEVELS)}")
+        use_text = bool(match) and scope in ("all", "text") and level is None
+        use_risks = scope in ("all", "risks") or level is not None
+
+        where = ["1"]
+        params: list = []
+        if document_type:
+            where.append("d.document_type LIKE ?")
+            params.append(f"%{document_type}%")
+
+        with self._lock:
+            if match:
+                hits = []
+                hit_params: list = []
+                if use_text:
+                    hits.append(
+                        "SELECT rowid AS doc, bm25(documents_fts, 4.0, 2.0, 1.0) AS score "
+                        "FROM documents_fts WHERE documents_fts MATCH ?"
+                    )
+                    hit_params.append(match)
+                if use_risks:
+                    # A hit in a flagged risk counts double: it is what the model judged concerning.
+                    # CROSS JOIN keeps the FTS table driving the join, which bm25() and snippet() need.
+                    hits.append(
+                        "SELECT r.doc AS doc, 2 * bm25(risks_fts) AS score "
+                        "FROM risks_fts CROSS JOIN search_risks r ON r.id = risks_fts.rowid "
+                        "WHERE risks_fts MATCH ?" + (" AND r.risk_level = ?" if level else "")
+                    )
+                    hit_params += [match] + ([level] if level else [])
+                if not hits:
+                    return SearchResponse(query=q, total=0, limit=limit, offset=offset)
+                sql = (
+                    f"WITH hits AS MATERIALIZED ({' UNION ALL '.join(hits)}) "
+                    "SELECT d.id, d.document_id, d.analysis_id, d.filename, d.document_type, d.pages, d.chars, "
+                    "d.risks_high, d.risks_medium, d.risks_low, MIN(h.score) AS score, COUNT(*) OVER () "
+                    f"FROM hits h JOIN search_documents d ON d.id = h.doc WHERE {' AND '.join(where)} "
+                    "GROUP BY d.id ORDER BY score LIMIT ? OFFSET ?"
+                )
+                rows = self._db.execute(sql, hit_params + params + [limit, offset]).fetchall()
+            else:
+                if level:
+                    where.append("EXISTS (SELECT 1 FROM search_risks r WHERE r.doc = d.id AND r.risk_level = ?)")
+                    params.append(level)
+                sql = (
+                    "SELECT d.id, d.document_id, d.analysis_id, d.filename, d.document_type, d.pages, d.chars, "
+                    "d.risks_high, d.risks_medium, d.risks_low, 0.0, COUNT(*) OVER () "
+                    f"FROM search_documents d WHERE {' AND '.join(where)} "
+                    "ORDER BY d.indexed DESC LIMIT ? OFFSET ?"
+                )
+                rows = self._db.execute(sql, params + [limit, offset]).fetchall()
+
+            rowids = [r[0] for r in rows]
+            risks = self._matching_risks(rowids, match if use_risks else "", level)
+            snippets = self._snippets(rowids, match) if use_text else {}
+
+        results = [
+            SearchHit(
+                document_id=r[1],
+                analysis_id=r[2],
+                filename=r[3],
+                document_type=r[4],
+                pages=r[5],
+                chars=r[6],
+                risk_counts={"high": r[7], "medium": r[8], "low": r[9]},
+                score=round(-r[10], 4),
+                snippet=snippets.get(r[0]),
+                risks=risks.get(r[0], []),
+            )
+            for r in rows
+        ]
+        return SearchResponse(
+            query=q,
+            total=rows[0][11] if rows else 0,
+            limit=limit,
+            offset=offset,
+            took_ms=round((time.perf_counter() - started) * 1000, 2),
+            results=results,
+        )
+
+    def _matching_risks(self, rowids: list[int], match: str, level: Optional[str]) -> dict[int, list[SearchRisk]]:
+        """Risks of the given documents that match the query (all of them at `level` without one)."""
+        if not rowids or (not match and not level):
+            return {}
+        marks = ",".join("?" * len(rowids))
+        if match:
+            sql = (
+                "SELECT r.doc, r.risk_level, r.description, r.clause, r.start, r.page, "
+                f"snippet(risks_fts, -1, '[', ']', '…', {SNIPPET_TOKENS}) "
+                "FROM risks_fts CROSS JOIN search_risks r ON r.id = risks_fts.rowid "
+                f"WHERE risks_fts MATCH ? AND r.doc IN ({marks})" + (" AND r.risk_level = ?" if level else "") +
+                " ORDER BY r.doc, bm25(risks_fts)"
+            )
+            params = [match, *rowids] + ([level] if level else [])
+        else:
+            sql = (
+                "SELECT doc, risk_level, description, clause, start, page, NULL FROM search_risks "
+                f"WHERE doc IN ({marks}) AND risk_level = ? ORDER BY doc, id"
+            )
+            params = [*rowids, level]
+        out: dict[int, list[SearchRisk]] = {}
+        for doc, lvl, description, clause, start, page, snippet in self._db.execute(sql, params):
+            out.setdefault(doc, []).append(
+                SearchRisk(risk_level=lvl, description=description, clause=clause, start=start, page=page, snippet=snippet)
+            )
+        return out
+
+    def _snippets(self, rowids: list[int], match: str) -> dict[int, str]:
+        if not rowids:
+            return {}
+        marks = ",".join("?" * len(rowids))
+        rows = self._db.execute(
+            f"SELECT rowid, snippet(documents_fts, 2, '[', ']', '…', {SNIPPET_TOKENS}) FROM documents_fts "
+            f"WHERE documents_fts MATCH ? AND rowid IN ({marks})",
+            [match, *rowids],
+        )
+        return dict(rows.fetchall())
+
+    def stats(self) -> dict:
+        with self._lock:
+            docs = self._db.execute("SELECT COUNT(*) FROM search_documents").fetchone()[0]
+            risks = self._db.execute("SELECT COUNT(*) FROM search_risks").fetchone()[0]
+        return {"documents": docs, "risks": risks}
+
+    def optimize(self) -> None:
+        """Merge FTS segments (worth doing after a bulk load)."""
+        with self._lock:
+            self._db.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+            self._db.execute("INSERT INTO risks_fts (risks_fts) VALUES ('optimize')")
+            self._db.commit()
+
+
+def record_analysis(
+    doc: StoredDocument, text: str, summary: DocumentSummary, analysis_id: Optional[str] = None
+) -> DocumentSummary:
+    """Locate the summary's risks in the document and add it to the search index under analysis_id
+    (analysis_key(text) by default). Returns the summary with risk offsets and pages; indexing
+    failures never fail the analysis."""
+    located = locate_risks(summary, text, doc)
+    index = get_search_index()
+    if index is not None:
+        try:
+            index.add(doc, text, located, analysis_id or analysis_key(text))
+        except sqlite3.Error:
+            pass
+    return located
+
+
+async def record_analysis_async(
+    doc: StoredDocument, text: str, summary: DocumentSummary, analysis_id: Optional[str] = None
+) -> DocumentSummary:
+    """record_analysis in a worker thread: locating risks in a long document and the FTS insert
+    would otherwise hold up the event loop."""
+    return await asyncio.to_thread(record_analysis, doc, text, summary, analysis_id)
+
+
+def _prepare(document_id: str) -> Optional[_Entry]:
+    """Load a stored document and its cached analysis from either cache tier (None when the
+    analysis is no longer cached)."""
+    doc = get_document_store().load(document_id)
+    if doc is None or not doc.text:
+        return None
+    key = analysis_key(doc.text)
+    cached = get_cache().peek(key)
+    if cached is None:
+        return None
+    return _Entry(doc, doc.text, locate_risks(cached.summary, doc.text, doc), key)
+
+
+def reindex() -> ReindexReport:
+    """Rebuild the index for every stored document whose analysis is still cached, in memory or
+    on disk (ANALYSIS_CACHE_DB), committing BATCH_SIZE documents per transaction. Stored documents
+    whose analysis has expired keep their rows; rows of documents the store has evicted are
+    dropped. Run it off the event loop."""
+    index = get_search_index()
+    report = ReindexReport()
+    if index is None:
+        return report
+    started = time.perf_counter()
+    ids = get_document_store().document_ids()
+    batch: list[_Entry] = []
+    for document_id in ids:
+        entry = _prepare(document_id)
+        if entry is None:
+            report.skipped += 1
+            continue
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            report.documents += index.add_many(batch)
+            batch = []
+    if batch:
+        report.documents += index.add_many(batch)
+    # An in-memory document store only holds this process's documents; other workers' rows in a
+    # shared SEARCH_DB are not orphans
+    if DOCUMENTS_DB or not SEARCH_DB:
+        report.pruned = index.prune(set(ids))
+    index.optimize()
+    report.seconds = round(time.perf_counter() - started, 3)
+    return report
+
+
+_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """The shared index, or None when SEARCH_ENABLED is off."""
+    global _index
+    if not SEARCH_ENABLED:
+        return None
+    if _index is None:
+        _index = SearchIndex(SEARCH_DB)
+    return _index
@@ -0,0 +1,149 @@
+"""
+Startup timings, preloading and warmup. Heavy modules are imported on first use; preload() pulls
+them in ahead of time (once, in the parent of preforked workers, so workers share them), and
+warmup() exercises each dependency in a worker before /health reports it ready: a tiny PDF parse,
+a tesseract probe and a connection to the LLM API. Phase timings and check results are reported
+on /health and /metrics.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.config import WARMUP_TIMEOUT
+from app.services.ai_analyzer import warm_llm_connection
+
+logger = logging.getLogger("uvicorn.error")
+
+# Set by app.serve in the parent before it forks workers
+preforked = False
+# Whether this process runs the batch job queue: under app.serve only the first worker does, so
+# the JOB_* caps apply to the server as a whole (other workers' submissions are picked up by polling)
+runs_jobs = True
+
+_process_start = time.perf_counter()
+_phases: dict[str, float] = {}
+_checks: dict[str, str] = {}
+_ready = False
+
+
+def record(phase: str, seconds: float) -> None:
+    _phases[phase] = seconds
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def process_started() -> None:
+    """Restart the time-to-ready clock (a worker calls this right after it is forked)."""
+    global _process_start
+    _process_start = time.perf_counter()
+
+
+def mark_ready() -> None:
+    global _ready
+    _ready = True
+    record("time_to_ready", time.perf_counter() - _process_start)
+
+
+def status() -> dict:
+    return {
+        "ready": _ready,
+        "pid": os.getpid(),
+        "startup_s": {k: round(v, 4) for k, v in _phases.items()},
+        "checks": dict(_checks),
+    }
+
+
+def phases() -> dict[str, float]:
+    return dict(_phases)
+
+
+def preload() -> None:
+    """Import the PDF parser, image library and LLM SDK and load the tokenizer, so requests (and
+    forked workers) do not pay for them on first use."""
+    from app.services.prompt import get_tokenizer
+
+    with timed_phase("preload"):
+        with timed_phase("preload_pdfplumber"):
+            import pdfplumber  # noqa: F401
+        with timed_phase("preload_pillow"):
+            from PIL import Image  # noqa: F401
+        with timed_phase("preload_openai"):
+            import openai  # noqa: F401
+        with timed_phase("preload_tokenizer"):
+            get_tokenizer()
+
+
+def tiny_pdf() -> bytes:
+    """A valid one-page PDF with a line of text."""
+    stream = b"BT /F1 12 Tf 72 720 Td (Warmup document) Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _warm_pdf() -> str:
+    from app.services.extract_text import extract_text
+
+    text = extract_text("warmup.pdf", tiny_pdf())
+    return "ok" if "Warmup" in text else f"unexpected text: {text[:40]!r}"
+
+
+def _probe_tesseract() -> str:
+    try:
+        import pytesseract
+
+        return f"ok ({pytesseract.get_tesseract_version()})"
+    except Exception as e:
+        return f"unavailable: {type(e).__name__}"
+
+
+async def warmup() -> None:
+    """Run the warmup checks, then mark the worker ready. A failing check is reported, not fatal:
+    the worker serves what it can."""
+    steps = (
+        ("pdf", lambda: asyncio.to_thread(_warm_pdf)),
+        ("tesseract", lambda: asyncio.to_thread(_probe_tesseract)),
+        ("llm", warm_llm_connection),
+    )
+    with timed_phase("warmup"):
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                _checks[name] = await asyncio.wait_for(step(), WARMUP_TIMEOUT)
+            except asyncio.TimeoutError:
+                _checks[name] = f"timed out after {WARMUP_TIMEOUT:g} s"
+            except Exception as e:
+                _checks[name] = f"error: {type(e).__name__}: {e}"
+            record(f"warmup_{name}", time.perf_counter() - start)
+    mark_ready()
+    logger.info(
+        "Worker %d ready in %.2f s (%s)",
+        os.getpid(),
+        _phases["time_to_ready"],
+        ", ".join(f"{k}: {v}" for k, v in _checks.items()),
+    )
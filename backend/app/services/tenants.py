@@ -0,0 +1,21 @@
+"""
+Tenant of the current request or task. State that is derived from one customer's documents and
+could shape another's results (the clause index, micro-batched prompts) is kept per tenant. The
+tenant comes from the TENANT_HEADER request header, set by the authenticating proxy in front of
+the app; batch jobs store it with the job. Requests without it share the default tenant "", which
+is only right for a single-tenant deployment.
+"""
+from contextvars import ContextVar
+
+_tenant: ContextVar[str] = ContextVar("tenant", default="")
+# Longer header values are cut, so a client cannot make keys arbitrarily large
+_MAX_TENANT_CHARS = 128
+
+
+def set_tenant(tenant: str) -> None:
+    """Tenant of the current request or task (and tasks it starts)."""
+    _tenant.set((tenant or "").strip()[:_MAX_TENANT_CHARS])
+
+
+def current_tenant() -> str:
+    return _tenant.get()
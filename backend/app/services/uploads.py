@@ -0,0 +1,62 @@
+"""
+Upload handling: stream request bodies to a temp file instead of holding them in memory.
+The body is hashed while it is copied (for cache and dedup keys) and the size limit is
+enforced as soon as it is crossed.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+
+from app.config import MAX_UPLOAD_MB, UPLOAD_TMP_DIR
+from app.services.extract_text import DocumentTooLarge
+from app.services.metrics import timed
+
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+
+
+@dataclass
+class SpooledUpload:
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """Copy the upload to a temp file in chunks, hashing as it goes. Raises DocumentTooLarge."""
+    filename = file.filename or ""
+    suffix = os.path.splitext(filename)[1].lower()
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_TMP_DIR)
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with timed("upload"), os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DocumentTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit.")
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(filename=filename, path=path, size=size, sha256=h.hexdigest())
@@ -0,0 +1,131 @@
+"""
+Benchmark: micro-batching of short analyses against the stub server, calling the analyzer
+directly at batch priority (as batch jobs and the CLI run). Bursts of distinct short documents (snippets, one-page NDAs; a fraction long enough to
+bypass batching) arrive together, with a pause between bursts. The same load runs with batching
+off and on; reported per run: LLM calls, documents per call, prompt and completion tokens per
+document as counted by the stub (system prompt included), throughput and latency percentiles.
+
+    cd backend && python -m benchmarks.bench_batch --bursts 10 --burst-size 24 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from benchmarks.stub_llm import base_url, start_stub_server
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["ANALYSIS_CACHE_DB"] = ""
+os.environ["CLAUSE_INDEX_ENABLED"] = "false"
+
+from app.services import ai_analyzer  # noqa: E402
+from app.services.analysis_cache import get_cache  # noqa: E402
+from app.services.scheduler import PRIORITY_BATCH, set_priority  # noqa: E402
+
+_CLAUSES = [
+    "The Recipient shall keep the Confidential Information secret for five years.",
+    "Either party may terminate this agreement with thirty days written notice.",
+    "The Supplier's total liability is limited to the fees paid in the prior month.",
+    "This agreement renews automatically for successive one-year terms.",
+    "Disputes are resolved by binding arbitration in the Supplier's home state.",
+    "The Customer grants the Vendor a perpetual licence to use submitted feedback.",
+]
+
+
+def _document(i: int, words: int) -> str:
+    rng = random.Random(i)
+    sentences = [f"Agreement {i} between Acme Holdings and Party {rng.randint(1000, 9999)}."]
+    while sum(len(s.split()) for s in sentences) < words:
+        sentences.append(rng.choice(_CLAUSES))
+    return " ".join(sentences)
+
+
+def _workload(bursts: int, size: int, large_rate: float) -> list[list[str]]:
+    rng = random.Random(0)
+    docs, n = [], 0
+    for _ in range(bursts):
+        burst = []
+        for _ in range(size):
+            n += 1
+            words = rng.randint(2500, 4000) if rng.random() < large_rate else rng.randint(40, 400)
+            burst.append(_document(n, words))
+        docs.append(burst)
+    return docs
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50_s": round(statistics.median(ordered), 3), "p95_s": round(pick(0.95), 3), "max_s": round(ordered[-1], 3)}
+
+
+async def _run(server, workload: list[list[str]], gap: float, batching: bool) -> dict:
+    ai_analyzer.OPENAI_BASE_URL = base_url(server)
+    ai_analyzer.LLM_BATCH_ENABLED = batching
+    ai_analyzer._async_client = None
+    get_cache().clear()
+    server.requests.clear()
+    server.tokens.clear()
+    set_priority(PRIORITY_BATCH)
+
+    async def one(text: str) -> float:
+        start = time.perf_counter()
+        await ai_analyzer.analyze_document_async(text)
+        return time.perf_counter() - start
+
+    samples: list[float] = []
+    start = time.perf_counter()
+    bursts = []
+    for burst in workload:
+        bursts.append(asyncio.ensure_future(asyncio.gather(*(one(t) for t in burst))))
+        await asyncio.sleep(gap)
+    for done in await asyncio.gather(*bursts):
+        samples.extend(done)
+    elapsed = time.perf_counter() - start
+    docs = sum(len(b) for b in workload)
+    calls = sum(server.requests.values())
+    return {
+        "llm_calls": calls,
+        "docs_per_call": round(docs / calls, 2),
+        "prompt_tokens_per_doc": round(server.tokens["prompt"] / docs, 1),
+        "completion_tokens_per_doc": round(server.tokens["completion"] / docs, 1),
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_s": round(docs / elapsed, 2),
+        **_percentiles(samples),
+    }
+
+
+async def run(args) -> dict:
+    server = start_stub_server(latency=args.latency, jitter=args.latency * 0.2, token_latency=args.token_latency)
+    workload = _workload(args.bursts, args.burst_size, args.large_rate)
+    try:
+        results = {label: await _run(server, workload, args.gap, on) for label, on in (("off", False), ("on", True))}
+    finally:
+        server.shutdown()
+    return {
+        "documents": sum(len(b) for b in workload),
+        "bursts": args.bursts,
+        "burst_size": args.burst_size,
+        "window_s": ai_analyzer.LLM_BATCH_WINDOW,
+        "max_docs": ai_analyzer.LLM_BATCH_MAX_DOCS,
+        **results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=24, help="Documents arriving together")
+    parser.add_argument("--gap", type=float, default=0.5, help="Seconds between bursts")
+    parser.add_argument("--large-rate", type=float, default=0.1, help="Fraction of documents too long to batch")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub LLM latency per call in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.001, help="Stub seconds per completion token")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
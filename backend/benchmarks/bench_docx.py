@@ -0,0 +1,68 @@
+"""
+Benchmark: streaming DOCX extractor vs the previous python-docx DOM path, on large corpus files.
+Reports best-of wall time, peak Python heap (tracemalloc) and how much text each path finds.
+python-docx parses with lxml, whose C allocations tracemalloc does not see, so the legacy
+peak is a lower bound.
+
+    cd backend && python -m benchmarks.bench_docx --pages 100,500
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from app.services.docx_text import extract_docx
+from app.services.extract_text import _extract_docx_python_docx
+from benchmarks.corpus import corpus_file, parse_pages
+
+_CORPUS = os.path.join(os.path.dirname(__file__), ".corpus")
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def run(pages: int, repeat: int = 3, corpus: str = _CORPUS) -> dict:
+    path = corpus_file(corpus, "docx", pages)
+    stream_text = extract_docx(path)
+    legacy_text = _extract_docx_python_docx(path)
+    results = {
+        "pages": pages,
+        "file_mb": os.path.getsize(path) / 1e6,
+        "legacy_s": _time(lambda: _extract_docx_python_docx(path), repeat),
+        "stream_s": _time(lambda: extract_docx(path), repeat),
+        "legacy_peak_mb": _peak_mb(lambda: _extract_docx_python_docx(path)),
+        "stream_peak_mb": _peak_mb(lambda: extract_docx(path)),
+        "legacy_chars": len(legacy_text),
+        "stream_chars": len(stream_text),
+    }
+    results["speedup"] = results["legacy_s"] / results["stream_s"]
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=parse_pages, default=[100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus", default=_CORPUS)
+    args = parser.parse_args()
+    print(json.dumps([run(n, args.repeat, args.corpus) for n in args.pages], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: single-pass clause highlighting vs the previous per-risk re.sub loop, and the peak
+memory of an HTML export built as one string vs streamed (gzip) a piece at a time.
+
+    cd backend && python -m benchmarks.bench_highlight --pages 300 --risks 30
+"""
+import argparse
+import json
+import random
+import re
+import time
+import tracemalloc
+
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services.exports import encoded, escape_html, html_export, marked_text
+
+_WORDS = (
+    "the tenant landlord shall pay rent deposit notice terminate agreement liability indemnify "
+    "party any all within days written consent premises fees renewal term breach cure period"
+).split()
+
+
+def legacy_mark_risks_in_text(text: str, risks: list) -> str:
+    """The original implementation: one re.sub over the whole document per risk."""
+    if not risks:
+        return text
+    result = text
+    sorted_risks = sorted(risks, key=lambda r: len(r.clause or ""), reverse=True)
+    for r in sorted_risks:
+        clause = (r.clause or "").strip()
+        if len(clause) < 5:
+            continue
+        pattern = re.escape(clause).replace(" ", r"\s+")
+        marker = r">> [RISK - " + r.risk_level.upper() + r"] \g<0> <<"
+        try:
+            result = re.sub(f"({pattern})", marker, result, flags=re.IGNORECASE)
+        except re.error:
+            pass
+    return result
+
+
+def legacy_highlight_html(text: str, risks: list) -> str:
+    """The original in-place highlighting step of _build_html_export."""
+    html_text = escape_html(text)
+    sorted_risks = sorted(risks, key=lambda r: len(r.clause or ""), reverse=True)
+    for r in sorted_risks:
+        clause = (r.clause or "").strip()
+        if len(clause) < 5:
+            continue
+        escaped_clause = escape_html(clause)
+        title = escape_html(r.description or "")
+        pattern = re.escape(escaped_clause).replace(r"\ ", r"\s+")
+        try:
+            repl = f'<mark class="risk-{r.risk_level}" title="{title}">\\g<0></mark>'
+            html_text = re.sub(f"({pattern})", repl, html_text, flags=re.IGNORECASE)
+        except re.error:
+            pass
+    return html_text
+
+
+def make_document(pages: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    out = []
+    for p in range(pages):
+        out.append(f"SECTION {p + 1}")
+        for _ in range(40):
+            out.append("  ".join(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 8))) for _ in range(2)))
+    return "\n".join(out)
+
+
+def make_risks(text: str, count: int, seed: int = 7) -> list[FlaggedRisk]:
+    rng = random.Random(seed)
+    lines = text.split("\n")
+    risks = []
+    for _ in range(count):
+        i = rng.randrange(len(lines) - 1)
+        clause = " ".join((lines[i] + " " + lines[i + 1]).split()[: rng.randint(6, 20)])
+        risks.append(FlaggedRisk(clause=clause, risk_level=rng.choice(["low", "medium", "high"]), description="d"))
+    return risks
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def _drain(chunks) -> None:
+    for _ in chunks:
+        pass
+
+
+def run(pages: int, risks: int, repeat: int = 3) -> dict:
+    text = make_document(pages)
+    flagged = make_risks(text, risks)
+    summary = DocumentSummary(summary=["s"], flagged_risks=flagged)
+    results = {
+        "chars": len(text),
+        "risks": risks,
+        "txt_legacy_s": _time(lambda: legacy_mark_risks_in_text(text, flagged), repeat),
+        "txt_single_pass_s": _time(lambda: "".join(marked_text(text, flagged)), repeat),
+        "html_highlight_legacy_s": _time(lambda: legacy_highlight_html(text, flagged), repeat),
+        "html_export_single_pass_s": _time(lambda: "".join(html_export(text, summary)), repeat),
+        # Peak traced memory on top of the document text itself
+        "html_export_joined_peak_mb": _peak_mb(lambda: "".join(html_export(text, summary)).encode("utf-8")),
+        "html_export_streamed_peak_mb": _peak_mb(lambda: _drain(encoded(html_export(text, summary), "gzip"))),
+    }
+    results["txt_speedup"] = round(results["txt_legacy_s"] / results["txt_single_pass_s"], 2)
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--risks", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.risks, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark: LLM call resilience against the stub server, calling the analyzer directly.
+
+- coalesce: N identical analyses started together, with single-flight (analyze_document_async)
+  against each request making its own call (what every request did before); counts stub calls.
+- hedge: latency percentiles for a stream of distinct analyses when a fraction of stub calls are
+  slow (a latency tail), with hedging off and on; counts the extra calls hedging sent.
+- fallback: success rate when the primary model always answers 503, without and with a fallback.
+
+    cd backend && python -m benchmarks.bench_llm --latency 0.2 --slow-rate 0.05 --slow-latency 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from benchmarks.stub_llm import base_url, start_stub_server
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["ANALYSIS_CACHE_DB"] = ""
+os.environ["CLAUSE_INDEX_ENABLED"] = "false"
+# Each analysis here must be its own call (micro-batching has its own benchmark, bench_batch)
+os.environ["LLM_BATCH_ENABLED"] = "false"
+
+from app.services import ai_analyzer  # noqa: E402
+from app.services.analysis_cache import get_cache  # noqa: E402
+
+
+def _use(server) -> None:
+    """Point the analyzer at `server` with a fresh client and no cached analyses or latencies."""
+    ai_analyzer.OPENAI_BASE_URL = base_url(server)
+    ai_analyzer._async_client = None
+    ai_analyzer._latencies.clear()
+    get_cache().clear()
+
+
+def _text(tag: str) -> str:
+    return f"Agreement {tag}. " + "The Vendor shall deliver the goods on time and invoice monthly. " * 40
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "p50_s": round(statistics.median(ordered), 3),
+        "p95_s": round(pick(0.95), 3),
+        "p99_s": round(pick(0.99), 3),
+        "max_s": round(ordered[-1], 3),
+    }
+
+
+async def bench_coalesce(latency: float, callers: int) -> dict:
+    server = start_stub_server(latency=latency)
+    try:
+        _use(server)
+        text = _text("coalesce")
+        model = ai_analyzer.OPENAI_MODEL
+        start = time.perf_counter()
+        await asyncio.gather(*(ai_analyzer._complete_async(text, model) for _ in range(callers)))
+        separate = (time.perf_counter() - start, sum(server.requests.values()))
+        server.requests.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(ai_analyzer.analyze_document_async(text) for _ in range(callers)))
+        coalesced = (time.perf_counter() - start, sum(server.requests.values()))
+    finally:
+        server.shutdown()
+    return {
+        "coalesce": {
+            "callers": callers,
+            "separate": {"elapsed_s": round(separate[0], 3), "llm_calls": separate[1]},
+            "coalesced": {"elapsed_s": round(coalesced[0], 3), "llm_calls": coalesced[1]},
+        }
+    }
+
+
+async def bench_hedge(
+    latency: float, slow_rate: float, slow_latency: float, requests: int, concurrency: int, quantile: float
+) -> dict:
+    server = start_stub_server(latency=latency, jitter=latency * 0.2, slow_rate=slow_rate, slow_latency=slow_latency)
+    results = {}
+    try:
+        for label, q in (("off", 0.0), ("on", quantile)):
+            _use(server)
+            ai_analyzer.LLM_HEDGE_QUANTILE = q
+            ai_analyzer.LLM_HEDGE_MIN_DELAY = latency
+            # Warm-up fills the latency window hedging takes its quantile from
+            await asyncio.gather(*(ai_analyzer.analyze_document_async(_text(f"warm-{label}-{i}")) for i in range(40)))
+            server.requests.clear()
+            limit = asyncio.Semaphore(concurrency)
+
+            async def one(i):
+                async with limit:
+                    start = time.perf_counter()
+                    await ai_analyzer.analyze_document_async(_text(f"{label}-{i}"))
+                    return time.perf_counter() - start
+
+            samples = await asyncio.gather(*(one(i) for i in range(requests)))
+            results[label] = {**_percentiles(samples), "llm_calls": sum(server.requests.values())}
+    finally:
+        ai_analyzer.LLM_HEDGE_QUANTILE = 0.0
+        server.shutdown()
+    return {
+        "hedge": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "slow_rate": slow_rate,
+            "slow_latency_s": slow_latency,
+            "quantile": quantile,
+            **results,
+        }
+    }
+
+
+async def bench_fallback(latency: float, requests: int) -> dict:
+    server = start_stub_server(latency=latency, fail_models=("primary-model",))
+    results = {}
+    try:
+        for label, fallback in (("without", ""), ("with", "fallback-model")):
+            _use(server)
+            ai_analyzer.OPENAI_FALLBACK_MODEL = fallback
+            ai_analyzer.LLM_RETRY_DELAY = 0.05
+            server.requests.clear()
+
+            async def one(i):
+                try:
+                    await ai_analyzer.analyze_document_async(_text(f"fallback-{label}-{i}"), "primary-model")
+                    return True
+                except Exception:
+                    return False
+
+            start = time.perf_counter()
+            ok = await asyncio.gather(*(one(i) for i in range(requests)))
+            results[label] = {
+                "success_rate": round(sum(ok) / requests, 3),
+                "elapsed_s": round(time.perf_counter() - start, 3),
+                "calls_by_model": dict(server.requests),
+            }
+    finally:
+        ai_analyzer.OPENAI_FALLBACK_MODEL = ""
+        server.shutdown()
+    return {"fallback": {"requests": requests, **results}}
+
+
+async def run(args) -> dict:
+    results: dict = {}
+    results.update(await bench_coalesce(args.latency, args.callers))
+    results.update(
+        await bench_hedge(
+            args.latency, args.slow_rate, args.slow_latency, args.requests, args.concurrency, args.quantile
+        )
+    )
+    results.update(await bench_fallback(args.latency, 20))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Fraction of stub calls that are slow")
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--callers", type=int, default=20, help="Identical concurrent analyses (coalesce)")
+    parser.add_argument("--requests", type=int, default=200, help="Distinct analyses (hedge)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--quantile", type=float, default=0.95)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: search index over analyzed documents. Indexes synthetic contracts (text plus flagged
+risks) into a scratch SQLite file, then reports indexing throughput and query latency percentiles
+against a linear scan over the same texts (what answering the question took without the index).
+The scan baseline keeps every text in memory, so it is a lower bound on a scan of stored documents.
+The synthetic vocabulary is small: boilerplate queries match nearly every document, party names few.
+
+    cd backend && python -m benchmarks.bench_search --docs 2000 --pages 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services.document_store import StoredDocument, document_id
+from app.services.extract_text import join_pages
+from app.services.search_index import SearchIndex, _Entry
+from benchmarks.corpus import _CLAUSES, page_lines
+
+_TYPES = ["Lease Agreement", "Employment Agreement", "Master Services Agreement", "Terms of Service"]
+_SYLLABLES = ["ac", "mor", "vel", "tri", "quin", "dax", "lor", "zen", "pax", "ul", "bri", "kor"]
+_QUERIES = [
+    ("velquin*", None),
+    ("trizen* renews", None),
+    ("renews automatically", None),
+    ("arbitration", "high"),
+    ("liability fees", None),
+    ("indemnify*", None),
+    ('"security deposit"', "medium"),
+    ("landlord OR vendor", None),
+]
+
+
+def _entry(i: int, pages: int) -> _Entry:
+    rng = random.Random(i)
+    # A party name per document, so selective queries exist next to the corpus-wide boilerplate
+    party = "".join(rng.choice(_SYLLABLES) for _ in range(3)).capitalize()
+    first = [f"This Agreement is made between {party} Holdings and the Client."] + page_lines(0, seed=i + 1)
+    rest = ["\n".join(page_lines(p, seed=i + 1)) for p in range(1, pages)]
+    text, page_starts = join_pages(["\n".join(first)] + rest)
+    clauses = [c for c in _CLAUSES if c in text]
+    risks = [
+        FlaggedRisk(clause=c, risk_level=rng.choice(("high", "medium", "low")), description=f"Review: {c[:40]}")
+        for c in rng.sample(clauses, min(len(clauses), rng.randint(1, 5)))
+    ]
+    doc = StoredDocument(document_id(text), f"contract-{i:05d}.pdf", len(text), page_starts, time.time(), text)
+    summary = DocumentSummary(summary=["Synthetic"], document_type=rng.choice(_TYPES), flagged_risks=risks)
+    return _Entry(doc, text, summary, None)
+
+
+def _scan(entries: list[_Entry], q: str, level) -> int:
+    """Baseline: every document's text and risks checked in Python."""
+    terms = [t.strip('"*').lower() for t in q.replace(" OR ", " ").split()]
+    hits = 0
+    for e in entries:
+        fields = [r.clause.lower() + " " + r.description.lower() for r in e.summary.flagged_risks
+                  if level is None or r.risk_level == level]
+        if level is None:
+            fields.append(e.text.lower())
+        if any(all(t in f for t in terms) for f in fields):
+            hits += 1
+    return hits
+
+
+def _percentiles(samples: list[float]) -> dict:
+    q = statistics.quantiles(samples, n=20)
+    return {"p50_ms": round(statistics.median(samples) * 1000, 3), "p95_ms": round(q[18] * 1000, 3)}
+
+
+def run(docs: int, pages: int, repeat: int = 20) -> dict:
+    entries = [_entry(i, pages) for i in range(docs)]
+    with tempfile.TemporaryDirectory(prefix="docreviewer-search-") as scratch:
+        index = SearchIndex(os.path.join(scratch, "search.sqlite3"))
+        start = time.perf_counter()
+        for i in range(0, docs, 200):
+            index.add_many(entries[i:i + 200])
+        index.optimize()
+        index_s = time.perf_counter() - start
+
+        results = {
+            "docs": docs,
+            "pages_per_doc": pages,
+            "index_s": round(index_s, 3),
+            "docs_per_s": round(docs / index_s, 1),
+            "db_mb": round(os.path.getsize(os.path.join(scratch, "search.sqlite3")) / 1e6, 2),
+            "queries": [],
+        }
+        for q, level in _QUERIES:
+            indexed, scanned = [], []
+            total = 0
+            for _ in range(repeat):
+                t = time.perf_counter()
+                total = index.search(q, risk_level=level).total
+                indexed.append(time.perf_counter() - t)
+            for _ in range(max(1, repeat // 5)):
+                t = time.perf_counter()
+                _scan(entries, q, level)
+                scanned.append(time.perf_counter() - t)
+            results["queries"].append({
+                "q": q,
+                "risk_level": level,
+                "matches": total,
+                "index": _percentiles(indexed),
+                "scan_ms": round(statistics.median(scanned) * 1000, 3),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.docs, args.pages, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: process startup, each measurement in fresh interpreters.
+
+- import: cold `import app.main` with lazy heavy imports, against an eager import of the same
+  modules plus pdfplumber, PIL and openai (what importing the app cost before).
+- ready: time from launch until /health answers 200 from every worker, for a single
+  `uvicorn app.main:app`, for `uvicorn --workers N` (each worker imports everything itself) and
+  for `python -m app.serve` with N preforked workers, against the stub LLM; with the median
+  worker's startup phases from /health.
+
+    cd backend && python -m benchmarks.bench_startup --workers 4 --repeat 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.stub_llm import base_url, start_stub_server
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_EAGER = "import pdfplumber, PIL.Image, openai, app.main"
+
+
+def _env(**extra) -> dict:
+    env = dict(os.environ, PYTHONPATH=_BACKEND, DOCUMENTS_DB="", ANALYSIS_CACHE_DB="", SEARCH_DB="")
+    env.update(extra)
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _import_seconds(statement: str) -> float:
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], env=_env(), cwd=_BACKEND, capture_output=True, text=True)
+    out.check_returncode()
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def bench_import(repeat: int) -> dict:
+    lazy = [_import_seconds("import app.main") for _ in range(repeat)]
+    eager = [_import_seconds(_EAGER) for _ in range(repeat)]
+    return {
+        "import": {
+            "lazy_s": round(statistics.median(lazy), 3),
+            "eager_s": round(statistics.median(eager), 3),
+            "speedup": round(statistics.median(eager) / statistics.median(lazy), 2),
+        }
+    }
+
+
+def _time_to_ready(cmd: list[str], workers: int, env: dict, port: int, timeout: float = 60.0) -> dict:
+    """Launch cmd and poll /health until `workers` distinct processes have answered 200."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=_BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ready: dict[int, dict] = {}
+    first = None
+    try:
+        while len(ready) < workers:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"{cmd} not ready after {timeout:g} s")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2) as r:
+                    body = json.load(r)
+                ready.setdefault(body["pid"], body)
+                first = first or time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.02)
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait(30)
+    phases = {k: round(statistics.median(b["startup_s"].get(k, 0.0) for b in ready.values()), 3)
+              for k in next(iter(ready.values()))["startup_s"]}
+    return {"first_ready_s": round(first, 3), "all_ready_s": round(elapsed, 3), "worker_phases_s": phases}
+
+
+def bench_ready(workers: int, latency: float, tmp: str) -> dict:
+    server = start_stub_server(latency=latency)
+    env = _env(OPENAI_BASE_URL=base_url(server), OPENAI_API_KEY="stub",
+               JOBS_DB=os.path.join(tmp, "jobs.sqlite3"), JOBS_DIR=os.path.join(tmp, "jobs"))
+    results = {}
+    try:
+        port = _free_port()
+        results["uvicorn_1_worker"] = _time_to_ready(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            1, env, port,
+        )
+        port = _free_port()
+        results[f"uvicorn_{workers}_workers"] = _time_to_ready(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+             "--log-level", "warning"],
+            workers, env, port,
+        )
+        port = _free_port()
+        results[f"serve_{workers}_workers"] = _time_to_ready(
+            [sys.executable, "-m", "app.serve", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            workers, env, port,
+        )
+    finally:
+        server.shutdown()
+    return {"ready": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Workers for app.serve")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold imports timed per variant (median)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+    results = bench_import(args.repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_ready(args.workers, args.latency, tmp))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Deterministic synthetic corpus for the benchmark suite.
+Generates text PDFs, scanned (image-only) PDFs, multi-page TIFFs and DOCX files of a given
+page count from a fixed seed, so the same command always benchmarks the same bytes.
+
+    cd backend && python -m benchmarks.corpus --pages 1,10,100 --out benchmarks/.corpus
+"""
+import argparse
+import os
+import random
+
+KINDS = {
+    "text_pdf": ".pdf",
+    "scanned_pdf": ".pdf",
+    "tiff": ".tiff",
+    "docx": ".docx",
+}
+
+LINES_PER_PAGE = 40
+
+_CLAUSES = [
+    "The Tenant shall pay rent on the first day of each month.",
+    "Either party may terminate this Agreement with thirty days written notice.",
+    "The Landlord may enter the premises at any time without notice.",
+    "The security deposit is non-refundable.",
+    "The Company may change these terms at its sole discretion.",
+    "Any dispute shall be resolved by binding arbitration.",
+    "The Employee assigns all inventions made during employment to the Company.",
+    "Late payments accrue interest at eighteen percent per annum.",
+    "This Agreement renews automatically for successive one year terms.",
+    "The Vendor's total liability shall not exceed the fees paid in the prior month.",
+]
+_WORDS = (
+    "the tenant landlord shall pay rent deposit notice terminate agreement liability indemnify "
+    "party any all within days written consent premises fees renewal term breach cure period"
+).split()
+
+
+def page_lines(page: int, seed: int = 7) -> list[str]:
+    """Lines of text for one page; seeded per page so pages can be generated independently."""
+    rng = random.Random(seed * 100003 + page)
+    lines = [f"SECTION {page + 1}"]
+    while len(lines) < LINES_PER_PAGE:
+        if rng.random() < 0.15:
+            lines.append(rng.choice(_CLAUSES))
+        else:
+            lines.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 14))).capitalize() + ".")
+    return lines
+
+
+def document_text(pages: int, seed: int = 7) -> str:
+    return "\n".join("\n".join(page_lines(p, seed)) for p in range(pages))
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages: int, seed: int = 7) -> None:
+    """Minimal PDF writer: one Helvetica text stream per page, no external dependency."""
+    font_id = 3 + 2 * pages
+    offsets: list[int] = []
+    with open(path, "wb") as f:
+        def obj(body: bytes) -> None:
+            offsets.append(f.tell())
+            f.write(f"{len(offsets)} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+        obj(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        for i in range(pages):
+            obj(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+            )
+            ops = ["BT /F1 10 Tf 12 TL 54 750 Td"]
+            ops += [f"({_pdf_escape(line)}) Tj T*" for line in page_lines(i, seed)]
+            ops.append("ET")
+            stream = "\n".join(ops).encode("latin-1")
+            obj(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+        obj(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        f.write("".join(f"{o:010d} 00000 n \n" for o in offsets).encode())
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def page_image(page: int, seed: int = 7, dpi: int = 100):
+    """A bilevel 'scan' of one page: the page's text drawn at roughly 12pt."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new("1", (int(8.5 * dpi), 11 * dpi), 1)
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=max(10, dpi // 7))
+    except TypeError:  # Pillow < 10.1 has a single fixed-size bitmap font
+        font = ImageFont.load_default()
+    y = dpi // 2
+    for line in page_lines(page, seed):
+        draw.text((dpi // 2, y), line, fill=0, font=font)
+        y += int(dpi / 4)
+    return img
+
+
+def _save_images(path: str, pages: int, seed: int, **kwargs) -> None:
+    first = page_image(0, seed)
+    rest = (page_image(p, seed) for p in range(1, pages))
+    first.save(path, save_all=True, append_images=list(rest), **kwargs)
+
+
+def write_scanned_pdf(path: str, pages: int, seed: int = 7) -> None:
+    _save_images(path, pages, seed, format="PDF", resolution=100)
+
+
+def write_tiff(path: str, pages: int, seed: int = 7) -> None:
+    _save_images(path, pages, seed, format="TIFF", compression="group4", dpi=(100, 100))
+
+
+def write_docx(path: str, pages: int, seed: int = 7) -> None:
+    """Each page is a heading, its lines and a small fee table; the section has a header and footer."""
+    from docx import Document
+
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "Master Services Agreement - Confidential"
+    section.footer.paragraphs[0].text = "Liability is capped at the fees paid in the prior twelve months."
+    for p in range(pages):
+        lines = page_lines(p, seed)
+        doc.add_heading(lines[0], level=2)
+        for line in lines[1:-4]:
+            doc.add_paragraph(line)
+        table = doc.add_table(rows=4, cols=2)
+        for row, line in zip(table.rows, lines[-4:]):
+            row.cells[0].text = f"Fee {p + 1}.{row._index + 1}"
+            row.cells[1].text = line
+        if p < pages - 1:
+            doc.add_page_break()
+    doc.save(path)
+
+
+_WRITERS = {
+    "text_pdf": write_text_pdf,
+    "scanned_pdf": write_scanned_pdf,
+    "tiff": write_tiff,
+    "docx": write_docx,
+}
+
+
+def corpus_file(out_dir: str, kind: str, pages: int, seed: int = 7) -> str:
+    """Path to the generated file, creating it on first use."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{kind}-{pages}p-s{seed}{KINDS[kind]}")
+    if not os.path.exists(path):
+        tmp = path + ".part"
+        _WRITERS[kind](tmp, pages, seed)
+        os.replace(tmp, path)
+    return path
+
+
+def parse_pages(value: str) -> list[int]:
+    return [int(p) for p in value.split(",") if p.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=parse_pages, default=[1, 10, 100])
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(__file__), ".corpus"))
+    args = parser.parse_args()
+    for kind in args.kinds.split(","):
+        for pages in args.pages:
+            print(corpus_file(args.out, kind, pages, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load test: concurrent /api/analyze-text throughput against a local stub LLM.
+
+Compares the async request path with a blocking handler that calls the synchronous
+analyze_document inside `async def` (the old behaviour, which serializes the event loop).
+
+    cd backend && python -m benchmarks.load_test --requests 40 --concurrency 20 --latency 0.5
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_llm import base_url, start_stub_server
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_app(port: int):
+    import uvicorn
+
+    from app.main import app
+    from app.schemas import AnalyzeTextRequest
+    from app.services.ai_analyzer import analyze_document
+
+    async def analyze_text_blocking(body: AnalyzeTextRequest):
+        return {"summary": analyze_document(body.text).model_dump()}
+
+    # Route must precede the static frontend mounted at "/"
+    app.add_api_route("/bench/analyze-text-blocking", analyze_text_blocking, methods=["POST"])
+    app.router.routes.insert(0, app.router.routes.pop())
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _post(url: str, text: str) -> float:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps({"text": text}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=600) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def run(url: str, requests: int, concurrency: int, tag: str) -> dict:
+    texts = [f"Agreement {tag}-{i}. " + "The Vendor shall deliver the goods on time. " * 50 for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(lambda t: _post(url, t), texts))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_s": round(latencies[len(latencies) // 2], 3),
+        "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency)
+    os.environ["OPENAI_BASE_URL"] = base_url(stub)
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("LLM_CONCURRENCY", str(args.concurrency))
+
+    port = _free_port()
+    server = _start_app(port)
+    root = f"http://127.0.0.1:{port}"
+    results = {
+        "blocking": run(f"{root}/bench/analyze-text-blocking", args.requests, args.concurrency, "blocking"),
+        "async": run(f"{root}/api/analyze-text", args.requests, args.concurrency, "async"),
+    }
+    results["speedup"] = round(results["async"]["throughput_rps"] / results["blocking"]["throughput_rps"], 2)
+    print(json.dumps(results, indent=2))
+    server.should_exit = True
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
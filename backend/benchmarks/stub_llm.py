@@ -0,0 +1,216 @@
+"""
+Local OpenAI-compatible stub server for benchmarks and load tests.
+Serves POST /v1/chat/completions with a canned analysis after a configurable delay,
+either as one JSON body or, with "stream": true, as server-sent chunks spread over the delay.
+A micro-batched prompt (documents in <document id="..."> tags) gets one analysis per id.
+A fraction of requests can be made slow (a latency tail) or fail with 503, and named models can be
+made to always fail, to exercise retries, hedging and the fallback model.
+
+Run standalone:  python -m benchmarks.stub_llm --port 8765 --latency 0.5
+Then point the app at it: OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DOCUMENT_RE = re.compile(r'<document id="([^"]+)">\n(.*?)\n</document>', re.S)
+
+
+def canned_analysis(document: str) -> dict:
+    """Deterministic analysis that quotes the document so highlighting has something to match."""
+    words = document.split()
+    clause = " ".join(words[5:20]) if len(words) > 20 else " ".join(words)
+    return {
+        "summary": [
+            f"The document has {len(words)} words.",
+            "Parties agree to the stated obligations.",
+            "Payment is due within 30 days.",
+        ],
+        "document_type": "Agreement",
+        "flagged_risks": [
+            {"clause": clause, "risk_level": "medium", "description": "Stub risk for benchmarking."}
+        ] if clause else [],
+        "questions_to_ask": ["What is the termination notice period?"],
+    }
+
+
+def canned_answer(user: str) -> dict:
+    """The analysis for the prompt's document, or {id: analysis} for a batch of documents."""
+    documents = _DOCUMENT_RE.findall(user)
+    if documents:
+        return {doc_id: canned_analysis(document) for doc_id, document in documents}
+    return canned_analysis(user.split("\n\n", 1)[-1])
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    jitter = 0.0
+    error_rate = 0.0
+    slow_rate = 0.0  # fraction of requests that take slow_latency instead
+    slow_latency = 5.0
+    token_latency = 0.0  # extra seconds per completion token, as a model generating the answer takes
+    fail_models: frozenset = frozenset()  # models answered with 503
+    requests: Counter  # requests received per model (set per server by start_stub_server)
+    tokens: Counter  # prompt and completion tokens answered
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up on the call (e.g. a cancelled hedge)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        user = next((m["content"] for m in body.get("messages", []) if m.get("role") == "user"), "")
+        model = body.get("model", "stub")
+        self.requests[model] += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if random.random() < self.slow_rate:
+            delay = self.slow_latency
+        if model in self.fail_models:
+            self.send_error(503, "Model unavailable")
+            return
+        if random.random() < self.error_rate:
+            time.sleep(delay)
+            self.send_error(503, "Injected failure")
+            return
+        content = json.dumps(canned_answer(user))
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+        self.tokens["prompt"] += prompt_tokens
+        self.tokens["completion"] += len(content) // 4
+        delay += self.token_latency * (len(content) // 4)
+        if body.get("stream"):
+            self._stream(body, content, delay)
+            return
+        time.sleep(delay)
+        payload = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+        out = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+    def _stream(self, body: dict, content: str, delay: float):
+        """First token after 10% of the delay, the rest spread evenly over the remainder."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        time.sleep(delay * 0.1)
+        for piece in pieces:
+            self._send_chunk(body, {"content": piece}, None)
+            time.sleep(delay * 0.9 / len(pieces))
+        self._send_chunk(body, {}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens = sum(len(m.get("content") or "") for m in body["messages"]) // 4
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": body.get("model", "stub"), "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_chunk(self, body: dict, delta: dict, finish_reason):
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def start_stub_server(
+    port: int = 0,
+    latency: float = 0.5,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_latency: float = 5.0,
+    fail_models: tuple[str, ...] = (),
+    token_latency: float = 0.0,
+) -> ThreadingHTTPServer:
+    """Start the stub in a daemon thread. Returns the server; its base URL is base_url(server), the
+    requests it received per model are server.requests and the tokens it answered server.tokens."""
+    handler = type(
+        "Handler",
+        (StubLLMHandler,),
+        {
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "slow_rate": slow_rate,
+            "slow_latency": slow_latency,
+            "fail_models": frozenset(fail_models),
+            "token_latency": token_latency,
+            "requests": Counter(),
+            "tokens": Counter(),
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.requests = handler.requests
+    server.tokens = handler.tokens
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to wait before responding")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests that take --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--fail-model", action="append", default=[], help="Model always answered with 503")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Extra seconds per completion token")
+    args = parser.parse_args()
+    server = start_stub_server(
+        args.port, args.latency, args.jitter, args.error_rate, args.slow_rate, args.slow_latency,
+        tuple(args.fail_model), args.token_latency,
+    )
+    print(f"Stub LLM listening on {base_url(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
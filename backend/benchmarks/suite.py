@@ -0,0 +1,222 @@
+"""
+Benchmark suite: extraction per format and page count, end-to-end analysis, export builders
+and concurrent request throughput, all offline against the stub LLM server.
+Results are written as JSON and compared with a stored baseline; regressions beyond the
+threshold make the run exit with status 1.
+
+    cd backend
+    python -m benchmarks.suite --pages 1,10,100 --save-baseline     # record a baseline
+    python -m benchmarks.suite --pages 1,10,100                     # compare against it
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+from benchmarks.corpus import KINDS, corpus_file, document_text, parse_pages
+from benchmarks.stub_llm import base_url, start_stub_server
+
+_HERE = os.path.dirname(__file__)
+DEFAULT_BASELINE = os.path.join(_HERE, "baseline.json")
+DEFAULT_CORPUS = os.path.join(_HERE, ".corpus")
+OCR_KINDS = {"scanned_pdf", "tiff"}
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def _ocr_available() -> bool:
+    return bool(shutil.which("tesseract")) and bool(shutil.which("pdftoppm"))
+
+
+def bench_extract(corpus: str, kinds: list[str], pages: list[int], repeat: int) -> dict:
+    from app.services.extract_text import extract_text
+
+    results = {}
+    for kind in kinds:
+        for n in pages:
+            name = f"extract.{kind}.{n}p"
+            if kind in OCR_KINDS and not _ocr_available():
+                results[name] = {"skipped": "tesseract/poppler not installed"}
+                continue
+            path = corpus_file(corpus, kind, n)
+            seconds, text = _best_of(lambda: extract_text(os.path.basename(path), path), repeat)
+            results[name] = {
+                "seconds": round(seconds, 4),
+                "per_page_ms": round(seconds * 1000 / n, 3),
+                "chars": len(text or ""),
+            }
+    return results
+
+
+def bench_analyze(pages: list[int], repeat: int) -> dict:
+    """analyze_document end to end (chunking, LLM round trips, parsing, merging), cache cleared."""
+    from app.services.ai_analyzer import analyze_document
+    from app.services.analysis_cache import get_cache
+
+    analyze_document("Warm-up call so client setup is not timed.")
+    results = {}
+    for n in pages:
+        text = document_text(n)
+
+        def run():
+            get_cache().clear()
+            return analyze_document(text)
+
+        seconds, summary = _best_of(run, repeat)
+        results[f"analyze.{n}p"] = {"seconds": round(seconds, 4), "risks": len(summary.flagged_risks)}
+    return results
+
+
+def bench_exports(pages: list[int], repeat: int, risks: int = 30) -> dict:
+    from app.services.exports import html_export, marked_text
+    from app.schemas import DocumentSummary
+    from benchmarks.bench_highlight import make_risks
+
+    results = {}
+    for n in pages:
+        text = document_text(n)
+        flagged = make_risks(text, risks)
+        summary = DocumentSummary(summary=["s"], flagged_risks=flagged)
+        seconds, _ = _best_of(lambda: "".join(html_export(text, summary)), repeat)
+        results[f"export.html.{n}p"] = {"seconds": round(seconds, 4)}
+        seconds, _ = _best_of(lambda: "".join(marked_text(text, flagged)), repeat)
+        results[f"export.txt.{n}p"] = {"seconds": round(seconds, 4)}
+    return results
+
+
+def bench_throughput(requests: int, concurrency: int) -> dict:
+    from benchmarks.load_test import _free_port, _start_app, run
+
+    port = _free_port()
+    server = _start_app(port)
+    try:
+        out = run(f"http://127.0.0.1:{port}/api/analyze-text", requests, concurrency, "suite")
+    finally:
+        server.should_exit = True
+    return {"throughput.analyze_text": out}
+
+
+# Metric each result is judged on, and whether higher values are better
+def _metric(result: dict) -> Optional[tuple[str, float, bool]]:
+    if "skipped" in result:
+        return None
+    if "throughput_rps" in result:
+        return "throughput_rps", result["throughput_rps"], True
+    if "seconds" in result:
+        return "seconds", result["seconds"], False
+    return None
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list[str]:
+    """Names of results that regressed by more than `threshold` (a ratio, e.g. 1.2 = 20%).
+    Time differences under `min_delta` seconds are treated as noise."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        cur = _metric(result)
+        ref = _metric(base) if base else None
+        if cur is None or ref is None or cur[0] != ref[0]:
+            continue
+        key, value, higher_is_better = cur
+        ref_value = ref[1]
+        if higher_is_better:
+            regressed = ref_value > 0 and value < ref_value / threshold
+        else:
+            regressed = value > ref_value * threshold and value - ref_value > min_delta
+        if regressed:
+            regressions.append(f"{name}: {key} {ref_value} -> {value}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=parse_pages, default=[1, 10, 100], help="Comma-separated page counts (up to 500)")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="Corpus formats to extract")
+    parser.add_argument("--only", default="extract,analyze,export,throughput", help="Benchmark groups to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of repetitions per case")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directory for generated corpus files")
+    parser.add_argument("--output", default="", help="Write results JSON here (default: stdout only)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown ratio before failing")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns under this many seconds")
+    args = parser.parse_args()
+
+    # Configure the app before it is imported: stub LLM, no disk cache or store, throwaway job queue
+    stub = start_stub_server(latency=args.latency)
+    scratch = tempfile.mkdtemp(prefix="docreviewer-bench-")
+    os.environ["OPENAI_BASE_URL"] = base_url(stub)
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ["ANALYSIS_CACHE_DB"] = ""
+    os.environ["DOCUMENTS_DB"] = ""
+    os.environ["SEARCH_DB"] = ""
+    os.environ["JOBS_DB"] = os.path.join(scratch, "jobs.sqlite3")
+    os.environ["JOBS_DIR"] = os.path.join(scratch, "jobs")
+    os.environ.setdefault("LLM_CONCURRENCY", str(args.concurrency))
+
+    groups = set(args.only.split(","))
+    results: dict = {}
+    try:
+        if "extract" in groups:
+            results.update(bench_extract(args.corpus, args.kinds.split(","), args.pages, args.repeat))
+        if "analyze" in groups:
+            results.update(bench_analyze(args.pages, 1))
+        if "export" in groups:
+            results.update(bench_exports(args.pages, args.repeat))
+        if "throughput" in groups:
+            results.update(bench_throughput(args.requests, args.concurrency))
+    finally:
+        stub.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "stub_latency_s": args.latency,
+            "pages": args.pages,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(out + "\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.", file=sys.stderr)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold}x against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 #!/bin/bash
+# ./start.sh       development server with auto-reload
+# ./start.sh prod  production server: preloaded, WEB_CONCURRENCY preforked workers
 cd "$(dirname "$0")"
 export PYTHONPATH="$(pwd)"
 source .venv/bin/activate
 echo "Starting SafeDoc server..."
 echo "Server will be available at http://127.0.0.1:8000"
+if [ "$1" = "prod" ]; then
+    exec python -m app.serve --host "${HOST:-127.0.0.1}" --port "${PORT:-8000}"
+fi
 uvicorn app.main:app --reload --host 127.0.0.1 --port 8000
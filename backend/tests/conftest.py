@@ -0,0 +1,12 @@
+"""
+Tests run from backend/ (`python -m pytest -q`) with every SQLite store in memory and a dummy API
+key, so importing app modules neither writes database files nor needs credentials.
+"""
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+for name in ("DOCUMENTS_DB", "ANALYSIS_CACHE_DB", "SEARCH_DB", "CLAUSE_INDEX_DB"):
+    os.environ[name] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
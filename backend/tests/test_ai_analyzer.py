@@ -0,0 +1,72 @@
+import threading
+import time
+
+from app.schemas import DocumentSummary
+from app.services import ai_analyzer
+from app.services.analysis_cache import get_cache
+
+
+def test_sync_chunks_run_concurrently_within_the_bound(monkeypatch):
+    monkeypatch.setattr(ai_analyzer, "ANALYSIS_CHUNK_CHARS", 1000)
+    monkeypatch.setattr(ai_analyzer, "ANALYSIS_CHUNK_CONCURRENCY", 3)
+    lock = threading.Lock()
+    running = peak = 0
+    seen = []
+
+    def complete(text, model, part=0, parts=0):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+            seen.append(text)
+        return DocumentSummary(summary=[text.strip().split("\n", 1)[0]])
+
+    monkeypatch.setattr(ai_analyzer, "_complete", complete)
+    text = "\n\n".join(f"SECTION {i}\n" + "Words of the agreement. " * 30 for i in range(8))
+    get_cache().clear()
+    summary = ai_analyzer.analyze_document(text)
+    assert len(seen) > 3
+    assert peak == 3
+    # Bullets are interleaved across chunks in chunk order
+    assert summary.summary[0] == "SECTION 0"
+
+
+def _risk(clause, level="low", description=""):
+    from app.schemas import FlaggedRisk
+
+    return FlaggedRisk(clause=clause, risk_level=level, description=description)
+
+
+def test_merge_summaries_merges_overlapping_risks():
+    parts = [
+        DocumentSummary(
+            summary=["A1", "A2"],
+            document_type="NDA",
+            flagged_risks=[_risk("renews automatically", "low", "short")],
+            questions_to_ask=["Q1"],
+            prompt_tokens=10,
+        ),
+        DocumentSummary(
+            summary=["B1", "A1"],
+            document_type="Unknown",
+            flagged_risks=[
+                _risk("This agreement  renews automatically each year", "high", "long"),
+                _risk("Liability is unlimited", "medium"),
+            ],
+            questions_to_ask=["Q1", "Q2"],
+            prompt_tokens=5,
+        ),
+    ]
+    merged = ai_analyzer.merge_summaries(parts, "one two three")
+    assert [(r.clause, r.risk_level, r.description) for r in merged.flagged_risks] == [
+        ("This agreement  renews automatically each year", "high", "long"),
+        ("Liability is unlimited", "medium", ""),
+    ]
+    assert merged.summary == ["A1", "B1", "A2"]
+    assert merged.questions_to_ask == ["Q1", "Q2"]
+    assert merged.document_type == "NDA"
+    assert merged.word_count == 3
+    assert merged.prompt_tokens == 15
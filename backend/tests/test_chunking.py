@@ -0,0 +1,29 @@
+from app.services.chunking import chunk_text, split_sections
+
+TEXT = "\n".join(
+    f"{i}. SECTION {i}\n" + " ".join(f"Clause {i}.{j} of the agreement applies." for j in range(12)) + "\n"
+    for i in range(1, 9)
+)
+
+
+def test_sections_start_at_headings_and_cover_the_text():
+    sections = split_sections(TEXT)
+    assert [s.heading for s in sections] == [f"{i}. SECTION {i}" for i in range(1, 9)]
+    assert sections[0].start == 0 and sections[-1].end == len(TEXT)
+    assert all(a.end == b.start for a, b in zip(sections, sections[1:]))
+
+
+def test_chunks_pack_whole_sections_within_the_limit():
+    chunks = chunk_text(TEXT, 1200)
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == TEXT
+    assert all(len(c.text) <= 1200 for c in chunks)
+    assert all(c.text.lstrip().split("\n", 1)[0].endswith(tuple(f"SECTION {i}" for i in range(1, 9))) for c in chunks)
+
+
+def test_a_section_longer_than_the_limit_is_split():
+    long = "1. TERMS\n" + "A sentence of the long section. " * 200
+    chunks = chunk_text(long, 1000)
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == long
+    assert all(len(c.text) <= 1000 for c in chunks)
@@ -0,0 +1,92 @@
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services.clause_index import ClauseIndex, scope_key
+
+CONFIDENTIALITY = (
+    "1. CONFIDENTIALITY\n"
+    "The Recipient shall not disclose the Confidential Information to any third party and shall use "
+    "it solely to evaluate the proposed transaction between the parties. The Recipient shall protect "
+    "the information with the same degree of care it uses for its own information of a similar kind, "
+    "and in no event with less than reasonable care.\n\n"
+)
+TERM = (
+    "2. TERM\n"
+    "This agreement starts on the effective date and continues until either party ends it by written "
+    "notice to the other party, after which the obligations above continue for the period stated in "
+    "the cover page of this agreement and the recipient returns or destroys all copies it holds.\n\n"
+)
+RISK = FlaggedRisk(
+    clause="obligations above continue for the period stated in the cover page",
+    risk_level="medium",
+    description="Survival period is defined elsewhere.",
+)
+SCOPE = scope_key("model", "prompt")
+
+
+def _summary(risks=()) -> DocumentSummary:
+    return DocumentSummary(summary=["An NDA."], flagged_risks=list(risks))
+
+
+def _indexed(text: str = CONFIDENTIALITY + TERM, scope: str = SCOPE, **kwargs) -> ClauseIndex:
+    index = ClauseIndex(threshold=0.6, **kwargs)
+    index.record(index.plan(text, scope), _summary([RISK]), text, scope)
+    return index
+
+
+def test_identical_sections_reuse_verdicts():
+    index = _indexed()
+    plan = index.plan(CONFIDENTIALITY + TERM, SCOPE)
+    assert sorted(plan.matches) == [0, 1]
+    assert plan.cached_risks == [RISK]
+    assert "omitted" in plan.prompt_text(CONFIDENTIALITY + TERM)
+
+
+def test_whitespace_and_case_changes_reuse():
+    index = _indexed()
+    text = CONFIDENTIALITY.replace(" the ", "  THE ") + TERM
+    assert 0 in index.plan(text, SCOPE).matches
+
+
+def test_negation_change_is_analyzed_again():
+    index = _indexed()
+    text = CONFIDENTIALITY.replace("shall not disclose", "may disclose") + TERM
+    plan = index.plan(text, SCOPE)
+    assert 0 not in plan.matches
+    assert "may disclose" in plan.prompt_text(text)
+
+
+def test_number_and_party_changes_are_analyzed_again():
+    index = _indexed()
+    amount = CONFIDENTIALITY.replace("reasonable care", "care for 30 days")
+    party = CONFIDENTIALITY.replace("third party", "Acme party")
+    assert 0 not in index.plan(amount + TERM, SCOPE).matches
+    assert 0 not in index.plan(party + TERM, SCOPE).matches
+
+
+def test_harmless_word_change_reuses():
+    index = _indexed()
+    text = CONFIDENTIALITY.replace("proposed transaction", "contemplated transaction") + TERM
+    assert 0 in index.plan(text, SCOPE).matches
+
+
+def test_summary_is_never_reused():
+    index = _indexed()
+    plan = index.plan(CONFIDENTIALITY + TERM, SCOPE)
+    assert not hasattr(plan, "summary")
+
+
+def test_scopes_are_isolated_by_tenant():
+    index = _indexed(scope=scope_key("model", "prompt", "tenant-a"))
+    assert not index.plan(CONFIDENTIALITY + TERM, scope_key("model", "prompt", "tenant-b")).matches
+    assert index.plan(CONFIDENTIALITY + TERM, scope_key("model", "prompt", "tenant-a")).matches
+
+
+def test_least_recently_matched_sections_are_evicted():
+    # Room for either section, not both
+    index = ClauseIndex(threshold=0.6, max_bytes=1000)
+    index.record(index.plan(CONFIDENTIALITY, SCOPE), _summary(), CONFIDENTIALITY, SCOPE)
+    assert index.stats()["sections"] == 1
+    index.record(index.plan(TERM, SCOPE), _summary([RISK]), TERM, SCOPE)
+    assert index.stats()["sections"] == 1
+    assert index.stats()["bytes"] <= index.max_bytes
+    assert not index.plan(CONFIDENTIALITY, SCOPE).matches
+    assert index.plan(TERM, SCOPE).matches
@@ -0,0 +1,14 @@
+from app.services.document_store import DocumentStore
+
+TEXT = "First page of the agreement.\fSecond page of the agreement."
+
+
+def test_restoring_the_same_text_replaces_its_page_index():
+    store = DocumentStore()
+    pasted = store.put(TEXT, [0], "pasted.txt")
+    uploaded = store.put(TEXT, [0, TEXT.index("Second")], "contract.pdf")
+    assert uploaded.id == pasted.id
+    doc = store.get(pasted.id)
+    assert doc.filename == "contract.pdf"
+    assert doc.pages == 2
+    assert doc.page_of(TEXT.index("Second")) == 2
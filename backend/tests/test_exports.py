@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import documents
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services import exports
+from app.services.ai_analyzer import analysis_key
+from app.services.analysis_cache import get_cache
+
+TEXT = "The Supplier may terminate this agreement at any time without notice."
+SUMMARY = DocumentSummary(
+    summary=["Supplier can terminate at will."],
+    flagged_risks=[FlaggedRisk(clause="terminate this agreement at any time", risk_level="high", description="At will.")],
+)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def no_llm(text, model=None):
+        raise AssertionError("export should have used the cached analysis")
+
+    monkeypatch.setattr(documents, "analyze_document_async", no_llm)
+    get_cache().put(analysis_key(TEXT), TEXT, SUMMARY)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("fmt", ["html", "txt", "summary"])
+def test_cached_export_revalidates_with_304(client, fmt):
+    url = f"/api/export/{analysis_key(TEXT)}.{fmt}"
+    first = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    again = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+def test_cached_export_unknown_format_or_analysis(client):
+    assert client.get(f"/api/export/{analysis_key(TEXT)}.pdf").status_code == 404
+    assert client.get(f"/api/export/{'0' * 64}.html").status_code == 404
+
+
+def test_post_with_matching_etag_gets_412(client):
+    first = client.post("/api/export/from-text", json={"text": TEXT})
+    assert first.status_code == 200
+    assert "terminate this agreement at any time" in first.text
+    again = client.post("/api/export/from-text", json={"text": TEXT}, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 412
+
+
+def test_etag_depends_on_format_and_encoding(client):
+    base = f"/api/export/{analysis_key(TEXT)}"
+    tags = {
+        client.get(f"{base}.html", headers={"Accept-Encoding": "identity"}).headers["etag"],
+        client.get(f"{base}.txt").headers["etag"],
+        client.get(f"{base}.html", headers={"Accept-Encoding": "gzip"}).headers["etag"],
+    }
+    assert len(tags) == 3
+
+
+def test_filename_is_escaped_in_the_page_and_the_header(client):
+    name = 'x"><script>alert(1)</script>\r\nSet-Cookie: a=1.pdf'
+    res = client.get(f"/api/export/{analysis_key(TEXT)}.html", params={"filename": name})
+    assert res.status_code == 200
+    assert "<script>" not in res.text
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in res.text
+    disposition = res.headers["content-disposition"]
+    assert disposition.startswith('attachment; filename="x_><script>alert(1)</script>__Set-Cookie: a=1-review.html"')
+    assert "filename*=UTF-8''x%22%3E%3Cscript%3E" in disposition
+    assert "set-cookie" not in res.headers
+
+
+def test_gzip_is_used_when_brotli_is_not_installed(client, monkeypatch):
+    monkeypatch.setattr(exports, "brotli", None)
+    assert exports.negotiate_encoding("br, gzip;q=0.8") == "gzip"
+    assert exports.negotiate_encoding("br") == "identity"
+    res = client.get(f"/api/export/{analysis_key(TEXT)}.txt", headers={"Accept-Encoding": "br, gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["etag"].endswith('-gzip"')
+    assert "terminate this agreement at any time" in res.text
+
+
+def test_brotli_is_preferred_when_installed():
+    pytest.importorskip("brotli")
+    assert exports.negotiate_encoding("gzip, br") == "br"
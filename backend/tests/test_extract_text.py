@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from app.services import extract_text
+from app.services.extract_text import DocumentTooLarge, extract_pages, extract_pages_async
+from app.services.scheduler import get_scheduler
+from benchmarks.corpus import write_docx, write_text_pdf
+
+
+@pytest.mark.parametrize("kind,write", [("pdf", write_text_pdf), ("docx", write_docx)])
+def test_page_limit(monkeypatch, tmp_path, kind, write):
+    path = str(tmp_path / f"doc.{kind}")
+    write(path, 4)
+    assert len(extract_pages(f"doc.{kind}", path)) == 4
+    monkeypatch.setattr(extract_text, "MAX_PAGES", 3)
+    with pytest.raises(DocumentTooLarge):
+        extract_pages(f"doc.{kind}", path)
+
+
+def test_text_pdf_is_probed_and_extracted_in_the_extract_lane(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    write_text_pdf(path, 3)
+    lanes = get_scheduler().lanes
+    before = {name: lane.admitted for name, lane in lanes.items()}
+    pages = asyncio.run(extract_pages_async("doc.pdf", path))
+    assert len(pages) == 3
+    assert lanes["extract"].admitted - before["extract"] == 1
+    assert lanes["ocr"].admitted == before["ocr"]
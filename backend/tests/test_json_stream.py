@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from app.services.json_stream import JsonItemStream
+
+ANALYSIS = {
+    "summary": ["Mutual NDA, two \"years\".", "Governed by {Delaware} law, [exclusive] venue."],
+    "document_type": "NDA",
+    "flagged_risks": [
+        {"clause": "shall not disclose", "risk_level": "low", "description": "Standard.\nNo issue \\ here."},
+        {"clause": "perpetual licence", "risk_level": "high", "description": "Never ends."},
+    ],
+    "questions_to_ask": [],
+    "word_count": 120,
+}
+
+
+def _expected():
+    out = []
+    for key, value in ANALYSIS.items():
+        if isinstance(value, list):
+            out.extend((key, v) for v in value)
+        else:
+            out.append((key, value))
+    return out
+
+
+def _feed(text: str, size: int) -> list:
+    parser = JsonItemStream()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, 10_000])
+def test_items_are_emitted_in_order_whatever_the_chunking(size):
+    assert _feed(json.dumps(ANALYSIS, indent=2), size) == _expected()
+
+
+def test_fence_and_trailing_text_are_ignored():
+    text = "```json\n" + json.dumps(ANALYSIS) + "\n```\nHope this helps {!}"
+    assert _feed(text, 5) == _expected()
+
+
+def test_an_item_is_emitted_as_soon_as_it_is_complete():
+    parser = JsonItemStream()
+    assert parser.feed('{"summary": ["First bullet", "Sec') == [("summary", "First bullet")]
+    assert parser.feed('ond"') == [("summary", "Second")]
+    assert parser.feed('], "document_type": "Lease"') == []
+    assert parser.feed("}") == [("document_type", "Lease")]
+
+
+def test_full_text_is_kept_for_the_final_parse():
+    text = json.dumps(ANALYSIS)
+    parser = JsonItemStream()
+    parser.feed(text[:40])
+    parser.feed(text[40:])
+    assert json.loads(parser.text) == ANALYSIS
@@ -0,0 +1,108 @@
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas import DocumentSummary
+from app.services import ai_analyzer
+from app.services.analysis_cache import get_cache
+from app.services.scheduler import Lane, Scheduler
+
+TEXT = "The Customer may not assign this agreement without the Supplier's consent."
+
+
+def test_identical_concurrent_analyses_share_one_call(monkeypatch):
+    calls = []
+
+    async def complete(text, model, part=0, parts=0, preface=None):
+        calls.append(text)
+        await asyncio.sleep(0.05)
+        return DocumentSummary(summary=["Assignment needs consent."])
+
+    monkeypatch.setattr(ai_analyzer, "_complete_async", complete)
+    get_cache().clear()
+
+    async def main():
+        return await asyncio.gather(*(ai_analyzer.analyze_document_async(TEXT) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r.summary == ["Assignment needs consent."] for r in results)
+    assert ai_analyzer._flights == {}
+
+
+def test_failed_flight_fails_every_caller_and_is_not_reused(monkeypatch):
+    calls = []
+
+    async def complete(text, model, part=0, parts=0, preface=None):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(ai_analyzer, "_complete_async", complete)
+    get_cache().clear()
+
+    async def main():
+        return await asyncio.gather(
+            *(ai_analyzer.analyze_document_async(TEXT) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(ai_analyzer.analyze_document_async(TEXT))
+    assert len(calls) == 2
+
+
+class SlowThenFast:
+    """Fake AsyncOpenAI: the first call takes `slow` seconds, later ones answer at once."""
+
+    def __init__(self, slow: float):
+        self.slow = slow
+        self.calls = 0
+        self.cancelled = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            try:
+                await asyncio.sleep(self.slow)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+            return "slow"
+        return "fast"
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(ai_analyzer, "LLM_HEDGE_QUANTILE", 0.9)
+    monkeypatch.setattr(ai_analyzer, "LLM_HEDGE_MIN_DELAY", 0.02)
+    monkeypatch.setattr(ai_analyzer, "_latencies", deque([0.01] * ai_analyzer._HEDGE_MIN_SAMPLES, maxlen=200))
+
+
+def test_slow_call_is_hedged_and_the_first_answer_wins(hedging):
+    client = SlowThenFast(slow=5.0)
+    result = asyncio.run(ai_analyzer._hedged(client, "m", {}))
+    assert result == "fast"
+    assert client.calls == 2
+    assert client.cancelled
+
+
+def test_no_hedge_without_a_free_slot(hedging, monkeypatch):
+    busy = Lane("llm", capacity=1, max_queue=10, max_wait=60)
+    busy.in_flight = 1
+    monkeypatch.setattr(ai_analyzer, "get_scheduler", lambda: Scheduler([busy]))
+    client = SlowThenFast(slow=0.1)
+    assert asyncio.run(ai_analyzer._hedged(client, "m", {})) == "slow"
+    assert client.calls == 1
+
+
+def test_no_hedge_until_latencies_are_known(hedging, monkeypatch):
+    monkeypatch.setattr(ai_analyzer, "_latencies", deque([0.01], maxlen=200))
+    client = SlowThenFast(slow=0.1)
+    assert asyncio.run(ai_analyzer._hedged(client, "m", {})) == "slow"
+    assert client.calls == 1
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from app.services.microbatch import MicroBatcher
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    async def send(self, key, values):
+        self.calls.append((key, list(values)))
+        return [ValueError(v) if v == "bad" else f"{key}:{v}" for v in values]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_results_are_routed_to_their_callers():
+    async def main():
+        rec = Recorder()
+        batcher = MicroBatcher(rec.send, window=0.05, max_items=10, max_cost=100)
+        results = await asyncio.gather(*(batcher.submit("k", v) for v in ("a", "b", "c")))
+        return rec, results
+
+    rec, results = _run(main())
+    assert results == ["k:a", "k:b", "k:c"]
+    assert rec.calls == [("k", ["a", "b", "c"])]
+
+
+def test_keys_never_share_a_batch():
+    async def main():
+        rec = Recorder()
+        batcher = MicroBatcher(rec.send, window=0.05, max_items=10, max_cost=100)
+        results = await asyncio.gather(
+            batcher.submit(("m", "tenant-a"), "x"), batcher.submit(("m", "tenant-b"), "y")
+        )
+        return rec, results
+
+    rec, results = _run(main())
+    assert results == ["('m', 'tenant-a'):x", "('m', 'tenant-b'):y"]
+    assert sorted(len(values) for _, values in rec.calls) == [1, 1]
+
+
+def test_a_failed_item_fails_only_its_caller():
+    async def main():
+        rec = Recorder()
+        batcher = MicroBatcher(rec.send, window=0.05, max_items=10, max_cost=100)
+        return await asyncio.gather(batcher.submit("k", "ok"), batcher.submit("k", "bad"), return_exceptions=True)
+
+    ok, bad = _run(main())
+    assert ok == "k:ok"
+    assert isinstance(bad, ValueError)
+
+
+def test_short_result_list_fails_every_caller():
+    async def send(key, values):
+        return ["only one"]
+
+    async def main():
+        batcher = MicroBatcher(send, window=0.05, max_items=10, max_cost=100)
+        return await asyncio.gather(*(batcher.submit("k", v) for v in "abc"), return_exceptions=True)
+
+    results = _run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_batches_split_at_max_items_and_cost():
+    async def main():
+        rec = Recorder()
+        batcher = MicroBatcher(rec.send, window=0.05, max_items=2, max_cost=5)
+        await asyncio.gather(*(batcher.submit("k", v) for v in "abc"), batcher.submit("j", "big", cost=9))
+        return rec
+
+    rec = _run(main())
+    assert [values for key, values in rec.calls if key == "k"] == [["a", "b"], ["c"]]
+    assert ("j", ["big"]) in rec.calls
+
+
+def test_idle_system_sends_without_waiting_for_the_window():
+    async def main():
+        rec = Recorder()
+        batcher = MicroBatcher(rec.send, window=10, max_items=10, max_cost=100, idle=lambda: True)
+        return await asyncio.wait_for(batcher.submit("k", "a"), timeout=1)
+
+    assert _run(main()) == "k:a"
+
+
+def test_busy_system_waits_for_company():
+    async def main():
+        rec = Recorder()
+        batcher = MicroBatcher(rec.send, window=0.05, max_items=10, max_cost=100, idle=lambda: False)
+        await asyncio.gather(batcher.submit("k", "a"), batcher.submit("k", "b"))
+        return rec
+
+    assert _run(main()).calls == [("k", ["a", "b"])]
+
+
+def test_items_arriving_during_a_send_are_batched():
+    async def main():
+        release = asyncio.Event()
+        calls = []
+
+        async def send(key, values):
+            calls.append(list(values))
+            await release.wait()
+            return values
+
+        batcher = MicroBatcher(send, window=0.05, max_items=10, max_cost=100, idle=lambda: True)
+        first = asyncio.ensure_future(batcher.submit("k", "a"))
+        await asyncio.sleep(0)
+        rest = asyncio.ensure_future(asyncio.gather(batcher.submit("k", "b"), batcher.submit("k", "c")))
+        await asyncio.sleep(0.1)
+        release.set()
+        await asyncio.gather(first, rest)
+        return calls
+
+    assert _run(main()) == [["a"], ["b", "c"]]
+
+
+@pytest.mark.parametrize("priority,interactive,expected", [(2, False, True), (1, False, False), (0, True, True)])
+def test_only_batch_priority_is_batched_by_default(monkeypatch, priority, interactive, expected):
+    from app.services import ai_analyzer
+    from app.services.prompt import prepare_prompt
+    from app.services.scheduler import PRIORITY_UPLOAD, set_priority
+
+    monkeypatch.setattr(ai_analyzer, "LLM_BATCH_ENABLED", True)
+    monkeypatch.setattr(ai_analyzer, "LLM_BATCH_INTERACTIVE", interactive)
+    set_priority(priority)
+    try:
+        assert ai_analyzer._batchable(prepare_prompt("A short snippet to review.")) is expected
+    finally:
+        set_priority(PRIORITY_UPLOAD)
+
+
+def test_batched_answer_is_split_per_document_and_gaps_resent(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.services import ai_analyzer
+    from app.services.prompt import prepare_prompt
+
+    content = '{"d1": {"summary": ["First."], "document_type": "NDA"}, "d2": "garbled"}'
+    response = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    resent = []
+
+    async def create(client, model, **kwargs):
+        return response
+
+    async def complete_prompt(prompt, text, model, *args):
+        resent.append(text)
+        return ai_analyzer.DocumentSummary(summary=[f"Alone: {text}"])
+
+    monkeypatch.setattr(ai_analyzer, "_get_async_client", lambda: None)
+    monkeypatch.setattr(ai_analyzer, "_create_async", create)
+    monkeypatch.setattr(ai_analyzer, "_complete_prompt", complete_prompt)
+    docs = [(t, prepare_prompt(t)) for t in ("one two", "three four", "five six")]
+    first, second, third = _run(ai_analyzer._send_batch(("model", ""), docs))
+    assert first.summary == ["First."] and first.document_type == "NDA"
+    assert second.summary == ["Alone: three four"]
+    assert third.summary == ["Alone: five six"]
+    assert resent == ["three four", "five six"]
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from app.services import ocr
+
+
+def _fake_window(path, first, last, dpi):
+    return [(n, f"page {n}") for n in range(first, last + 1)]
+
+
+def test_pool_workers_run_page_work_inline(monkeypatch):
+    monkeypatch.setattr(ocr, "_inline", False)
+    monkeypatch.setattr(ocr, "_pool", None)
+    monkeypatch.setattr(ocr, "_ocr_window", _fake_window)
+    progress = []
+    ocr.run_pages_inline()
+    assert ocr.page_workers() == 1
+    texts = ocr.ocr_pdf_path(
+        "scan.pdf", pages=[1, 2, 3, 5], on_progress=lambda done, _: progress.append(done), window=2
+    )
+    assert texts == {1: "page 1", 2: "page 2", 3: "page 3", 5: "page 5"}
+    assert progress == [1, 2, 3, 4]
+    assert ocr._pool is None
+
+
+def test_concurrent_callers_share_one_page_pool(monkeypatch):
+    created = []
+
+    class SlowPool:
+        def __init__(self, max_workers):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(ocr, "ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr(ocr, "_pool", None)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(ocr.get_page_pool())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert all(p is created[0] for p in pools)
@@ -0,0 +1,97 @@
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services.document_store import DocumentStore, locate_risks
+from app.services.exports import html_export, marked_text
+from app.services.highlight import find_clause_spans, iter_clause_spans
+from app.services.prompt import compact, prepare_prompt
+
+HEADER = "ACME CONFIDENTIAL"
+
+
+def _paged(pages: list[str]) -> str:
+    return "\n\n".join(f"{HEADER}\n{body}\nPage {i} of {len(pages)}" for i, body in enumerate(pages, 1))
+
+
+PAGES = [
+    "The Supplier shall deliver the goods\nwithin thirty   days of the order.",
+    "Payment is due on receipt of the invoice. Late payments accrue interest at",
+    "five percent per month until paid in full.",
+    "This agreement is governed by the laws of Delaware.",
+]
+TEXT = _paged(PAGES)
+
+
+def test_compaction_drops_headers_footers_and_layout_whitespace():
+    compacted = compact(TEXT)
+    assert HEADER not in compacted.text
+    assert "Page 2 of 4" not in compacted.text
+    assert "within thirty days of the order." in compacted.text
+
+
+def test_list_numbering_at_a_page_edge_is_kept():
+    blocks = [
+        "(1)\nThe Supplier indemnifies the Customer.",
+        "Fees are payable monthly.\n(2)",
+        "3\nNotices are given in writing.",
+        "Either party may terminate.\n- 4 -",
+    ]
+    compacted = compact("\n\n".join(blocks)).text
+    assert "(1)" in compacted and "(2)" in compacted
+    assert "\n3\n" in compacted and "- 4 -" in compacted
+
+
+def test_every_compacted_piece_maps_back_to_the_original():
+    compacted = compact(TEXT)
+    for comp, orig, length in zip(compacted.comp_starts, compacted.orig_starts, compacted.lengths):
+        assert compacted.text[comp:comp + length] == TEXT[orig:orig + length]
+    start = compacted.text.index("thirty days")
+    o_start, o_end = compacted.original_span(start, start + len("thirty days"))
+    assert TEXT[o_start:o_end] == "thirty   days"
+
+
+def test_truncated_prompt_map_stays_in_bounds():
+    prompt = prepare_prompt(TEXT, max_tokens=12)
+    assert prompt.truncated
+    compacted = prompt.compacted
+    assert compacted.comp_starts[-1] + compacted.lengths[-1] <= len(compacted.text)
+    assert compacted.original(len(compacted.text)) <= len(TEXT)
+
+
+def test_clause_spans_ignore_whitespace_and_case():
+    risk = FlaggedRisk(clause="WITHIN THIRTY DAYS of the order", risk_level="low", description="")
+    [span] = find_clause_spans(TEXT, [risk])
+    assert TEXT[span.start:span.end] == "within thirty   days of the order"
+
+
+def test_windowed_spans_match_a_single_pass():
+    text = ("Filler sentence without any risk in it. " * 50 + "Interest accrues at five percent. ") * 40
+    risks = [FlaggedRisk(clause="interest accrues at five percent", risk_level="high", description="")]
+    whole = [(s.start, s.end) for s in find_clause_spans(text, risks)]
+    windowed = [(s.start, s.end) for s in iter_clause_spans(text, risks, window=1000)]
+    assert windowed == whole and len(whole) == 40
+
+
+def test_clause_quoted_across_a_dropped_header_is_located():
+    clause = "Late payments accrue interest at five percent per month"
+    summary = DocumentSummary(
+        summary=[], flagged_risks=[FlaggedRisk(clause=clause, risk_level="high", description="")]
+    )
+    assert clause in " ".join(compact(TEXT).text.split())
+    assert not find_clause_spans(TEXT, summary.flagged_risks)
+
+    starts = [0] + [TEXT.index(f"\n\n{HEADER}", 1) + 2]
+    doc = DocumentStore().put(TEXT, starts, "contract.txt")
+    [risk] = locate_risks(summary, TEXT, doc).flagged_risks
+    assert TEXT[risk.start:].startswith("Late payments")
+    assert TEXT[:risk.end].endswith("per month")
+    assert risk.page == 2
+
+
+def test_exports_highlight_clauses_quoted_across_a_dropped_header():
+    clause = "Late payments accrue interest at five percent per month"
+    summary = DocumentSummary(
+        summary=[], flagged_risks=[FlaggedRisk(clause=clause, risk_level="high", description="")]
+    )
+    marked = "".join(marked_text(TEXT, summary.flagged_risks))
+    assert ">> [RISK - HIGH] Late payments" in marked
+    assert "per month <<" in marked
+    assert '<mark class="risk-high"' in "".join(html_export(TEXT, summary))
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.schemas import DocumentSummary
+from app.services import revisions
+from app.services.ai_analyzer import analysis_key
+from app.services.analysis_cache import get_cache
+
+OLD = "1. Term\nThis agreement lasts one year.\n\n2. Fees\nFees are due within 30 days.\n"
+NEW = "1. Term\nThis agreement lasts one year.\n\n2. Fees\nFees are due within 10 days.\n"
+
+
+def test_merged_revision_is_not_cached_as_a_full_analysis(monkeypatch):
+    sent = []
+
+    async def excerpt(text, model=None, preface=None):
+        sent.append(text)
+        return DocumentSummary(summary=["Fees are now due within 10 days."])
+
+    monkeypatch.setattr(revisions, "analyze_excerpt_async", excerpt)
+    cache = get_cache()
+    cache.clear()
+    previous = cache.put(analysis_key(OLD), OLD, DocumentSummary(summary=["One-year term."]))
+
+    summary, report = asyncio.run(revisions.analyze_revision_async(NEW, previous))
+
+    assert sent == ["2. Fees\nFees are due within 10 days.\n"]
+    assert report.sections_modified == 1 and report.sections_unchanged == 1
+    assert cache.get(analysis_key(NEW)) is None
+    cached = cache.get(revisions.revision_key(NEW, previous.analysis_id))
+    assert cached is not None and cached.summary == summary
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import documents
+from app.services.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_UPLOAD,
+    Lane,
+    Overloaded,
+    Scheduler,
+)
+
+
+def _busy_lane(**kwargs) -> Lane:
+    """A lane with its only slot taken."""
+    lane = Lane("llm", capacity=1, **kwargs)
+    lane.in_flight = 1
+    return lane
+
+
+def test_full_queue_is_shed_with_retry_after():
+    lane = _busy_lane(max_queue=0, max_wait=60, service=5.0)
+    with pytest.raises(Overloaded) as exc:
+        lane.admit(PRIORITY_UPLOAD)
+    assert exc.value.lane == "llm"
+    assert exc.value.retry_after >= 1
+    assert lane.shed == 1
+
+
+def test_wait_over_budget_is_shed():
+    lane = _busy_lane(max_queue=100, max_wait=1.0, service=10.0)
+    with pytest.raises(Overloaded) as exc:
+        lane.admit(PRIORITY_UPLOAD)
+    # Estimated wait is 10 s against a 1 s budget
+    assert exc.value.retry_after >= 9
+
+
+def test_free_lane_admits():
+    lane = Lane("llm", capacity=1, max_queue=0, max_wait=1.0)
+    lane.admit(PRIORITY_UPLOAD)
+    assert lane.shed == 0
+
+
+def test_batch_is_never_shed():
+    lane = _busy_lane(max_queue=0, max_wait=0.0, service=100.0)
+    lane.admit(PRIORITY_BATCH)
+    assert lane.shed == 0
+
+
+def test_waiters_are_served_by_priority_then_cost():
+    async def main():
+        lane = Lane("llm", capacity=1, max_queue=10, max_wait=60)
+        order = []
+
+        async def work(name, priority, cost):
+            async with lane.slot(cost=cost, priority=priority, shed=False):
+                order.append(name)
+
+        async with lane.slot(shed=False):
+            tasks = [
+                asyncio.create_task(work("batch", PRIORITY_BATCH, 1)),
+                asyncio.create_task(work("upload-large", PRIORITY_UPLOAD, 5)),
+                asyncio.create_task(work("upload-small", PRIORITY_UPLOAD, 1)),
+                asyncio.create_task(work("interactive", PRIORITY_INTERACTIVE, 9)),
+            ]
+            await asyncio.sleep(0)
+            assert lane.stats()["queued"] == 4
+        await asyncio.gather(*tasks)
+        return lane, order
+
+    lane, order = asyncio.run(main())
+    assert order == ["interactive", "upload-small", "upload-large", "batch"]
+    assert lane.in_flight == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        lane = Lane("llm", capacity=1, max_queue=10, max_wait=60)
+        async with lane.slot(shed=False):
+            task = asyncio.create_task(lane._acquire(PRIORITY_UPLOAD, 1.0))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert lane.stats()["queued"] == 0
+        return lane
+
+    assert asyncio.run(main()).in_flight == 0
+
+
+def test_overloaded_request_gets_429_with_retry_after(monkeypatch):
+    scheduler = Scheduler([_busy_lane(max_queue=0, max_wait=1.0, service=3.0)])
+    monkeypatch.setattr(documents, "get_scheduler", lambda: scheduler)
+
+    response = TestClient(app).post("/api/analyze-text", json={"text": "A contract never analyzed before."})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["lane"] == "llm"
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.schemas import DocumentSummary, FlaggedRisk
+from app.services import search_index
+from app.services.ai_analyzer import analysis_key
+from app.services.analysis_cache import AnalysisCache
+from app.services.document_store import DocumentStore
+from app.services.search_index import SearchIndex, record_analysis_async, reindex
+
+TEXT = "This agreement renews automatically for successive one-year terms unless cancelled."
+SUMMARY = DocumentSummary(
+    summary=["Auto-renewing agreement."],
+    document_type="Service agreement",
+    flagged_risks=[FlaggedRisk(clause="renews automatically", risk_level="high", description="Auto renewal.")],
+)
+
+
+def _setup(monkeypatch, tmp_path, memory_items=128):
+    store = DocumentStore()
+    cache = AnalysisCache(max_items=memory_items, db_path=str(tmp_path / "cache.sqlite3"))
+    index = SearchIndex()
+    monkeypatch.setattr(search_index, "get_document_store", lambda: store)
+    monkeypatch.setattr(search_index, "get_cache", lambda: cache)
+    monkeypatch.setattr(search_index, "get_search_index", lambda: index)
+    return store, cache, index
+
+
+def test_record_analysis_async_locates_risks_and_indexes(monkeypatch, tmp_path):
+    store, _, index = _setup(monkeypatch, tmp_path)
+    doc = store.put(TEXT, [0], "contract.txt")
+    located = asyncio.run(record_analysis_async(doc, TEXT, SUMMARY))
+    assert located.flagged_risks[0].start == TEXT.index("renews automatically")
+    assert index.search("renews", risk_level="high").total == 1
+
+
+def test_reindex_reads_the_disk_tier_and_prunes_evicted_documents(monkeypatch, tmp_path):
+    store, cache, index = _setup(monkeypatch, tmp_path, memory_items=1)
+    doc = store.put(TEXT, [0], "contract.txt")
+    cache.put(analysis_key(TEXT), TEXT, SUMMARY)
+    # Push the analysis out of the memory tier
+    cache.put("other", "other text", DocumentSummary(summary=[]))
+    index.add(store.put("Evicted document text.", [0], "old.txt"), "Evicted document text.", SUMMARY)
+    monkeypatch.setattr(store, "document_ids", lambda: [doc.id])
+
+    report = reindex()
+    assert (report.documents, report.pruned) == (1, 1)
+    hits = index.search("renews").results
+    assert [h.document_id for h in hits] == [doc.id]
+    assert cache.stats()["disk_hits"] == 0
@@ -5,6 +5,7 @@ const uploadSection = document.getElementById("uploadSection");
 const uploadZone = document.getElementById("uploadZone");
 const fileInput = document.getElementById("fileInput");
 const loadingSection = document.getElementById("loadingSection");
+const loadingPreview = document.getElementById("loadingPreview");
 const resultsSection = document.getElementById("resultsSection");
 const errorSection = document.getElementById("errorSection");
 const summaryList = document.getElementById("summaryList");
@@ -17,6 +18,7 @@ const scoreValue = document.getElementById("scoreValue");
 const scoreGaugeFill = document.getElementById("scoreGaugeFill");
 const documentCard = document.getElementById("documentCard");
 const documentText = document.getElementById("documentText");
+const loadMoreBtn = document.getElementById("loadMoreBtn");
 const resultFilename = document.getElementById("resultFilename");
 const exportBtn = document.getElementById("exportBtn");
 const newDocBtn = document.getElementById("newDocBtn");
@@ -37,6 +39,9 @@ let lastPastedText = null;
 let lastFullText = "";
 let lastRisks = [];
 let lastData = null;
+let lastAnalysisId = null;
+let lastDocumentId = null;
+let nextTextStart = null;
 
 const inputTabs = document.querySelectorAll(".tab-btn");
 const uploadPanel = document.getElementById("uploadPanel");
@@ -80,7 +85,10 @@ function showToast(msg, type = "success") {
 // Display results
 function displayResults(data, title, fullText) {
   lastData = data;
+  lastAnalysisId = data.analysis_id || null;
+  lastDocumentId = data.document_id || null;
   lastFullText = fullText || "";
+  nextTextStart = null;
   lastRisks = data.summary.flagged_risks || [];
 
   // Summary
@@ -147,14 +155,38 @@ function displayResults(data, title, fullText) {
 
   resultFilename.textContent = title || "Document Summary";
 
-  // Document
-  documentCard.classList.toggle("hidden", !fullText);
-  documentText.innerHTML = fullText ? highlightRisksInText(fullText, lastRisks) : "";
-  applySearchHighlight();
+  renderDocument();
 
   show(resultsSection);
 }
 
+// Uploaded documents are not echoed in the analysis; their text is fetched from the
+// document store in slices, and "Load more" appends the next one
+async function loadDocumentText(documentId, start = 0) {
+  if (!documentId) return;
+  try {
+    const res = await fetch(`${API_BASE}/api/documents/${documentId}/text?start=${start}`);
+    if (!res.ok) throw new Error("Could not load document text");
+    const slice = await res.json();
+    if (documentId !== lastDocumentId) return;
+    lastFullText = start ? lastFullText + slice.text : slice.text;
+    nextTextStart = slice.next_start;
+    renderDocument();
+    if (lastRisks.length) renderRisks();
+  } catch (err) {
+    showToast(err.message || "Could not load document text", "error");
+  }
+}
+
+function renderDocument() {
+  documentCard.classList.toggle("hidden", !lastFullText);
+  documentText.innerHTML = lastFullText ? highlightRisksInText(lastFullText, lastRisks) : "";
+  applySearchHighlight();
+  loadMoreBtn?.classList.toggle("hidden", nextTextStart == null);
+}
+
+loadMoreBtn?.addEventListener("click", () => loadDocumentText(lastDocumentId, nextTextStart));
+
 function renderRisks() {
   const filtered = getFilteredRisks();
   risksList.innerHTML = "";
@@ -286,7 +318,7 @@ async function analyze(file) {
   formData.append("file", file);
 
   try {
-    const res = await fetch(`${API_BASE}/api/analyze`, {
+    const res = await fetch(`${API_BASE}/api/analyze/stream`, {
       method: "POST",
       body: formData,
     });
@@ -297,8 +329,9 @@ async function analyze(file) {
       throw new Error(detail || res.statusText || "Analysis failed");
     }
 
-    const data = await res.json();
-    displayResults(data, data.filename || "Document Summary", data.full_text || "");
+    const data = await readAnalysisStream(res);
+    displayResults(data, data.filename || "Document Summary", "");
+    await loadDocumentText(data.document_id);
   } catch (err) {
     setError(err.message || "Something went wrong");
   }
@@ -311,7 +344,7 @@ async function analyzeText(text) {
   if (docSearch) docSearch.value = "";
 
   try {
-    const res = await fetch(`${API_BASE}/api/analyze-text`, {
+    const res = await fetch(`${API_BASE}/api/analyze-text/stream`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ text }),
@@ -323,33 +356,106 @@ async function analyzeText(text) {
       throw new Error(detail || res.statusText || "Analysis failed");
     }
 
-    const data = await res.json();
-    displayResults({ summary: data.summary }, `Pasted text (${data.char_count} chars)`, text || "");
+    const data = await readAnalysisStream(res);
+    displayResults(data, `Pasted text (${data.char_count} chars)`, text || "");
   } catch (err) {
     setError(err.message || "Something went wrong");
   }
 }
 
+// Streaming analysis (server-sent events): show items as they arrive, resolve with
+// the same shape as /api/analyze ({ ...meta, summary })
+async function readAnalysisStream(res) {
+  resetLoadingPreview();
+  let meta = {};
+  let summary = null;
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+
+  const handle = (event, data) => {
+    if (event === "meta") meta = data;
+    else if (event === "done") summary = data;
+    else if (event === "error") throw new Error(data.detail || "Analysis failed");
+    else addLoadingPreview(event, data);
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buf.indexOf("\n\n")) !== -1) {
+      const block = buf.slice(0, idx);
+      buf = buf.slice(idx + 2);
+      let event = "message";
+      let data = "";
+      block.split("\n").forEach((line) => {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      });
+      if (data) handle(event, JSON.parse(data));
+    }
+  }
+
+  if (!summary) throw new Error("Analysis ended unexpectedly");
+  return { ...meta, summary };
+}
+
+function resetLoadingPreview() {
+  if (!loadingPreview) return;
+  loadingPreview.innerHTML = "";
+  loadingPreview.classList.add("hidden");
+}
+
+function addLoadingPreview(event, data) {
+  if (!loadingPreview) return;
+  const li = document.createElement("li");
+  if (event === "summary") {
+    li.textContent = data;
+  } else if (event === "risk") {
+    li.className = "preview-risk";
+    li.textContent = `[${(data.risk_level || "low").toUpperCase()}] ${data.description || ""}`;
+  } else {
+    return;
+  }
+  loadingPreview.appendChild(li);
+  loadingPreview.classList.remove("hidden");
+}
+
 // Export
+// A cached analysis is exported with GET, which the browser revalidates (304) on repeat downloads;
+// the POST routes are the fallback once the analysis has expired from the cache
+async function fetchExport(cachedUrl, postUrl, postInit) {
+  if (lastAnalysisId) {
+    const res = await fetch(cachedUrl);
+    if (res.status !== 404) return res;
+  }
+  return fetch(postUrl, { method: "POST", ...postInit });
+}
+
 async function exportSummary() {
   try {
     if (lastFile) {
       const formData = new FormData();
       formData.append("file", lastFile);
-      const res = await fetch(`${API_BASE}/api/export/from-file`, {
-        method: "POST",
-        body: formData,
-      });
+      if (lastAnalysisId) formData.append("analysis_id", lastAnalysisId);
+      const name = encodeURIComponent(lastFile.name || "document");
+      const res = await fetchExport(
+        `${API_BASE}/api/export/${lastAnalysisId}.html?filename=${name}`,
+        `${API_BASE}/api/export/from-file`,
+        { body: formData },
+      );
       if (!res.ok) throw new Error("Export failed");
       const blob = await res.blob();
       const base = (lastFile.name || "document").replace(/\.[^.]+$/, "");
       downloadBlob(blob, `${base}-review.html`);
     } else if (lastPastedText) {
-      const res = await fetch(`${API_BASE}/api/export/from-text`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ text: lastPastedText }),
-      });
+      const res = await fetchExport(
+        `${API_BASE}/api/export/${lastAnalysisId}.txt`,
+        `${API_BASE}/api/export/from-text`,
+        { headers: { "Content-Type": "application/json" }, body: JSON.stringify({ text: lastPastedText }) },
+      );
       if (!res.ok) throw new Error("Export failed");
       const blob = await res.blob();
       downloadBlob(blob, "document-review.txt");
@@ -550,8 +656,12 @@ newDocBtn?.addEventListener("click", () => {
   lastFile = null;
   lastPastedText = null;
   lastData = null;
+  lastAnalysisId = null;
+  lastDocumentId = null;
+  nextTextStart = null;
   lastRisks = [];
   lastFullText = "";
+  loadMoreBtn?.classList.add("hidden");
   fileInput.value = "";
   pasteTextarea.value = "";
   if (docSearch) docSearch.value = "";
@@ -564,5 +674,5 @@ retryBtn?.addEventListener("click", () => {
 
 function isSupported(name) {
   const ext = (name || "").toLowerCase().split(".").pop();
-  return ["pdf", "docx", "png", "jpg", "jpeg", "tiff", "bmp"].includes(ext);
+  return ["pdf", "docx", "png", "jpg", "jpeg", "tif", "tiff", "bmp"].includes(ext);
 }